@@ -0,0 +1,179 @@
+"""
+목록/상세 페이지 DOM 추출 방식 비교 벤치마크
+
+요소마다 WebDriver를 호출하던 기존 방식(per-element)과, execute_script 한 번으로
+HTML을 받아 파이썬에서 파싱하는 현재 방식(bulk)의 WebDriver 왕복 횟수와 실행 시간을 비교한다.
+
+사용법:
+    python dom_extraction_bench.py --rows 1000 --repeat 3
+    python dom_extraction_bench.py --rows 1000 --parse-only   # 브라우저 없이 파싱 시간만 측정
+"""
+import argparse
+import os
+import statistics
+import tempfile
+import time
+
+from encar_direct_url_simple import (
+    DETAIL_EXTRACT_SCRIPT,
+    LISTING_EXTRACT_SCRIPT,
+    LISTING_READY_SELECTOR,
+    PERFORMANCE_SECTION_XPATH,
+    CAR_HISTORY_SECTION_XPATH,
+    EncarCrawler,
+    parse_listing_html,
+    parse_performance_html,
+    parse_special_note_html,
+)
+from encar_standin_server import build_detail_page, build_listing_page
+
+# ---- 기존 per-element 방식 (비교 기준) ----
+
+def legacy_fetch_listing_rows(driver):
+    from selenium.webdriver.common.by import By
+    listings = []
+    for item in driver.find_elements(By.CSS_SELECTOR, LISTING_READY_SELECTOR):
+        car_id = item.get_attribute('data-impression').split('|')[0]
+        try:
+            price = item.find_element(By.CSS_SELECTOR, "td.prc_hs strong").text.strip() + "만원"
+        except Exception:
+            price = ""
+        try:
+            region = item.find_element(By.CSS_SELECTOR, "td.inf span.detail span.loc").text.strip()
+        except Exception:
+            region = ""
+        try:
+            title = item.find_element(By.CSS_SELECTOR, "td.inf a").text.strip()
+        except Exception:
+            title = ""
+        listings.append({'id': car_id, 'title': title, 'price': price, 'region': region})
+    return listings
+
+def legacy_parse_performance_data(driver):
+    from selenium.webdriver.common.by import By
+    performance_section = driver.find_elements(By.XPATH, PERFORMANCE_SECTION_XPATH)
+    if not performance_section:
+        return None
+    performance_data = {'교환': 999, '판금': 999, '부식': 999}
+    check_list = performance_section[0].find_elements(By.XPATH, ".//ul[contains(@class, 'DetailInspect_check_list')]")
+    if not check_list:
+        return None
+    for item in check_list[0].find_elements(By.TAG_NAME, "li"):
+        item.text.strip()
+        p_tags = item.find_elements(By.TAG_NAME, "p")
+        if len(p_tags) < 2:
+            continue
+        category = p_tags[0].text.strip()
+        value_text = p_tags[1].text.strip()
+        for key in performance_data:
+            if key in category:
+                if '없음' in value_text:
+                    performance_data[key] = 0
+                else:
+                    span_elements = p_tags[1].find_elements(By.TAG_NAME, "span")
+                    num_text = span_elements[0].text.strip() if span_elements else ''.join(filter(str.isdigit, value_text))
+                    if num_text:
+                        performance_data[key] = int(num_text)
+                break
+    return performance_data
+
+def legacy_parse_special_note(driver):
+    from selenium.webdriver.common.by import By
+    car_history_section = driver.find_elements(By.XPATH, CAR_HISTORY_SECTION_XPATH)
+    if not car_history_section:
+        return None
+    special_note_li = car_history_section[0].find_elements(By.XPATH, ".//li[p[contains(text(), '특이 사항')]]")
+    if not special_note_li:
+        return None
+    ul = special_note_li[0].find_elements(By.TAG_NAME, "ul")
+    return ul[0].text.strip() if ul and ul[0].text.strip() else "없음"
+
+# ---- 측정 ----
+
+class RoundTripCounter:
+    """driver.execute를 감싸 WebDriver 명령(왕복) 횟수를 센다"""
+    def __init__(self, driver):
+        self.driver = driver
+        self.count = 0
+        self._original = driver.execute
+        def counting_execute(*args, **kwargs):
+            self.count += 1
+            return self._original(*args, **kwargs)
+        driver.execute = counting_execute
+    def measure(self, fn):
+        self.count = 0
+        started = time.perf_counter()
+        result = fn()
+        return result, self.count, time.perf_counter() - started
+
+def run_case(counter, name, fn, repeat):
+    timings = []
+    trips = 0
+    result = None
+    for _ in range(repeat):
+        result, trips, elapsed = counter.measure(fn)
+        timings.append(elapsed)
+    return {'case': name, 'round_trips': trips, 'median_s': statistics.median(timings), 'result': result}
+
+def print_results(results):
+    print(f"{'case':<28}{'round trips':>12}{'median (s)':>12}")
+    for r in results:
+        print(f"{r['case']:<28}{r['round_trips']:>12}{r['median_s']:>12.4f}")
+
+def browser_benchmark(rows, repeat, headless):
+    crawler = EncarCrawler(headless=headless)
+    workdir = tempfile.mkdtemp(prefix="encar-bench-")
+    list_path = os.path.join(workdir, "list.html")
+    detail_path = os.path.join(workdir, "detail.html")
+    with open(list_path, 'w', encoding='utf-8') as f:
+        f.write(build_listing_page(rows))
+    with open(detail_path, 'w', encoding='utf-8') as f:
+        f.write(build_detail_page(special_notes=("렌트",)))
+    results = []
+    try:
+        with crawler.pool.lease() as driver:
+            counter = RoundTripCounter(driver)
+            driver.get("file://" + list_path)
+            legacy = run_case(counter, f"listing per-element ({rows})", lambda: legacy_fetch_listing_rows(driver), repeat)
+            bulk = run_case(counter, f"listing bulk ({rows})",
+                            lambda: parse_listing_html(driver.execute_script(LISTING_EXTRACT_SCRIPT)), repeat)
+            assert [l['id'] for l in legacy['result']] == [l['id'] for l in bulk['result']]
+            results += [legacy, bulk]
+            driver.get("file://" + detail_path)
+            legacy = run_case(counter, "detail per-element",
+                              lambda: (legacy_parse_performance_data(driver), legacy_parse_special_note(driver)), repeat)
+            bulk = run_case(counter, "detail bulk", lambda: crawler.parse_detail_html(driver.execute_script(DETAIL_EXTRACT_SCRIPT)), repeat)
+            assert legacy['result'] == bulk['result'], (legacy['result'], bulk['result'])
+            results += [legacy, bulk]
+    finally:
+        crawler.close()
+    print_results(results)
+
+def parse_only_benchmark(rows, repeat):
+    listing_html = build_listing_page(rows)
+    detail_html = build_detail_page()
+    cases = [
+        (f"parse_listing_html ({rows})", lambda: parse_listing_html(listing_html)),
+        ("parse detail html", lambda: (parse_performance_html(detail_html), parse_special_note_html(detail_html))),
+    ]
+    results = []
+    for name, fn in cases:
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            fn()
+            timings.append(time.perf_counter() - started)
+        results.append({'case': name, 'round_trips': 0, 'median_s': statistics.median(timings)})
+    print_results(results)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="DOM 추출 방식 비교 벤치마크")
+    parser.add_argument("--rows", type=int, default=1000, help="목록 페이지의 행 수")
+    parser.add_argument("--repeat", type=int, default=3, help="케이스별 반복 횟수")
+    parser.add_argument("--show-browser", action="store_true", help="헤드리스가 아닌 모드로 크롬 실행")
+    parser.add_argument("--parse-only", action="store_true", help="브라우저 없이 파이썬 파싱 시간만 측정")
+    args = parser.parse_args()
+    if args.parse_only:
+        parse_only_benchmark(args.rows, args.repeat)
+    else:
+        browser_benchmark(args.rows, args.repeat, headless=not args.show_browser)
@@ -0,0 +1,230 @@
+"""
+목록/상세 페이지 기록(record)과 재생(replay)
+
+기록: 크롤러에 PageArchive를 넘기면(--record DIR) 받은 목록 HTML, 검색 API 응답, 상세 HTML을
+gzip으로 압축해 그대로 보관한다. 상세 페이지는 detail/<carId>/<시각(ms)>.html.gz, 목록과 API
+응답은 list|api/<검색 URL 해시>/<시각(ms)>.*.gz에 저장하고, manifest.jsonl에 기록 순서대로
+한 줄씩 남긴다.
+
+재생: ReplayCrawler는 크롤러와 같은 fetch_listings/fetch_detail 계약을 따르지만 네트워크나
+브라우저 없이 기록된 페이지를 현재 파서로 다시 파싱한다. 모니터 파이프라인을 그대로 실행하므로
+(--replay DIR) 필터나 파서를 바꾼 뒤 하루치 크롤링을 몇 초 만에 다시 돌려 볼 수 있다.
+기록은 파서 회귀 테스트 코퍼스(encar_parser_corpus.py)의 원본으로도 쓴다.
+
+    python encar_direct_url_simple.py --backend http --record archive
+    python encar_direct_url_simple.py --replay archive --rules rules.json
+"""
+import gzip
+import hashlib
+import json
+import os
+import sys
+import threading
+import time
+from bisect import bisect_left
+from collections import deque
+
+from encar_direct_url_simple import (
+    extract_car_id_from_url,
+    parse_search_url,
+    fetch_details_concurrently,
+    make_soup,
+    parse_listing_html,
+    parse_performance_html,
+    parse_search_api_results,
+    parse_special_note_html,
+)
+from encar_fetch_policy import CircuitBreaker, FetchPolicy, IncompleteDetailError, PermanentFetchError
+from encar_metrics import logger, metrics
+
+EXTENSIONS = {'list': 'html', 'api': 'json', 'detail': 'html'}
+
+def url_key(url):
+    """검색 URL을 기록 디렉터리 이름으로 쓸 짧은 해시"""
+    return hashlib.sha1(url.encode('utf-8')).hexdigest()[:16]
+
+def search_page(url):
+    """검색 URL → (page/limit을 뺀 검색 조건의 해시, 페이지 번호)"""
+    query = parse_search_url(url)
+    if query is None:
+        return url_key(url), 1
+    params = {key: value for key, value in query.params.items() if key not in ('page', 'limit')}
+    return url_key(type(query)(query.base_url, params).to_url()), int(query.get('page') or 1)
+
+class NotRecordedError(PermanentFetchError):
+    """재생 중 기록에 없는 상세 페이지 (원래 크롤링에서 가져오지 않은 매물)"""
+
+class PageArchive:
+    def __init__(self, archive_dir, compresslevel=6):
+        self.archive_dir = archive_dir
+        self.manifest_file = os.path.join(archive_dir, "manifest.jsonl")
+        self.compresslevel = compresslevel
+        self.stats = {'pages': 0, 'bytes': 0, 'raw_bytes': 0}
+        self._lock = threading.Lock()
+        self._last_ms = 0
+        os.makedirs(archive_dir, exist_ok=True)
+    def _timestamp(self):
+        # 같은 밀리초에 기록해도 파일 이름이 겹치지 않도록 단조 증가
+        with self._lock:
+            self._last_ms = max(int(time.time() * 1000), self._last_ms + 1)
+            return self._last_ms
+    def record(self, kind, url, text):
+        """페이지 하나를 압축해 저장. 기록 실패는 크롤링을 멈추지 않고 경고만 남김"""
+        key = (extract_car_id_from_url(url) if kind == 'detail' else None) or url_key(url)
+        data = gzip.compress((text or "").encode('utf-8'), self.compresslevel)
+        try:
+            directory = os.path.join(self.archive_dir, kind, key)
+            os.makedirs(directory, exist_ok=True)
+            while True:
+                ts = self._timestamp()
+                relative = f"{kind}/{key}/{ts}.{EXTENSIONS[kind]}.gz"
+                try:
+                    # 다른 프로세스가 같은 디렉터리에 기록하는 경우를 위해 새 파일로만 생성
+                    with open(os.path.join(self.archive_dir, relative), 'xb') as f:
+                        f.write(data)
+                    break
+                except FileExistsError:
+                    continue
+            line = json.dumps({'kind': kind, 'key': key, 'ts': ts, 'url': url, 'file': relative},
+                              ensure_ascii=False)
+            with self._lock:
+                with open(self.manifest_file, 'a', encoding='utf-8') as f:
+                    f.write(line + "\n")
+                self.stats['pages'] += 1
+                self.stats['bytes'] += len(data)
+                self.stats['raw_bytes'] += len(text or "")
+        except OSError as e:
+            logger.warning(f"페이지를 기록하지 못했습니다 ({url}): {e}")
+            return
+        metrics.inc("encar_archived_pages_total", page=kind)
+    def entries(self, kind=None):
+        """manifest.jsonl의 기록을 시각 순서로 반환 (쓰다 만 마지막 줄은 건너뜀)"""
+        entries = []
+        try:
+            with open(self.manifest_file, 'r', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        continue
+                    if kind is None or entry['kind'] == kind:
+                        entries.append(entry)
+        except FileNotFoundError:
+            pass
+        entries.sort(key=lambda entry: entry['ts'])
+        return entries
+    def read(self, entry):
+        with gzip.open(os.path.join(self.archive_dir, entry['file']), 'rt', encoding='utf-8') as f:
+            return f.read()
+
+def replay_fetch_policy():
+    """재생용 조회 정책: 재시도/대기 없이 한 번만 호출하고 서킷 브레이커는 열지 않음"""
+    return FetchPolicy(max_attempts=1, breaker=CircuitBreaker(min_calls=sys.maxsize), sleep=lambda delay: None)
+
+class ReplayCrawler:
+    """PageArchive의 기록을 순서대로 돌려주는 크롤러.
+
+    목록 기록(목록 HTML, 검색 API 응답)은 page/limit을 뺀 검색 조건별로 기록된 순서대로 꺼낸다.
+    1페이지 요청은 다음에 기록된 검색을 시작하고, 2페이지 이후는 기록된 검색이 그 페이지까지
+    이어졌을 때만 돌려준다. 그래서 재생하는 모니터의 상태(전체 목록 확인/증분 검색, 페이지 크기)가
+    기록할 때와 달라도 주기마다 기록된 검색을 하나씩 사용한다. 상세 페이지는 마지막으로 꺼낸 목록 이후에
+    기록된 것을(없으면 가장 최근 것을) 사용한다.
+    """
+    stats_label = "재생 상태"
+    def __init__(self, archive, detail_base_url="https://fem.encar.com/cars/detail/"):
+        self.archive = archive
+        self.detail_base_url = detail_base_url
+        # 검색 조건 해시 → 목록 기록 [(페이지, 기록)]
+        self._listings = {}
+        self._details = {}
+        for entry in archive.entries():
+            if entry['kind'] == 'detail':
+                self._details.setdefault(entry['key'], []).append(entry)
+            else:
+                search, page = search_page(entry['url'])
+                self._listings.setdefault(search, deque()).append((page, entry))
+        self._detail_ts = {car_id: [entry['ts'] for entry in entries] for car_id, entries in self._details.items()}
+        # 마지막으로 꺼낸 목록의 기록 시각
+        self.clock = 0
+        self.stats = {'listing_pages': 0, 'skipped_pages': 0, 'detail_pages': 0, 'not_recorded': 0,
+                      'parse_failures': 0}
+        self._lock = threading.Lock()
+    def pending_listings(self):
+        return sum(len(queue) for queue in self._listings.values())
+    def _parse(self, entry):
+        text = self.archive.read(entry)
+        if entry['kind'] == 'api':
+            return parse_search_api_results(json.loads(text), self.detail_base_url)
+        with metrics.span("parse_listings"):
+            return parse_listing_html(text, self.detail_base_url)
+    def _next(self, search, page, url=None):
+        """search의 다음 목록 기록. url을 주면 같은 URL로 이어서 기록된 경우에만 꺼냄"""
+        with self._lock:
+            queue = self._listings.get(search)
+            if url is None and page == 1:
+                # 기록할 때보다 일찍 멈춘 이전 검색의 나머지 페이지는 건너뜀
+                while queue and queue[0][0] != 1:
+                    queue.popleft()
+                    self.stats['skipped_pages'] += 1
+            if not queue or queue[0][0] != page or (url is not None and queue[0][1]['url'] != url):
+                return None
+            _, entry = queue.popleft()
+            self.clock = entry['ts']
+            self.stats['listing_pages'] += 1
+            return entry
+    def fetch_listings(self, search_url):
+        search, page = search_page(search_url)
+        entry = self._next(search, page)
+        listings = []
+        while entry is not None:
+            listings = self._parse(entry)
+            if listings:
+                break
+            # 매물이 없으면 같은 조회에서 이어서 기록된 것을 사용: 목록 HTML이 비었을 때의
+            # 검색 API 응답, HTTP 추출 실패 후 브라우저로 다시 받은 목록
+            entry = self._next(search, page, entry['url'])
+        return listings
+    def fetch_detail(self, detail_url):
+        car_id = extract_car_id_from_url(detail_url)
+        entries = self._details.get(car_id)
+        if not entries:
+            with self._lock:
+                self.stats['not_recorded'] += 1
+            raise NotRecordedError(f"기록된 상세 페이지가 없습니다: {detail_url}")
+        # 이번 목록 이후의 기록부터, 없으면 이전 기록을 최근 것부터 시도
+        i = bisect_left(self._detail_ts[car_id], self.clock)
+        for entry in entries[i:] + entries[:i][::-1]:
+            soup = make_soup(self.archive.read(entry))
+            with metrics.span("parse_performance_data"):
+                performance_data = parse_performance_html(soup)
+            with metrics.span("parse_special_note"):
+                special_note = parse_special_note_html(soup)
+            if performance_data is not None or special_note is not None:
+                with self._lock:
+                    self.stats['detail_pages'] += 1
+                return performance_data, special_note
+        with self._lock:
+            self.stats['parse_failures'] += 1
+        raise IncompleteDetailError(f"기록된 상세 페이지에서 성능기록부/차량이력을 찾지 못했습니다: {detail_url}")
+    def fetch_details(self, detail_urls, max_workers=None, policy=None, errors=None):
+        # 파싱만 하므로 스레드를 늘려도 빨라지지 않음
+        fetch = policy.wrap(self.fetch_detail) if policy is not None else self.fetch_detail
+        return fetch_details_concurrently(fetch, detail_urls, 1, errors)
+    def close(self):
+        pass
+
+def replay(monitor, crawler):
+    """기록된 목록이 남아 있는 동안 모니터 주기를 기다림 없이 반복"""
+    started = time.perf_counter()
+    cycles = 0
+    while crawler.pending_listings():
+        consumed = crawler.stats['listing_pages']
+        monitor.run_cycle(monitor.searches)
+        cycles += 1
+        if crawler.stats['listing_pages'] == consumed:
+            # 남은 기록이 이 모니터의 검색 조건과 맞지 않음
+            logger.info(f"검색 조건이 일치하지 않는 목록 기록 {crawler.pending_listings()}개는 건너뜁니다.")
+            break
+    elapsed = time.perf_counter() - started
+    logger.info(f"재생 완료: {cycles}개 주기, {elapsed:.2f}초, {crawler.stats}")
+    return cycles
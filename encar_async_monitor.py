@@ -0,0 +1,178 @@
+"""
+asyncio 기반 모니터 파이프라인
+
+목록 검색 → 상세 조회 → 필터/저장 단계를 각각의 태스크로 분리하고, 단계 사이를
+크기가 제한된 큐로 연결해 앞 단계가 너무 앞서 나가지 않게(backpressure) 한다.
+검색은 CrawlScheduler의 고정 주기로 실행되므로, 이전 주기의 상세 조회가 끝나지
+않았더라도 다음 목록 검색이 겹쳐서 진행된다.
+
+EncarMonitor의 상태(known_listings, 저장소, 상세 정보 캐시, 검색 목록)를 그대로 사용한다.
+known_listings를 바꾸는 작업(저장, flush, 스냅샷)은 모두 이벤트 루프 스레드에서만 하고,
+목록 검색 스레드는 known_listings를 읽기만 한다.
+"""
+import asyncio
+import signal
+import time
+
+from encar_direct_url_simple import listing_fingerprint, now_str
+from encar_fetch_policy import FetchError
+from encar_metrics import logger, metrics
+
+class AsyncEncarMonitor:
+    def __init__(self, monitor, detail_workers=3, queue_size=100):
+        self.monitor = monitor
+        self.detail_workers = detail_workers
+        self.queue_size = queue_size
+        # 큐에 들어갔지만 아직 저장되지 않은 (검색, carId) 키. 다음 주기 검색에서 중복으로 넣지 않음
+        self._pending_keys = set()
+        # 상세 조회 중인 carId → Future. 여러 검색에 걸린 같은 매물은 한 번만 조회
+        self._in_flight = {}
+        self.stats = {'scans': 0, 'candidates': 0, 'fetched': 0, 'failed': 0, 'good': 0}
+    async def list_stage(self, candidates, stop):
+        """고정 주기로 검색을 실행해 새 매물을 candidates 큐에 넣음"""
+        monitor = self.monitor
+        while not stop.is_set():
+            due = monitor.scheduler.pop_due()
+            paused = monitor.fetch_policy.breaker.seconds_until_retry()
+            if due and paused > 0:
+                logger.warning(f"오류가 많아 조회를 멈춘 상태입니다. {paused:.0f}초 뒤에 다시 시도합니다.")
+                due = []
+            for search in due:
+                logger.info("=" * 50)
+                label = f"[{search.name}] " if search.name else ""
+                logger.info(f"{label}매물 확인 시작: {now_str()}")
+                monitor.fetch_policy.start_cycle()
+                try:
+                    with metrics.span("fetch_listings", search=search.name or "default"):
+                        listings = await asyncio.to_thread(monitor.fetch_cycle_listings, search)
+                except Exception as e:
+                    logger.warning(f"{label}매물 목록 조회 실패: {e}")
+                    metrics.inc("encar_failures_total", stage="fetch_listings")
+                    listings = []
+                self.stats['scans'] += 1
+                metrics.inc("encar_listings_seen_total", len(listings))
+                queued = 0
+                # 이전에 상세 조회에 실패한 매물도 다시 넣음
+                for listing in listings + monitor.due_retries(search):
+                    key = search.known_key(listing['id'])
+                    if key in monitor.known_listings or key in self._pending_keys:
+                        continue
+                    self._pending_keys.add(key)
+                    # 큐가 가득 차면 여기서 대기 (backpressure)
+                    await candidates.put((search, listing))
+                    queued += 1
+                self.stats['candidates'] += queued
+                logger.info(f"{label}새로 확인할 매물 {queued}개를 대기열에 넣었습니다.")
+                if not queued:
+                    # 저장 단계의 flush가 없으므로 검색 주기만 스냅샷에 반영
+                    monitor.save_snapshot()
+            wait = monitor.scheduler.seconds_until_next()
+            try:
+                await asyncio.wait_for(stop.wait(), timeout=wait)
+            except asyncio.TimeoutError:
+                pass
+    async def _fetch_detail(self, listing):
+        """(상세 정보, 예외) 반환. 실패하면 상세 정보는 None"""
+        car_id = listing['id']
+        cached = self.monitor.detail_cache.get(car_id, listing_fingerprint(listing))
+        if cached is not None:
+            return cached, None
+        future = self._in_flight.get(car_id)
+        if future is not None:
+            return await future
+        future = asyncio.get_running_loop().create_future()
+        self._in_flight[car_id] = future
+        try:
+            error = None
+            try:
+                detail = await asyncio.to_thread(self.monitor.fetch_policy.call,
+                                                 self.monitor.crawler.fetch_detail, listing['link'])
+            except Exception as e:
+                logger.warning(f"상세 페이지 조회 실패 ({listing['link']}): {e}",
+                               extra={'fields': {'url': listing['link']}})
+                metrics.inc("encar_failures_total", stage="fetch_detail")
+                detail, error = None, e
+            if detail is not None:
+                self.monitor.detail_cache.put(car_id, detail, listing)
+            future.set_result((detail, error))
+            return detail, error
+        finally:
+            del self._in_flight[car_id]
+            if not future.done():
+                # 조회하던 작업이 취소됨: 같은 매물을 기다리던 작업은 실패로 처리해 재시도 대기열로 보냄
+                future.set_result((None, FetchError(f"상세 조회가 취소되었습니다: {listing['link']}")))
+    async def detail_stage(self, candidates, results):
+        while True:
+            search, listing = await candidates.get()
+            try:
+                detail, error = await self._fetch_detail(listing)
+                await results.put((search, listing, detail, error))
+            finally:
+                candidates.task_done()
+    async def persist_stage(self, candidates, results):
+        """필터를 적용하고 저장. 대기 중인 작업이 모두 끝나면 저장소를 flush"""
+        monitor = self.monitor
+        while True:
+            search, listing, detail, error = await results.get()
+            try:
+                key = search.known_key(listing['id'])
+                self._pending_keys.discard(key)
+                if detail is None:
+                    # 조회 실패한 매물은 확인한 것으로 표시하지 않고 다음 주기에 다시 시도
+                    self.stats['failed'] += 1
+                    monitor.queue_retry(search, listing, error)
+                else:
+                    self.stats['fetched'] += 1
+                    monitor.retry_queue.pop(key, None)
+                    metrics.inc("encar_listings_new_total")
+                    if monitor.record_result(search, listing, detail):
+                        self.stats['good'] += 1
+                        metrics.inc("encar_listings_good_total")
+                if results.empty() and candidates.empty():
+                    # 스냅샷이 known_listings를 정리(merge)하므로 다른 스레드로 넘기지 않고 루프 스레드에서 저장
+                    with metrics.span("repo_flush"):
+                        monitor.flush()
+                    logger.info(f"처리 현황: {self.stats}", extra={'fields': dict(self.stats, event='flush')})
+                    if monitor.metrics_file:
+                        metrics.write_prometheus(monitor.metrics_file)
+            finally:
+                results.task_done()
+    async def run_async(self, stop=None):
+        """stop(asyncio.Event)이 설정되거나 SIGINT/SIGTERM을 받을 때까지 실행"""
+        loop = asyncio.get_running_loop()
+        stop = stop or asyncio.Event()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            try:
+                loop.add_signal_handler(sig, stop.set)
+            except (NotImplementedError, RuntimeError):
+                # Windows 등 signal handler를 지원하지 않는 환경
+                pass
+        candidates = asyncio.Queue(maxsize=self.queue_size)
+        results = asyncio.Queue(maxsize=self.queue_size)
+        tasks = [asyncio.create_task(self.list_stage(candidates, stop), name="list")]
+        tasks += [asyncio.create_task(self.detail_stage(candidates, results), name=f"detail-{i}")
+                  for i in range(self.detail_workers)]
+        tasks.append(asyncio.create_task(self.persist_stage(candidates, results), name="persist"))
+        try:
+            await stop.wait()
+        finally:
+            logger.info("모니터링을 종료합니다.")
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            self.monitor.flush()
+    def run(self):
+        logger.info("매물 모니터링을 시작합니다. (asyncio 파이프라인)")
+        for search in self.monitor.searches:
+            label = f"[{search.name}] " if search.name else ""
+            logger.info(f"{label}검색 URL (인코딩됨): {search.search_url}")
+            logger.info(f"{label}검색 간격: {search.check_interval}초")
+        started = time.time()
+        try:
+            asyncio.run(self.run_async())
+        except KeyboardInterrupt:
+            # signal handler를 등록하지 못한 환경에서의 Ctrl+C
+            self.monitor.flush()
+        finally:
+            self.monitor.close()
+            logger.info(f"실행 시간: {time.time() - started:.0f}초, 처리 현황: {self.stats}")
@@ -0,0 +1,171 @@
+"""
+로컬 대체 서버(encar_standin_server)를 상대로 한 오프라인 벤치마크
+
+EncarCrawler(또는 EncarHttpCrawler), 저장소, EncarMonitor를 실제 주기와 같은 순서로
+여러 번 실행하고 처리량(listings/sec), 페이지 지연 p50/p95, 최대 RSS, 드라이버 시작 횟수를
+JSON 파일로 저장한다. --compare로 이전 결과와 비교할 수 있다.
+
+사용법:
+    python encar_benchmark.py --backend http --total 1000 --cycles 3 --output bench_results.json
+    python encar_benchmark.py --backend selenium --latency 0.1 --compare bench_results.json
+"""
+import argparse
+import json
+import os
+import platform
+import resource
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+
+from encar_direct_url_simple import (
+    CarConditionFilter,
+    CarListingRepository,
+    DetailCache,
+    EncarMonitor,
+    SqliteListingRepository,
+    create_crawler,
+)
+from encar_fetch_policy import FetchPolicy
+from encar_metrics import configure_logging
+from encar_standin_server import StandinServer
+
+def peak_rss_mb():
+    """이 프로세스와 종료된 자식 프로세스(크롬 등)의 최대 RSS (MB)"""
+    scale = 1024 * 1024 if sys.platform == "darwin" else 1024
+    own = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / scale
+    children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / scale
+    return round(own, 1), round(children, 1)
+
+def percentile(samples, q):
+    if not samples:
+        return 0.0
+    if len(samples) == 1:
+        return samples[0]
+    return statistics.quantiles(samples, n=100, method='inclusive')[q - 1]
+
+def instrument(crawler, latencies):
+    """fetch_listings/fetch_detail 호출마다 걸린 시간을 페이지 종류별로 기록"""
+    for name, kind in (('fetch_listings', 'listing'), ('fetch_detail', 'detail')):
+        original = getattr(crawler, name)
+        def timed(url, _original=original, _kind=kind):
+            started = time.perf_counter()
+            try:
+                return _original(url)
+            finally:
+                latencies[_kind].append(time.perf_counter() - started)
+        setattr(crawler, name, timed)
+
+def run_benchmark(args):
+    workdir = tempfile.mkdtemp(prefix="encar-bench-")
+    server = StandinServer(total=args.total, latency=args.latency, jitter=args.jitter,
+                           error_rate=args.error_rate).start()
+    crawler = create_crawler(
+        args.backend, pool_size=args.workers, max_pages_per_driver=args.max_pages_per_driver,
+        min_request_interval=0, detail_base_url=server.detail_base_url,
+        search_api_url=server.search_api_url, listing_timeout=30, detail_timeout=10,
+    )
+    latencies = {'listing': [], 'detail': []}
+    instrument(crawler, latencies)
+    if args.repo == "sqlite":
+        repo = SqliteListingRepository(os.path.join(workdir, "encar.db"), os.path.join(workdir, "good_cars.json"),
+                                       known_index=args.known_index)
+    else:
+        repo = CarListingRepository(os.path.join(workdir, "known_listings.json"), os.path.join(workdir, "good_cars.json"))
+    monitor = EncarMonitor(
+        server.search_url(limit=args.total), 0, repo, crawler, CarConditionFilter(),
+        detail_workers=args.workers, incremental=args.incremental, page_size=args.page_size,
+        detail_cache=DetailCache(),
+        fetch_policy=FetchPolicy(base_delay=0.05, max_delay=1.0, rate_limiter=crawler.rate_limiter),
+    )
+    cycles = []
+    started = time.perf_counter()
+    try:
+        for cycle in range(args.cycles):
+            if cycle:
+                server.catalog.add_listings(args.new_per_cycle)
+            cycle_started = time.perf_counter()
+            listing_pages = len(latencies['listing'])
+            new_listings = monitor.run_cycle(monitor.searches)
+            cycles.append({
+                'cycle': cycle,
+                'seconds': round(time.perf_counter() - cycle_started, 3),
+                'new_listings': len(new_listings),
+                'listing_pages': len(latencies['listing']) - listing_pages,
+                'retry_queue': len(monitor.retry_queue),
+            })
+    finally:
+        elapsed = time.perf_counter() - started
+        pool_stats = crawler.fallback.pool.summary() if hasattr(crawler, 'fallback') else crawler.pool.summary()
+        crawler.close()
+        repo.close()
+        server.stop()
+        shutil.rmtree(workdir, ignore_errors=True)
+    processed = sum(c['new_listings'] for c in cycles)
+    rss_self, rss_children = peak_rss_mb()
+    return {
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'environment': {'python': platform.python_version(), 'platform': platform.platform()},
+        'config': {k: v for k, v in vars(args).items() if k not in ('output', 'compare')},
+        'results': {
+            'elapsed_s': round(elapsed, 3),
+            'listings_processed': processed,
+            'listings_per_sec': round(processed / elapsed, 2) if elapsed else 0.0,
+            'listing_page_p50_s': round(percentile(latencies['listing'], 50), 4),
+            'listing_page_p95_s': round(percentile(latencies['listing'], 95), 4),
+            'detail_page_p50_s': round(percentile(latencies['detail'], 50), 4),
+            'detail_page_p95_s': round(percentile(latencies['detail'], 95), 4),
+            'detail_pages': len(latencies['detail']),
+            'listing_pages': len(latencies['listing']),
+            'peak_rss_mb': rss_self,
+            'peak_rss_children_mb': rss_children,
+            'driver_startups': pool_stats['startups'],
+            'driver_startups_avoided': pool_stats['startups_avoided'],
+            'server_requests': dict(server.requests),
+            'fetch_retries': monitor.fetch_policy.stats['retries'],
+            'fetch_failures': monitor.fetch_policy.stats['failures'],
+        },
+        'cycles': cycles,
+    }
+
+def compare(current, previous_file):
+    with open(previous_file, 'r', encoding='utf-8') as f:
+        previous = json.load(f)['results']
+    print(f"\n{'metric':<28}{'previous':>14}{'current':>14}{'change':>10}")
+    for key, value in current['results'].items():
+        before = previous.get(key)
+        if not isinstance(value, (int, float)) or not isinstance(before, (int, float)):
+            continue
+        change = f"{(value - before) / before * 100:+.1f}%" if before else "-"
+        print(f"{key:<28}{before:>14}{value:>14}{change:>10}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="로컬 대체 서버를 상대로 한 크롤러/모니터 벤치마크")
+    parser.add_argument("--backend", choices=["selenium", "http"], default="selenium")
+    parser.add_argument("--repo", choices=["sqlite", "json"], default="sqlite")
+    parser.add_argument("--known-index", choices=["array", "bloom"], default="array",
+                        help="SQLite 저장소에서 확인한 매물 키를 메모리에 두는 방식")
+    parser.add_argument("--total", type=int, default=300, help="대체 서버의 매물 수")
+    parser.add_argument("--cycles", type=int, default=3, help="실행할 모니터링 주기 수")
+    parser.add_argument("--new-per-cycle", type=int, default=10, help="주기마다 새로 올라오는 매물 수")
+    parser.add_argument("--latency", type=float, default=0.0, help="응답 지연(초)")
+    parser.add_argument("--jitter", type=float, default=0.0, help="응답 지연에 더할 무작위 값의 최대치(초)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="대체 서버가 오류로 응답할 요청 비율")
+    parser.add_argument("--workers", type=int, default=3, help="상세 조회 동시 작업 수(드라이버 풀 크기)")
+    parser.add_argument("--max-pages-per-driver", type=int, default=50)
+    parser.add_argument("--page-size", type=int, default=50, help="증분 검색 페이지 크기")
+    parser.add_argument("--no-incremental", dest="incremental", action="store_false")
+    parser.add_argument("--verbose", action="store_true", help="모니터 출력도 함께 표시")
+    parser.add_argument("--output", default="bench_results.json", help="결과를 저장할 JSON 파일")
+    parser.add_argument("--compare", help="비교할 이전 결과 JSON 파일")
+    args = parser.parse_args()
+    configure_logging("INFO" if args.verbose else "WARNING")
+    report = run_benchmark(args)
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(json.dumps(report['results'], ensure_ascii=False, indent=2))
+    print(f"결과 저장: {args.output}")
+    if args.compare:
+        compare(report, args.compare)
@@ -1,44 +1,71 @@
 import time
 import json
+import hashlib
+import heapq
 import os
+import sqlite3
+import struct
+import tempfile
+import threading
 import urllib.parse
+from importlib.util import find_spec
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 from datetime import datetime
-from selenium import webdriver
-from selenium.webdriver.chrome.service import Service
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-import smtplib
-from email.mime.text import MIMEText
-from email.mime.multipart import MIMEMultipart
+from encar_fetch_policy import CircuitOpenError, FetchPolicy, IncompleteDetailError, PermanentFetchError
+from encar_history import ListingHistory
+from encar_idset import BloomKnownSet, KnownIdSet
+from encar_io import write_bytes_atomic, write_json_atomic, write_text_atomic
+from encar_metrics import LatencyHistogram, configure_logging, logger, metrics
+from encar_query import DEFAULT_BASE_URL, SearchQuery, build_model_action, parse_search_url
+from encar_rules import CarTable, RuleFilter, car_record
+# selenium, requests, bs4는 시작 시간을 줄이기 위해 실제로 사용하는 함수 안에서 불러온다
+# (HTTP 백엔드만 쓰는 실행은 selenium을, --rescore는 셋 다 불러오지 않음)
 
 def decode_url(url):
     """URL에서 인코딩된 부분을 디코딩하여 사람이 읽기 쉬운 형태로 변환"""
-    if '#!' in url:
+    query = parse_search_url(url)
+    if query is not None:
         # 엔카 URL 구조: [기본 URL]#![인코딩된 JSON]
-        base_url, encoded_part = url.split('#!', 1)
-        try:
-            # 인코딩된 JSON 부분 디코딩
-            decoded_json = urllib.parse.unquote(encoded_part)
-            
-            # JSON 문자열 파싱 시도
-            try:
-                parsed_json = json.loads(decoded_json)
-                # JSON 예쁘게 출력
-                pretty_json = json.dumps(parsed_json, ensure_ascii=False, indent=2)
-                return f"{base_url}#!\n{pretty_json}"
-            except json.JSONDecodeError:
-                # JSON 파싱 실패시 그냥 디코딩된 문자열 반환
-                return f"{base_url}#!{decoded_json}"
-        except:
-            # 디코딩 실패시 원본 URL 반환
-            return url
-    else:
-        # '#!' 형식이 아닌 경우 전체 URL 디코딩 시도
-        try:
-            return urllib.parse.unquote(url)
-        except:
-            return url
+        return f"{query.base_url}#!\n{json.dumps(query.to_dict(), ensure_ascii=False, indent=2)}"
+    # '#!' 형식이 아니거나 JSON이 아닌 경우 전체 URL 디코딩 시도
+    return urllib.parse.unquote(url)
+
+def generate_advanced_search_url(country, manufacturer, model_group, model,
+                                badge_group=None, badge=None, badge_details=None, limit=20):
+    """
+    상세 검색 조건에 맞는 엔카 검색 URL 생성
+    
+    Args:
+        country (str): 국산/수입 구분 (Y=국산, N=수입)
+        manufacturer (str): 제조사 (예: 기아, 현대)
+        model_group (str): 모델 그룹 (예: 스팅어, K5)
+        model (str): 모델명 (예: 스팅어, 더 뉴 K5 하이브리드 3세대)
+        badge_group (str, optional): 배지 그룹 (예: 가솔린 2000cc)
+        badge (str, optional): 배지 (예: 2.0 터보 2WD)
+        badge_details (list, optional): 배지 세부사항 목록 (예: ['플래티넘', '드림에디션'])
+        limit (int, optional): 한 페이지의 매물 수
+    
+    Returns:
+        str: 검색 URL
+    """
+    # 괄호와 "2.0" 같은 값의 이스케이프(2_.0)는 action 트리를 문자열로 바꿀 때 처리됨
+    action = build_model_action(
+        [("CarType", country), ("Manufacturer", manufacturer), ("ModelGroup", model_group),
+         ("Model", model), ("BadgeGroup", badge_group), ("Badge", badge if badge_group else None)],
+        badge_details if badge_group and badge else None,
+    )
+    query = {
+        "action": action,
+        "toggle": {},
+        "layer": "",
+        "sort": "ModifiedDate",
+        "page": 1,
+        "limit": limit,
+        "searchKey": "",
+        "loginCheck": False
+    }
+    return SearchQuery(DEFAULT_BASE_URL, query).to_url()
 
 def extract_car_id_from_url(detail_url):
     try:
@@ -48,7 +75,7 @@ def extract_car_id_from_url(detail_url):
         elif "/cars/detail/" in detail_url:
             return detail_url.split('/')[-1].split('?')[0]
     except Exception as e:
-        print(f"carId 추출 실패: {e}")
+        logger.warning(f"carId 추출 실패: {e}")
     return None
 
 def extract_number(text):
@@ -60,23 +87,459 @@ def now_str():
 
 def set_limit_in_search_url(url, new_limit=1000):
     """엔카 검색 URL의 limit 파라미터를 항상 new_limit 값으로 세팅"""
-    if '#!' not in url:
+    query = parse_search_url(url)
+    if query is None:
+        if '#!' in url:
+            logger.warning(f"limit 자동설정 실패: 검색 조건 JSON을 읽을 수 없습니다 ({url})")
         return url
-    base_url, encoded_json = url.split('#!', 1)
-    decoded_json = urllib.parse.unquote(encoded_json)
-    try:
-        query = json.loads(decoded_json)
-        query['limit'] = str(new_limit)
-        new_encoded_json = urllib.parse.quote(json.dumps(query, ensure_ascii=False))
-        return f"{base_url}#!{new_encoded_json}"
-    except Exception as e:
-        print(f"limit 자동설정 실패: {e}")
+    return query.with_params(limit=str(new_limit)).to_url()
+
+def get_search_query(url):
+    """엔카 검색 URL의 #! 뒤 JSON을 dict로 반환 (없거나 잘못된 경우 None)"""
+    query = parse_search_url(url)
+    return query.to_dict() if query is not None else None
+
+def set_page_in_search_url(url, page, limit):
+    """엔카 검색 URL의 page/limit 파라미터를 바꾼 URL 반환"""
+    query = parse_search_url(url)
+    if query is None:
         return url
+    return query.with_params(page=page, limit=str(limit)).to_url()
+
+def scan_listings_incremental(crawler, search_url, is_known, page_size=50, stop_after_known=20, max_pages=20,
+                              policy=None):
+    """최근 수정순으로 정렬된 검색 결과를 작은 페이지 단위로 넘기다가,
+    이미 확인한 매물이 stop_after_known개 연속으로 나오면 중단"""
+    return list(iter_listings_incremental(crawler, search_url, is_known, page_size, stop_after_known,
+                                          max_pages, policy))
+
+def iter_listings_incremental(crawler, search_url, is_known, page_size=50, stop_after_known=20, max_pages=20,
+                              policy=None):
+    """scan_listings_incremental과 같지만 매물을 하나씩 생성하고, 다음 페이지는 필요할 때 가져옴.
+    메모리에는 한 페이지 분량만 남는다."""
+    fetch_listings = policy.wrap(crawler.fetch_listings) if policy is not None else crawler.fetch_listings
+    known_run = 0
+    for page in range(1, max_pages + 1):
+        count = 0
+        for listing in fetch_listings(set_page_in_search_url(search_url, page, page_size)):
+            count += 1
+            known_run = known_run + 1 if is_known(listing['id']) else 0
+            yield listing
+            if known_run >= stop_after_known:
+                logger.info(f"{page}페이지에서 확인한 매물이 {known_run}개 연속으로 나와 검색을 중단합니다.")
+                return
+        if count < page_size:
+            break
+
+class ChromeDriverPool:
+    """크롬 드라이버를 매 페이지마다 새로 띄우지 않고 재사용하기 위한 풀"""
+    def __init__(self, factory, size=1, max_pages_per_driver=50):
+        self.factory = factory
+        self.size = max(1, size)
+        self.max_pages_per_driver = max_pages_per_driver
+        self._cond = threading.Condition()
+        self._idle = []
+        self._live = 0
+        self._next_slot = 0
+        self._closed = False
+        self.stats = {'startups': 0, 'startups_avoided': 0, 'recycled': 0, 'crashes': 0}
+        # 드라이버(슬롯)별 처리한 페이지 수
+        self.pages_served = {}
+    def _start_driver(self):
+        with metrics.span("setup_driver"):
+            driver = self.factory()
+        with self._cond:
+            self._next_slot += 1
+            slot = self._next_slot
+            self.stats['startups'] += 1
+            self.pages_served[slot] = 0
+        return {'slot': slot, 'driver': driver, 'pages': 0}
+    def _is_healthy(self, entry):
+        try:
+            # 브라우저가 죽었으면 여기서 예외가 발생한다
+            entry['driver'].current_url
+            return True
+        except Exception:
+            return False
+    def _discard(self, entry):
+        try:
+            entry['driver'].quit()
+        except Exception:
+            pass
+        with self._cond:
+            self._live -= 1
+            self._cond.notify()
+    def _acquire(self):
+        with self._cond:
+            while True:
+                if self._closed:
+                    raise RuntimeError("드라이버 풀이 이미 종료되었습니다.")
+                if self._idle:
+                    entry = self._idle.pop()
+                    break
+                if self._live < self.size:
+                    self._live += 1
+                    entry = None
+                    break
+                self._cond.wait()
+        if entry is not None:
+            if self._is_healthy(entry):
+                with self._cond:
+                    self.stats['startups_avoided'] += 1
+                return entry
+            logger.warning(f"드라이버 #{entry['slot']} 응답 없음, 새로 시작합니다.")
+            with self._cond:
+                self.stats['crashes'] += 1
+            try:
+                entry['driver'].quit()
+            except Exception:
+                pass
+        try:
+            return self._start_driver()
+        except Exception:
+            with self._cond:
+                self._live -= 1
+                self._cond.notify()
+            raise
+    def _release(self, entry, failed):
+        entry['pages'] += 1
+        with self._cond:
+            self.pages_served[entry['slot']] = entry['pages']
+        if failed and not self._is_healthy(entry):
+            with self._cond:
+                self.stats['crashes'] += 1
+            self._discard(entry)
+            return
+        if self.max_pages_per_driver and entry['pages'] >= self.max_pages_per_driver:
+            with self._cond:
+                self.stats['recycled'] += 1
+            self._discard(entry)
+            return
+        with self._cond:
+            if self._closed:
+                closed = True
+            else:
+                closed = False
+                self._idle.append(entry)
+                self._cond.notify()
+        if closed:
+            self._discard(entry)
+    @contextmanager
+    def lease(self):
+        """드라이버를 빌려주고, 블록이 끝나면 풀에 반납"""
+        entry = self._acquire()
+        failed = False
+        try:
+            yield entry['driver']
+        except BaseException:
+            failed = True
+            raise
+        finally:
+            self._release(entry, failed)
+    def close(self):
+        with self._cond:
+            self._closed = True
+            idle, self._idle = self._idle, []
+            self._cond.notify_all()
+        for entry in idle:
+            self._discard(entry)
+    def summary(self):
+        with self._cond:
+            stats = dict(self.stats)
+            pages = list(self.pages_served.values())
+        stats['pages_total'] = sum(pages)
+        stats['pages_per_driver'] = round(sum(pages) / len(pages), 1) if pages else 0
+        return stats
+
+class HostRateLimiter:
+    """호스트별 토큰 버킷. 평균적으로 min_interval(초)마다 요청 하나, 최대 burst개까지 연속 허용.
+
+    조회가 실패하거나 느려지면 penalize()로 해당 호스트의 속도를 절반으로 줄이고(최소 min_rate_factor배),
+    성공할 때마다 reward()로 원래 속도까지 조금씩 되돌린다.
+    """
+    def __init__(self, min_interval=1.0, burst=1, min_rate_factor=0.125, recovery=0.1):
+        self.min_interval = min_interval
+        self.base_rate = 1.0 / min_interval if min_interval else None
+        self.burst = burst
+        self.min_rate_factor = min_rate_factor
+        self.recovery = recovery
+        self._lock = threading.Lock()
+        # 호스트 → [남은 토큰, 마지막 갱신 시각, 현재 속도(초당 요청 수)]
+        self._buckets = {}
+    def _bucket(self, host, now):
+        bucket = self._buckets.get(host)
+        if bucket is None:
+            bucket = self._buckets[host] = [float(self.burst), now, self.base_rate]
+        return bucket
+    def wait(self, url):
+        if not self.base_rate:
+            return
+        host = urllib.parse.urlsplit(url).netloc
+        with self._lock:
+            now = time.monotonic()
+            bucket = self._bucket(host, now)
+            tokens, last, rate = bucket
+            tokens = min(self.burst, tokens + (now - last) * rate) - 1
+            bucket[0], bucket[1] = tokens, now
+            # 토큰이 모자라면 음수로 예약해 두고 채워질 때까지 대기 (먼저 온 요청이 먼저 나감)
+            delay = -tokens / rate if tokens < 0 else 0.0
+        if delay > 0:
+            time.sleep(delay)
+    def rate(self, url):
+        host = urllib.parse.urlsplit(url).netloc
+        with self._lock:
+            bucket = self._buckets.get(host)
+            return bucket[2] if bucket else self.base_rate
+    def penalize(self, url):
+        self._adjust(url, lambda rate: max(self.base_rate * self.min_rate_factor, rate / 2))
+    def reward(self, url):
+        self._adjust(url, lambda rate: min(self.base_rate, rate + self.base_rate * self.recovery))
+    def _adjust(self, url, update):
+        if not self.base_rate:
+            return
+        host = urllib.parse.urlsplit(url).netloc
+        with self._lock:
+            bucket = self._bucket(host, time.monotonic())
+            bucket[2] = update(bucket[2])
+        metrics.set_gauge("encar_request_rate", round(bucket[2], 4), host=host)
+
+LISTING_READY_SELECTOR = "table.car_list tr[data-index]"
+PERFORMANCE_SECTION_XPATH = "//div[@data-impression='성능기록부']"
+CAR_HISTORY_SECTION_XPATH = "//div[@data-impression='차량이력']"
+# 검색 결과가 없거나 성능기록부가 등록되지 않은 페이지의 안내 문구 (기다려도 목록/항목이 나타나지 않음)
+LISTING_EMPTY_XPATH = ("//*[contains(@class, 'no_result') or contains(text(), '검색결과가 없')"
+                       " or contains(text(), '검색 결과가 없')]")
+NO_INSPECTION_XPATH = ("//*[contains(text(), '성능기록부가 없') or contains(text(), '성능점검기록부가 없')"
+                       " or contains(text(), '성능점검 내역이 없')]")
+
+# 한 번의 execute_script로 필요한 영역의 HTML만 가져오는 스크립트
+LISTING_EXTRACT_SCRIPT = """
+var table = document.querySelector('table.car_list');
+return table ? table.outerHTML : '';
+"""
+DETAIL_EXTRACT_SCRIPT = """
+return ['성능기록부', '차량이력'].map(function (name) {
+    var section = document.querySelector("div[data-impression='" + name + "']");
+    return section ? section.outerHTML : '';
+}).join('');
+"""
+
+def listing_ready(driver):
+    from selenium.webdriver.common.by import By
+    # 목록 행이 나타나거나 검색 결과가 없다는 안내가 보이면 준비 완료
+    return bool(
+        driver.find_elements(By.CSS_SELECTOR, LISTING_READY_SELECTOR)
+        or driver.find_elements(By.XPATH, LISTING_EMPTY_XPATH)
+    )
+
+def detail_ready(driver):
+    from selenium.webdriver.common.by import By
+    # 성능기록부 항목이나 차량이력 영역 중 하나가 렌더링되면 준비 완료
+    # (성능기록부가 없는 매물은 차량이력이나 안내 문구만 나타남)
+    return bool(
+        driver.find_elements(By.XPATH, PERFORMANCE_SECTION_XPATH + "//li")
+        or driver.find_elements(By.XPATH, CAR_HISTORY_SECTION_XPATH)
+        or driver.find_elements(By.XPATH, NO_INSPECTION_XPATH)
+    )
+
+def fetch_details_concurrently(fetch_detail, detail_urls, max_workers=1, errors=None):
+    """상세 페이지를 병렬로 가져와 입력 순서대로 반환 (실패한 항목은 None, errors가 있으면 {순서: 예외} 기록)"""
+    detail_urls = list(detail_urls)
+    if not detail_urls:
+        return []
+    max_workers = max(1, min(max_workers, len(detail_urls)))
+    results = [None] * len(detail_urls)
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="encar-detail") as executor:
+        futures = {executor.submit(fetch_detail, url): i for i, url in enumerate(detail_urls)}
+        for future, i in futures.items():
+            try:
+                results[i] = future.result()
+            except Exception as e:
+                logger.warning(f"상세 페이지 조회 실패 ({detail_urls[i]}): {e}", extra={'fields': {'url': detail_urls[i]}})
+                if errors is not None:
+                    errors[i] = e
+    return results
+
+# lxml이 설치되어 있으면 더 빠른 파서를 사용
+HTML_PARSER = "lxml" if find_spec("lxml") else "html.parser"
+
+def make_soup(html):
+    from bs4 import BeautifulSoup
+    return html if isinstance(html, BeautifulSoup) else BeautifulSoup(html, HTML_PARSER)
+
+def _text(element, separator=" "):
+    # 브라우저의 innerText처럼 공백을 하나로 합친 텍스트
+    if element is None:
+        return ""
+    return " ".join(element.get_text(separator, strip=True).split())
+
+class ListingRecord:
+    """검색 결과 한 행. 기존 dict와 같은 키(id, title, price, region, link, detail)로 읽을 수 있고,
+    __slots__만 사용해 dict보다 메모리를 적게 쓴다. link는 저장하지 않고 carId로 만든다."""
+    __slots__ = ('id', 'title', 'price', 'region', 'detail_base_url', 'is_good_car')
+    KEYS = ('id', 'title', 'price', 'region', 'link', 'detail')
+    def __init__(self, car_id, title, price, region, detail_base_url="https://fem.encar.com/cars/detail/"):
+        self.id = car_id
+        self.title = title
+        self.price = price
+        self.region = region
+        self.detail_base_url = detail_base_url
+        self.is_good_car = None
+    @property
+    def link(self):
+        return f"{self.detail_base_url}{self.id}"
+    @property
+    def detail(self):
+        return "..."
+    def keys(self):
+        return self.KEYS + (('is_good_car',) if self.is_good_car is not None else ())
+    def __getitem__(self, key):
+        if key not in self.KEYS and key != 'is_good_car':
+            raise KeyError(key)
+        return getattr(self, key)
+    def get(self, key, default=None):
+        try:
+            value = self[key]
+        except KeyError:
+            return default
+        return default if value is None else value
+    def __setitem__(self, key, value):
+        if key not in self.__slots__:
+            raise KeyError(key)
+        setattr(self, key, value)
+    def __contains__(self, key):
+        return key in self.keys()
+    def to_dict(self):
+        return {key: self[key] for key in self.keys()}
+    def __eq__(self, other):
+        if isinstance(other, (ListingRecord, dict)):
+            return self.to_dict() == dict(other)
+        return NotImplemented
+    def __repr__(self):
+        return f"ListingRecord({self.to_dict()!r})"
+
+def make_listing(car_id, title, price, region, detail_base_url="https://fem.encar.com/cars/detail/"):
+    return ListingRecord(car_id, title, price, region, detail_base_url)
+
+def parse_listing_html(html, detail_base_url="https://fem.encar.com/cars/detail/"):
+    """검색 결과 페이지 HTML에서 매물 목록 추출"""
+    return list(iter_listing_html(html, detail_base_url))
+
+def iter_listing_html(html, detail_base_url="https://fem.encar.com/cars/detail/"):
+    """parse_listing_html과 같지만 행을 하나씩 ListingRecord로 생성"""
+    soup = make_soup(html)
+    for row in soup.select(LISTING_READY_SELECTOR):
+        impression = row.get('data-impression') or ""
+        car_id = impression.split('|')[0]
+        if not car_id:
+            continue
+        # 행이 많으므로 CSS 선택자 대신 find로 탐색
+        price_cell = row.find("td", class_="prc_hs")
+        price_element = price_cell.find("strong") if price_cell is not None else None
+        price = _text(price_element) + "만원" if price_element is not None else ""
+        info_cell = row.find("td", class_="inf")
+        region, title = "", ""
+        if info_cell is not None:
+            detail = info_cell.find("span", class_="detail")
+            region = _text(detail.find("span", class_="loc") if detail is not None else None)
+            title = _text(info_cell.find("a"))
+        yield make_listing(car_id, title, price, region, detail_base_url)
+
+def parse_search_api_results(data, detail_base_url="https://fem.encar.com/cars/detail/"):
+    """검색 API 응답(JSON)의 SearchResults를 목록 행으로 변환"""
+    listings = []
+    for car in data.get('SearchResults', []):
+        car_id = str(car.get('Id', ''))
+        if not car_id:
+            continue
+        title = " ".join(str(car[k]) for k in ('Manufacturer', 'Model', 'Badge', 'BadgeDetail') if car.get(k))
+        price = f"{int(car['Price']):,}만원" if car.get('Price') else ""
+        listings.append(make_listing(car_id, title, price, car.get('OfficeCityState', ""), detail_base_url))
+    return listings
+
+INSPECTION_KEYS = ('교환', '판금', '부식')
+
+def _inspection_key(text):
+    for key in INSPECTION_KEYS:
+        if key in text:
+            return key
+    return None
+
+def _inspection_items(section):
+    """성능기록부 영역의 (항목, 값 텍스트, 건수 텍스트)를 레이아웃에 상관없이 생성"""
+    check_list = section.select_one("ul[class*='DetailInspect_check_list']")
+    if check_list is None:
+        # 체크리스트가 없는 구버전 레이아웃: li 하나에 항목과 값이 함께 있음
+        for item in section.find_all("li"):
+            item_text = _text(item)
+            key = _inspection_key(item_text)
+            if key is not None:
+                yield key, item_text, item_text
+        return
+    # 체크리스트 레이아웃: <li><p>항목</p><p><span>건수</span>건</p></li>
+    for item in check_list.find_all("li"):
+        p_tags = item.find_all("p")
+        if len(p_tags) < 2:
+            continue
+        key = _inspection_key(_text(p_tags[0]))
+        if key is None:
+            continue
+        value_text = _text(p_tags[1])
+        span = p_tags[1].find("span")
+        yield key, value_text, _text(span) if span is not None else value_text
+
+def parse_performance_html(html):
+    """상세 페이지 HTML의 성능기록부 영역에서 교환/판금/부식 건수 추출 (영역이 없으면 None)"""
+    soup = make_soup(html)
+    section = soup.select_one("div[data-impression='성능기록부']")
+    if section is None:
+        return None
+    performance_data = {key: 999 for key in INSPECTION_KEYS}
+    for key, value_text, count_text in _inspection_items(section):
+        count = 0 if '없음' in value_text else extract_number(count_text)
+        if count is not None:
+            performance_data[key] = count
+    missing = [key for key, value in performance_data.items() if value == 999]
+    if len(missing) == len(INSPECTION_KEYS):
+        return None
+    # 일부 항목만 빠졌으면 마크업이 바뀌었을 수 있으므로 항목별로 집계
+    for key in missing:
+        metrics.inc("encar_parse_missing_total", field=key)
+    return performance_data
+
+def parse_special_note_html(html):
+    """상세 페이지 HTML의 차량이력 영역에서 특이사항 추출 (영역이 없으면 None)"""
+    soup = make_soup(html)
+    section = soup.select_one("div[data-impression='차량이력']")
+    if section is None:
+        return None
+    for li in section.find_all("li"):
+        if not any('특이 사항' in "".join(p.find_all(string=True, recursive=False))
+                   for p in li.find_all("p", recursive=False)):
+            continue
+        ul = li.find("ul")
+        note = ul.get_text("\n", strip=True) if ul is not None else ""
+        return note or "없음"
+    return None
 
 class EncarCrawler:
-    def __init__(self, headless=True):
+    def __init__(self, headless=True, pool_size=1, max_pages_per_driver=50,
+                 min_request_interval=1.0, detail_base_url="https://fem.encar.com/cars/detail/",
+                 listing_timeout=15, detail_timeout=10, archive=None):
         self.headless = headless
+        self.pool = ChromeDriverPool(self.setup_driver, pool_size, max_pages_per_driver)
+        self.rate_limiter = HostRateLimiter(min_request_interval)
+        self.detail_base_url = detail_base_url
+        self.listing_timeout = listing_timeout
+        self.detail_timeout = detail_timeout
+        self.ready_stats = {'listing': LatencyHistogram(), 'detail': LatencyHistogram()}
+        self.ready_timeouts = {'listing': 0, 'detail': 0}
+        self._stats_lock = threading.Lock()
+        # 받은 HTML을 그대로 보관할 기록 저장소 (encar_archive.PageArchive, 선택)
+        self.archive = archive
     def setup_driver(self):
+        from selenium import webdriver
+        from selenium.webdriver.chrome.service import Service
         options = webdriver.ChromeOptions()
         options.add_argument('--start-maximized')
         if self.headless:
@@ -84,271 +547,1162 @@ class EncarCrawler:
         service = Service()
         driver = webdriver.Chrome(service=service, options=options)
         return driver
-    def fetch_listings(self, search_url):
-        driver = self.setup_driver()
+    def close(self):
+        self.pool.close()
+    def wait_until_ready(self, driver, kind, condition, timeout, started):
+        """condition이 참이 될 때까지만 대기하고, 페이지 요청부터 준비까지 걸린 시간을 기록"""
+        from selenium.common.exceptions import TimeoutException
+        from selenium.webdriver.support.ui import WebDriverWait
+        ready = True
         try:
-            driver.get(search_url)
-            time.sleep(5)
-            car_items = driver.find_elements(By.CSS_SELECTOR, "table.car_list tr[data-index]")
-            listings = []
-            for item in car_items:
-                car_id = item.get_attribute('data-impression').split('|')[0]
-                # 가격 추출
-                try:
-                    price_element = item.find_element(By.CSS_SELECTOR, "td.prc_hs strong")
-                    price = price_element.text.strip() + "만원"
-                except Exception:
-                    price = ""
-                # 지역 추출
-                try:
-                    region_element = item.find_element(By.CSS_SELECTOR, "td.inf span.detail span.loc")
-                    region = region_element.text.strip()
-                except Exception:
-                    region = ""
-                # 제목 추출: <a> 태그의 텍스트 전체를 합침
-                try:
-                    a_tag = item.find_element(By.CSS_SELECTOR, "td.inf a")
-                    title = a_tag.text.strip()
-                except Exception:
-                    title = ""
-               
-                detail_link = f"https://fem.encar.com/cars/detail/{car_id}"
-                detail_info = "..."  # (상세정보 추출 코드)
-                listings.append({
-                    'id': car_id,
-                    'title': title,
-                    'price': price,
-                    'region': region,
-                    'link': detail_link,
-                    'detail': detail_info
-                })
-            return listings
-        finally:
-            driver.quit()
+            WebDriverWait(driver, timeout, poll_frequency=0.1).until(condition)
+        except TimeoutException:
+            ready = False
+            metrics.inc("encar_page_ready_timeouts_total", page=kind)
+            with self._stats_lock:
+                self.ready_timeouts[kind] += 1
+            logger.warning(f"{kind} 페이지 준비 대기 시간 초과 ({timeout}초)", extra={'fields': {'page': kind}})
+        elapsed = time.perf_counter() - started
+        self.ready_stats[kind].observe(elapsed)
+        metrics.observe("encar_page_ready_seconds", elapsed, page=kind)
+        return ready
+    def readiness_summary(self):
+        return {kind: dict(hist.summary(), timeouts=self.ready_timeouts[kind])
+                for kind, hist in self.ready_stats.items()}
+    def fetch_listings(self, search_url):
+        self.rate_limiter.wait(search_url)
+        with self.pool.lease() as driver:
+            if driver.current_url.split('#', 1)[0] == search_url.split('#', 1)[0]:
+                # #! 뒤만 다른 URL은 새로 로드되지 않아 이전 목록이 남아 있으므로 먼저 비움
+                driver.get("about:blank")
+            started = time.perf_counter()
+            with metrics.span("driver_get", page="listing"):
+                driver.get(search_url)
+            self.wait_until_ready(driver, 'listing', listing_ready, self.listing_timeout, started)
+            # 행마다 find_element를 호출하지 않고 목록 테이블 HTML을 한 번에 받아 파싱
+            with metrics.span("extract_html", page="listing"):
+                html = driver.execute_script(LISTING_EXTRACT_SCRIPT) or ""
+        if self.archive is not None:
+            self.archive.record('list', search_url, html)
+        with metrics.span("parse_listings"):
+            return parse_listing_html(html, self.detail_base_url)
     def fetch_detail(self, detail_url):
-        driver = self.setup_driver()
-        try:
-            driver.get(detail_url)
-            time.sleep(3)
-            # 성능기록부, 특이사항 등 파싱
-            performance_data = self.parse_performance_data(driver)
-            special_note = self.parse_special_note(driver)
-            return performance_data, special_note
-        finally:
-            driver.quit()
-    def parse_performance_data(self, driver):
+        self.rate_limiter.wait(detail_url)
+        with self.pool.lease() as driver:
+            started = time.perf_counter()
+            with metrics.span("driver_get", page="detail"):
+                driver.get(detail_url)
+            self.wait_until_ready(driver, 'detail', detail_ready, self.detail_timeout, started)
+            with metrics.span("extract_html", page="detail"):
+                html = driver.execute_script(DETAIL_EXTRACT_SCRIPT) or ""
+        if self.archive is not None:
+            self.archive.record('detail', detail_url, html)
+        # 성능기록부, 특이사항 등 파싱
+        performance_data, special_note = self.parse_detail_html(html)
+        if performance_data is None and special_note is None:
+            # 두 영역 모두 없으면 페이지가 제대로 열리지 않은 것으로 보고 재시도 대상으로 넘김
+            raise IncompleteDetailError(f"성능기록부/차량이력 영역을 찾을 수 없습니다: {detail_url}")
+        return performance_data, special_note
+    def fetch_details(self, detail_urls, max_workers=None, policy=None, errors=None):
+        fetch = policy.wrap(self.fetch_detail) if policy is not None else self.fetch_detail
+        return fetch_details_concurrently(fetch, detail_urls, max_workers or self.pool.size, errors)
+    def parse_detail_html(self, html):
+        """파싱 중 예외는 삼키지 않고 올려 보내 조회 실패로 처리되게 함"""
+        soup = make_soup(html)
+        with metrics.span("parse_performance_data"):
+            performance_data = parse_performance_html(soup)
+        if performance_data is None:
+            logger.info("성능기록부 영역 또는 항목을 찾을 수 없습니다.")
+        else:
+            logger.debug(f"추출된 성능기록부 데이터: {performance_data}")
+        with metrics.span("parse_special_note"):
+            special_note = parse_special_note_html(soup)
+        logger.debug(f"특이사항: {special_note}")
+        return performance_data, special_note
+
+class EncarHttpCrawler:
+    """브라우저 없이 HTTP 요청과 HTML 파싱만으로 매물/상세 정보를 가져오는 크롤러.
+
+    EncarCrawler와 같은 fetch_listings/fetch_detail 계약을 따르며, 데이터를
+    추출하지 못하면 fallback 크롤러(보통 EncarCrawler)로 다시 시도한다.
+    """
+    SEARCH_API_URL = "https://api.encar.com/search/car/list/general"
+    stats_label = "HTTP 크롤러 상태"
+    HEADERS = {
+        'User-Agent': ("Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
+                       "(KHTML, like Gecko) Chrome/120.0 Safari/537.36"),
+        'Accept-Language': "ko-KR,ko;q=0.9",
+    }
+    def __init__(self, fallback=None, session=None, pool_size=4, timeout=10,
+                 min_request_interval=1.0, detail_base_url="https://fem.encar.com/cars/detail/",
+                 use_search_api=True, search_api_url=None, archive=None):
+        self.fallback = fallback
+        self.session = session or self.create_session(pool_size)
+        self.pool_size = pool_size
+        self.timeout = timeout
+        self.rate_limiter = HostRateLimiter(min_request_interval)
+        self.detail_base_url = detail_base_url
+        self.use_search_api = use_search_api
+        self.search_api_url = search_api_url or self.SEARCH_API_URL
+        self.stats = {'http_listings': 0, 'http_details': 0, 'fallback_listings': 0, 'fallback_details': 0}
+        self._stats_lock = threading.Lock()
+        self.archive = archive
+    def create_session(self, pool_size):
+        # keep-alive 연결을 재사용하는 세션
+        import requests
+        from requests.adapters import HTTPAdapter
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        session.headers.update(self.HEADERS)
+        return session
+    def close(self):
+        self.session.close()
+        if self.fallback is not None:
+            self.fallback.close()
+    def _count(self, key):
+        with self._stats_lock:
+            self.stats[key] += 1
+    def get(self, url, **kwargs):
+        self.rate_limiter.wait(url)
+        with metrics.span("http_get"):
+            response = self.session.get(url, timeout=self.timeout, **kwargs)
+        if response.status_code in (404, 410):
+            raise PermanentFetchError(f"HTTP {response.status_code}: {url}")
+        response.raise_for_status()
+        return response
+    def fetch_listings(self, search_url):
+        # 네트워크/HTTP 오류는 그대로 올려 조회 정책(FetchPolicy)이 백오프 후 재시도하게 하고,
+        # 페이지는 받았지만 매물을 추출하지 못한 경우에만 브라우저로 대체
+        import requests
+        listings = []
+        html = self.get(search_url).text
+        if self.archive is not None:
+            self.archive.record('list', search_url, html)
         try:
-            wait = WebDriverWait(driver, 10)
-            performance_section = driver.find_elements(By.XPATH, "//div[@data-impression='성능기록부']")
-            performance_data = {'교환': 999, '판금': 999, '부식': 999}
-            if not performance_section:
-                print("성능기록부 영역을 찾을 수 없습니다.")
-                return None
-            check_list = performance_section[0].find_elements(By.XPATH, ".//ul[contains(@class, 'DetailInspect_check_list')]")
-            if not check_list:
-                list_items = performance_section[0].find_elements(By.TAG_NAME, "li")
-                if not list_items:
-                    print("성능기록부 항목을 찾을 수 없습니다.")
-                    return None
-                for item in list_items:
-                    item_text = item.text.strip()
-                    if '교환' in item_text:
-                        if '없음' in item_text:
-                            performance_data['교환'] = 0
-                        else:
-                            num_text = ''.join(filter(str.isdigit, item_text))
-                            if num_text:
-                                performance_data['교환'] = int(num_text)
-                    elif '판금' in item_text:
-                        if '없음' in item_text:
-                            performance_data['판금'] = 0
-                        else:
-                            num_text = ''.join(filter(str.isdigit, item_text))
-                            if num_text:
-                                performance_data['판금'] = int(num_text)
-                    elif '부식' in item_text:
-                        if '없음' in item_text:
-                            performance_data['부식'] = 0
-                        else:
-                            num_text = ''.join(filter(str.isdigit, item_text))
-                            if num_text:
-                                performance_data['부식'] = int(num_text)
-            else:
-                list_items = check_list[0].find_elements(By.TAG_NAME, "li")
-                if not list_items:
-                    print("체크리스트 항목을 찾을 수 없습니다.")
-                    return None
-                for item in list_items:
-                    item_text = item.text.strip()
-                    p_tags = item.find_elements(By.TAG_NAME, "p")
-                    if len(p_tags) >= 2:
-                        category = p_tags[0].text.strip()
-                        value_text = p_tags[1].text.strip()
-                        if '교환' in category:
-                            if '없음' in value_text:
-                                performance_data['교환'] = 0
-                            else:
-                                span_elements = p_tags[1].find_elements(By.TAG_NAME, "span")
-                                if span_elements:
-                                    num_text = span_elements[0].text.strip()
-                                else:
-                                    num_text = ''.join(filter(str.isdigit, value_text))
-                                if num_text:
-                                    performance_data['교환'] = int(num_text)
-                        elif '판금' in category:
-                            if '없음' in value_text:
-                                performance_data['판금'] = 0
-                            else:
-                                span_elements = p_tags[1].find_elements(By.TAG_NAME, "span")
-                                if span_elements:
-                                    num_text = span_elements[0].text.strip()
-                                else:
-                                    num_text = ''.join(filter(str.isdigit, value_text))
-                                if num_text:
-                                    performance_data['판금'] = int(num_text)
-                        elif '부식' in category:
-                            if '없음' in value_text:
-                                performance_data['부식'] = 0
-                            else:
-                                span_elements = p_tags[1].find_elements(By.TAG_NAME, "span")
-                                if span_elements:
-                                    num_text = span_elements[0].text.strip()
-                                else:
-                                    num_text = ''.join(filter(str.isdigit, value_text))
-                                if num_text:
-                                    performance_data['부식'] = int(num_text)
-            print(f"추출된 성능기록부 데이터: {performance_data}")
-            if performance_data['교환'] == 999 and performance_data['판금'] == 999 and performance_data['부식'] == 999:
-                return None
-            return performance_data
+            listings = parse_listing_html(html, self.detail_base_url)
+            if not listings and self.use_search_api:
+                listings = self.fetch_listings_from_api(search_url)
+        except requests.RequestException:
+            raise
         except Exception as e:
-            print(f"성능기록부 파싱 중 오류: {e}")
-            return None
-    def parse_special_note(self, driver):
+            if self.fallback is None:
+                raise
+            logger.warning(f"HTTP 매물 목록 추출 실패: {e}")
+        if listings or self.fallback is None:
+            self._count('http_listings')
+            return listings
+        logger.info("HTTP로 매물 목록을 추출하지 못해 브라우저로 다시 시도합니다.")
+        self._count('fallback_listings')
+        metrics.inc("encar_retries_total", reason="http_fallback", page="listing")
+        return self.fallback.fetch_listings(search_url)
+    def fetch_listings_from_api(self, search_url):
+        """검색 URL의 #! JSON(action/sort/page/limit)으로 검색 API를 직접 호출"""
+        query = get_search_query(search_url)
+        if query is None:
+            return []
+        limit = int(query.get('limit') or 20)
+        offset = (int(query.get('page') or 1) - 1) * limit
+        params = {
+            'count': 'true',
+            'q': query.get('action', ''),
+            'sr': f"|{query.get('sort') or 'ModifiedDate'}|{offset}|{limit}",
+        }
+        text = self.get(self.search_api_url, params=params).text
+        if self.archive is not None:
+            # 검색 URL 기준으로 보관 (재생할 때 같은 검색 URL의 API 응답으로 사용)
+            self.archive.record('api', search_url, text)
+        return parse_search_api_results(json.loads(text), self.detail_base_url)
+    def fetch_detail(self, detail_url):
+        html = self.get(detail_url).text
+        if self.archive is not None:
+            self.archive.record('detail', detail_url, html)
+        soup = make_soup(html)
         try:
-            car_history_section = driver.find_elements(By.XPATH, "//div[@data-impression='차량이력']")
-            special_note = None
-            if car_history_section:
-                special_note_li = car_history_section[0].find_elements(
-                    By.XPATH, ".//li[p[contains(text(), '특이 사항')]]"
-                )
-                if special_note_li:
-                    ul = special_note_li[0].find_elements(By.TAG_NAME, "ul")
-                    if ul and ul[0].text.strip():
-                        special_note = ul[0].text.strip()
-                    else:
-                        special_note = "없음"
-            print(f"특이사항: {special_note}")
-            return special_note
+            with metrics.span("parse_performance_data"):
+                performance_data = parse_performance_html(soup)
+            with metrics.span("parse_special_note"):
+                special_note = parse_special_note_html(soup)
         except Exception as e:
-            print(f"특이사항 파싱 중 오류: {e}")
-            return None
+            if self.fallback is None:
+                raise
+            logger.warning(f"HTTP 상세 페이지 파싱 실패: {e}")
+            performance_data, special_note = None, None
+        if performance_data is not None or special_note is not None:
+            self._count('http_details')
+            return performance_data, special_note
+        if self.fallback is None:
+            raise IncompleteDetailError(f"성능기록부/차량이력 영역을 찾을 수 없습니다: {detail_url}")
+        self._count('fallback_details')
+        metrics.inc("encar_retries_total", reason="http_fallback", page="detail")
+        return self.fallback.fetch_detail(detail_url)
+    def fetch_details(self, detail_urls, max_workers=None, policy=None, errors=None):
+        fetch = policy.wrap(self.fetch_detail) if policy is not None else self.fetch_detail
+        return fetch_details_concurrently(fetch, detail_urls, max_workers or self.pool_size, errors)
 
-class CarConditionFilter:
-    def is_good_car(self, performance_data, special_note):
-        # None 체크
-        if not performance_data or special_note is None:
+def create_crawler(backend="selenium", **options):
+    """실행마다 크롤러 백엔드 선택: 'selenium' 또는 'http'(실패 시 selenium으로 대체)"""
+    selenium_options = {k: v for k, v in options.items()
+                        if k in ('headless', 'pool_size', 'max_pages_per_driver', 'min_request_interval',
+                                 'detail_base_url', 'listing_timeout', 'detail_timeout', 'archive')}
+    if backend == "selenium":
+        return EncarCrawler(**selenium_options)
+    if backend == "http":
+        http_options = {k: v for k, v in options.items()
+                        if k in ('pool_size', 'min_request_interval', 'detail_base_url', 'timeout',
+                                 'use_search_api', 'search_api_url', 'archive')}
+        return EncarHttpCrawler(fallback=EncarCrawler(**selenium_options), **http_options)
+    raise ValueError(f"알 수 없는 크롤러 백엔드: {backend}")
+
+class CarConditionFilter(RuleFilter):
+    """기본 조건: 교환 1건 이하, 판금 0건, 부식 0건, 특이사항(용도이력) 없음"""
+    def __init__(self, max_exchange=1, max_panel=0, max_corrosion=0, allowed_special_notes=("없음",)):
+        self.max_exchange = max_exchange
+        self.max_panel = max_panel
+        self.max_corrosion = max_corrosion
+        self.allowed_special_notes = tuple(allowed_special_notes)
+        super().__init__([
+            {'field': 'exchange', 'op': '<=', 'value': max_exchange},
+            {'field': 'panel', 'op': '<=', 'value': max_panel},
+            {'field': 'corrosion', 'op': '<=', 'value': max_corrosion},
+            {'field': 'special_note', 'op': 'in', 'value': list(self.allowed_special_notes)},
+        ])
+
+def create_filter(config=None):
+    """필터 설정에서 생성: {"rules": [...]}이면 선언형 규칙, 아니면 CarConditionFilter 인자"""
+    config = config or {}
+    if 'rules' in config:
+        return RuleFilter(config['rules'])
+    if 'rules_file' in config:
+        return RuleFilter.from_file(config['rules_file'])
+    return CarConditionFilter(**config)
+
+# 프론트엔드 피드 그룹 파일의 열 순서 (행은 이 순서의 값 배열)
+FEED_COLUMNS = ('carId', 'price', 'region', 'exchange', 'panel', 'corrosion', 'special_note', 'url', 'check_time')
+
+class GoodCarsFeed:
+    """조건에 맞는 차량을 제목별로 나눈 프론트엔드용 피드.
+
+    feed_dir/index.json에 제목별 차량 수와 그룹 파일 이름을 두고, 그룹마다
+    groups/<제목 해시>.<내용 해시>.json 하나에 행 배열을 압축된 JSON으로 저장한다.
+    파일 이름에 내용 해시가 들어가므로 브라우저는 그룹 파일을 계속 캐시해도 된다.
+    add로 차량이 추가된 그룹만 flush에서 다시 쓴다.
+    """
+    def __init__(self, feed_dir):
+        self.feed_dir = feed_dir
+        self.index_file = os.path.join(feed_dir, "index.json")
+        self._lock = threading.Lock()
+        # 제목 → index.json의 그룹 항목 (처음 추가된 순서 유지)
+        self._groups = {}
+        # flush를 기다리는 그룹의 전체 행
+        self._pending = {}
+        self.exists = self._load_index()
+    def _load_index(self):
+        try:
+            with open(self.index_file, 'r', encoding='utf-8') as f:
+                index = json.load(f)
+        except (FileNotFoundError, ValueError):
             return False
-        exchange = performance_data.get('교환', 999)
-        panel = performance_data.get('판금', 999)
-        corrosion = performance_data.get('부식', 999)
-        # 조건: 교환 1건 이하, 판금 0건, 부식 0건, 특이사항(용도이력) 없음
-        return (
-            exchange <= 1 and
-            panel == 0 and
-            corrosion == 0 and
-            (special_note == "없음")
-        )
+        self._groups = {group['title']: group for group in index.get('groups', [])}
+        return True
+    def _rows(self, title):
+        rows = self._pending.get(title)
+        if rows is None:
+            rows = []
+            group = self._groups.get(title)
+            if group:
+                try:
+                    with open(os.path.join(self.feed_dir, group['file']), 'r', encoding='utf-8') as f:
+                        rows = json.load(f)['rows']
+                except (FileNotFoundError, ValueError, KeyError):
+                    logger.warning(f"피드 그룹 파일을 읽지 못해 새로 만듭니다: {group['file']}")
+            self._pending[title] = rows
+        return rows
+    def add(self, car):
+        title = car.get('title') or '제목 없음'
+        with self._lock:
+            self._rows(title).append([car.get(column) for column in FEED_COLUMNS])
+    def rebuild(self, cars):
+        """전체 차량 목록으로 피드를 다시 만듦 (피드가 없을 때 저장소 내용으로 처음 한 번)"""
+        with self._lock:
+            self._pending = {}
+            for title in self._groups:
+                self._pending[title] = []
+        for car in cars:
+            self.add(car)
+        self.flush(force=True)
+    def flush(self, force=False):
+        with self._lock:
+            if not (force or self._pending):
+                return
+            stale = []
+            for title, rows in self._pending.items():
+                old = self._groups.get(title)
+                if not rows:
+                    if old:
+                        stale.append(self._groups.pop(title)['file'])
+                    continue
+                text = json.dumps({'title': title, 'rows': rows}, ensure_ascii=False, separators=(',', ':'))
+                digest = hashlib.sha1(text.encode('utf-8')).hexdigest()[:12]
+                name = f"groups/{hashlib.sha1(title.encode('utf-8')).hexdigest()[:10]}.{digest}.json"
+                if old and old['file'] != name:
+                    stale.append(old['file'])
+                if not (old and old['file'] == name):
+                    write_text_atomic(os.path.join(self.feed_dir, name), text, ".json")
+                self._groups[title] = {'title': title, 'count': len(rows), 'file': name, 'hash': digest}
+            self._pending = {}
+            write_json_atomic(self.index_file, {
+                'updated': now_str(),
+                'total': sum(group['count'] for group in self._groups.values()),
+                'columns': FEED_COLUMNS,
+                'groups': list(self._groups.values()),
+            }, ensure_ascii=False, separators=(',', ':'))
+            self.exists = True
+        # 이전 index.json을 받은 브라우저를 위해 그룹 파일은 새 index.json을 쓴 뒤에 지움
+        for name in stale:
+            try:
+                os.remove(os.path.join(self.feed_dir, name))
+            except FileNotFoundError:
+                pass
+
+def open_feed(feed_dir, load_good_cars):
+    """feed_dir의 피드를 열고, 아직 없으면 load_good_cars()로 처음 만듦"""
+    if not feed_dir:
+        return None
+    feed = GoodCarsFeed(feed_dir)
+    if not feed.exists:
+        feed.rebuild(load_good_cars())
+    return feed
 
 class CarListingRepository:
-    def __init__(self, data_file, good_cars_file):
+    # flush에서 전체 목록을 한 번에 저장하므로 모니터가 good_cars를 메모리에 들고 있어야 함
+    persists_incrementally = False
+    def __init__(self, data_file, good_cars_file, feed_dir=None):
         self.data_file = data_file
         self.good_cars_file = good_cars_file
+        # 제목별로 나눈 프론트엔드용 피드 (GoodCarsFeed, 선택)
+        self.feed = open_feed(feed_dir, self.load_good_cars)
     def load_known_listings(self):
         if os.path.exists(self.data_file):
             with open(self.data_file, 'r', encoding='utf-8') as f:
                 data = json.load(f)
-                return set(data.get("listings", []))
-        return set()
+                return KnownIdSet.from_keys(data.get("listings", []))
+        return KnownIdSet()
+    def state_token(self):
+        """known_listings 파일이 바뀌었는지 확인하는 값 (모니터 스냅샷 검증용)"""
+        try:
+            stat = os.stat(self.data_file)
+        except FileNotFoundError:
+            return "missing"
+        return f"{stat.st_mtime_ns}:{stat.st_size}"
     def save_known_listings(self, known_listings):
-        with open(self.data_file, 'w', encoding='utf-8') as f:
-            json.dump({"listings": list(known_listings)}, f)
+        write_json_atomic(self.data_file, {"listings": list(known_listings)})
     def load_good_cars(self):
         if os.path.exists(self.good_cars_file):
             with open(self.good_cars_file, 'r', encoding='utf-8') as f:
                 data = json.load(f)
                 return data.get("cars", [])
         return []
+    def good_car_ids(self):
+        return {str(car.get('carId', '')) for car in self.load_good_cars()}
     def save_good_cars(self, good_cars):
-        with open(self.good_cars_file, 'w', encoding='utf-8') as f:
-            json.dump({"cars": good_cars}, f, ensure_ascii=False, indent=2)
+        write_json_atomic(self.good_cars_file, {"cars": good_cars}, ensure_ascii=False, separators=(',', ':'))
+    def add_known_listing(self, car_id):
+        # JSON 파일은 flush에서 한 번에 저장
+        pass
+    def add_good_car(self, car):
+        if self.feed is not None:
+            self.feed.add(car)
+    def flush(self, known_listings, good_cars):
+        self.save_known_listings(known_listings)
+        self.save_good_cars(good_cars)
+        if self.feed is not None:
+            self.feed.flush()
+    def close(self):
+        pass
 
+class SqliteListingRepository:
+    """확인한 매물과 조건에 맞는 차량을 SQLite에 저장하는 저장소.
 
-class EncarMonitor:
-    def __init__(self, search_url, check_interval, repo, crawler, filter):
+    매물마다 한 행씩 추가(O(1))하고 트랜잭션 단위로 기록되므로 중간에 종료되어도
+    파일이 깨지지 않는다. 프론트엔드용 good_cars.json은 변경이 있을 때만 내보내고,
+    feed_dir을 지정하면 바뀐 제목 그룹만 피드(GoodCarsFeed)에 다시 쓴다.
+
+    known_index="array"이면 확인한 매물 키를 정렬된 정수 배열(KnownIdSet)로 메모리에 두고,
+    "bloom"이면 Bloom 필터만 메모리에 두고 필터를 통과한 키는 테이블에서 확인한다.
+    """
+    persists_incrementally = True
+    def __init__(self, db_file, good_cars_file, migrate_from=None, known_index="array", feed_dir=None):
+        if known_index not in ("array", "bloom"):
+            raise ValueError(f"알 수 없는 known_index: {known_index}")
+        self.db_file = db_file
+        self.good_cars_file = good_cars_file
+        self.known_index = known_index
+        directory = os.path.dirname(os.path.abspath(db_file))
+        os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        # isolation_level=None: 각 INSERT가 곧바로 커밋되는 autocommit 모드
+        self.conn = sqlite3.connect(db_file, check_same_thread=False, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS known_listings ("
+            " car_id TEXT PRIMARY KEY, first_seen TEXT NOT NULL) WITHOUT ROWID"
+        )
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS good_cars ("
+            " seq INTEGER PRIMARY KEY AUTOINCREMENT, car_id TEXT NOT NULL, data TEXT NOT NULL)"
+        )
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_good_cars_car_id ON good_cars (car_id)")
+        self._good_cars_dirty = False
+        if migrate_from:
+            self.migrate_from_json(migrate_from, good_cars_file)
+        self.feed = open_feed(feed_dir, self.load_good_cars)
+    def _count(self, table):
+        with self._lock:
+            return self.conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+    def migrate_from_json(self, data_file, good_cars_file):
+        """기존 known_listings.json / good_cars.json 내용을 비어 있는 테이블로 옮김"""
+        legacy = CarListingRepository(data_file, good_cars_file)
+        migrated = []
+        if self._count("known_listings") == 0:
+            known = legacy.load_known_listings()
+            if known:
+                self.save_known_listings(known)
+                migrated.append(f"확인한 매물 {len(known)}개")
+        if self._count("good_cars") == 0:
+            good_cars = legacy.load_good_cars()
+            if good_cars:
+                with self._lock, self.conn:
+                    self.conn.execute("BEGIN")
+                    self.conn.executemany(
+                        "INSERT INTO good_cars (car_id, data) VALUES (?, ?)",
+                        [(str(car.get('carId', '')), json.dumps(car, ensure_ascii=False)) for car in good_cars],
+                    )
+                migrated.append(f"조건에 맞는 차량 {len(good_cars)}개")
+        if migrated:
+            logger.info(f"JSON 저장소에서 이전 완료: {', '.join(migrated)}")
+    def is_known(self, car_id):
+        with self._lock:
+            row = self.conn.execute("SELECT 1 FROM known_listings WHERE car_id = ?", (car_id,)).fetchone()
+        return row is not None
+    def iter_known_listings(self):
+        if self.db_file == ":memory:":
+            with self._lock:
+                rows = self.conn.execute("SELECT car_id FROM known_listings").fetchall()
+            yield from (row[0] for row in rows)
+            return
+        # 다른 스레드의 INSERT와 섞이지 않도록 별도 연결에서 커서를 한 행씩 읽음
+        conn = sqlite3.connect(self.db_file)
+        try:
+            for (car_id,) in conn.execute("SELECT car_id FROM known_listings"):
+                yield car_id
+        finally:
+            conn.close()
+    def load_known_listings(self):
+        if self.known_index == "bloom":
+            # 키 수만 세어 필터 크기를 정하고, 키는 커서에서 한 행씩 읽어 필터에 넣음
+            return BloomKnownSet(self.is_known, self.iter_known_listings(), iter_keys=self.iter_known_listings,
+                                 capacity=max(100000, 2 * self._count("known_listings")))
+        return KnownIdSet.from_keys(self.iter_known_listings())
+    def state_token(self):
+        # 확인한 매물은 추가만 되므로 행 수가 같으면 내용도 같음
+        return f"known:{self._count('known_listings')}"
+    def save_known_listings(self, known_listings):
+        seen_at = now_str()
+        with self._lock, self.conn:
+            self.conn.execute("BEGIN")
+            self.conn.executemany(
+                "INSERT OR IGNORE INTO known_listings (car_id, first_seen) VALUES (?, ?)",
+                ((car_id, seen_at) for car_id in known_listings),
+            )
+    def add_known_listing(self, car_id):
+        with self._lock:
+            self.conn.execute(
+                "INSERT OR IGNORE INTO known_listings (car_id, first_seen) VALUES (?, ?)", (car_id, now_str())
+            )
+    def load_good_cars(self):
+        with self._lock:
+            return [json.loads(row[0]) for row in self.conn.execute("SELECT data FROM good_cars ORDER BY seq")]
+    def good_car_ids(self):
+        with self._lock:
+            return {row[0] for row in self.conn.execute("SELECT DISTINCT car_id FROM good_cars")}
+    def add_good_car(self, car):
+        with self._lock:
+            self.conn.execute(
+                "INSERT INTO good_cars (car_id, data) VALUES (?, ?)",
+                (str(car.get('carId', '')), json.dumps(car, ensure_ascii=False)),
+            )
+            self._good_cars_dirty = True
+        if self.feed is not None:
+            self.feed.add(car)
+    def save_good_cars(self, good_cars=None):
+        # 저장은 add_good_car에서 이미 끝났으므로 프론트엔드용 JSON만 내보냄
+        self.export_good_cars()
+    def export_good_cars(self, force=False):
+        if not (force or self._good_cars_dirty or not os.path.exists(self.good_cars_file)):
+            return
+        write_json_atomic(self.good_cars_file, {"cars": self.load_good_cars()},
+                          ensure_ascii=False, separators=(',', ':'))
+        self._good_cars_dirty = False
+    def flush(self, known_listings=None, good_cars=None):
+        self.export_good_cars()
+        if self.feed is not None:
+            self.feed.flush()
+    def close(self):
+        with self._lock:
+            self.conn.close()
+
+def listing_fingerprint(listing):
+    """목록 행의 가격/제목으로 만든 지문 (바뀌면 상세 정보를 다시 확인)"""
+    raw = f"{listing.get('price', '')}|{listing.get('title', '')}"
+    return hashlib.sha1(raw.encode('utf-8')).hexdigest()[:16]
+
+class DetailCache:
+    """carId별 fetch_detail 결과(성능기록부, 특이사항)를 보관하는 SQLite 캐시.
+
+    ttl(초)이 지난 항목과 목록 행 지문이 달라진 항목은 다시 가져오고,
+    max_entries를 넘으면 가장 오래 사용하지 않은 항목부터 지운다.
+    """
+    def __init__(self, db_file=":memory:", ttl=7 * 24 * 3600, max_entries=50000):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        if db_file != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(db_file)), exist_ok=True)
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(db_file, check_same_thread=False, isolation_level=None)
+        if db_file != ":memory:":
+            self.conn.execute("PRAGMA journal_mode=WAL")
+            self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS detail_cache ("
+            " car_id TEXT PRIMARY KEY, performance TEXT, special_note TEXT,"
+            " fetched_at REAL NOT NULL, content_hash TEXT NOT NULL, fingerprint TEXT,"
+            " listing TEXT, last_access REAL NOT NULL) WITHOUT ROWID"
+        )
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_detail_cache_last_access ON detail_cache (last_access)")
+        self._puts_since_evict = 0
+        self.stats = {'hits': 0, 'misses': 0, 'expired': 0, 'changed_listing': 0, 'changed_content': 0}
+    def __len__(self):
+        with self._lock:
+            return self.conn.execute("SELECT COUNT(*) FROM detail_cache").fetchone()[0]
+    def get(self, car_id, fingerprint=None, now=None):
+        """유효한 캐시가 있으면 (성능기록부, 특이사항), 없거나 만료/변경되었으면 None"""
+        now = time.time() if now is None else now
+        with self._lock:
+            row = self.conn.execute(
+                "SELECT performance, special_note, fetched_at, fingerprint FROM detail_cache WHERE car_id = ?",
+                (car_id,),
+            ).fetchone()
+            if row is None:
+                self.stats['misses'] += 1
+                return None
+            performance, special_note, fetched_at, cached_fingerprint = row
+            if self.ttl and now - fetched_at > self.ttl:
+                self.stats['expired'] += 1
+                return None
+            if fingerprint is not None and cached_fingerprint is not None and fingerprint != cached_fingerprint:
+                self.stats['changed_listing'] += 1
+                return None
+            self.conn.execute("UPDATE detail_cache SET last_access = ? WHERE car_id = ?", (now, car_id))
+            self.stats['hits'] += 1
+        return (json.loads(performance) if performance else None), special_note
+    def put(self, car_id, detail, listing=None, now=None):
+        """결과를 저장하고, 이전에 저장된 내용과 달라졌으면 True 반환"""
+        now = time.time() if now is None else now
+        performance_data, special_note = detail
+        performance = json.dumps(performance_data, ensure_ascii=False, sort_keys=True) if performance_data else None
+        content_hash = hashlib.sha1(f"{performance}|{special_note}".encode('utf-8')).hexdigest()[:16]
+        fingerprint = listing_fingerprint(listing) if listing is not None else None
+        listing_json = json.dumps(dict(listing), ensure_ascii=False) if listing is not None else None
+        with self._lock:
+            previous = self.conn.execute(
+                "SELECT content_hash FROM detail_cache WHERE car_id = ?", (car_id,)
+            ).fetchone()
+            self.conn.execute(
+                "INSERT OR REPLACE INTO detail_cache"
+                " (car_id, performance, special_note, fetched_at, content_hash, fingerprint, listing, last_access)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (car_id, performance, special_note, now, content_hash, fingerprint, listing_json, now),
+            )
+            changed = previous is not None and previous[0] != content_hash
+            if changed:
+                self.stats['changed_content'] += 1
+            self._puts_since_evict += 1
+            if self.max_entries and self._puts_since_evict >= 100:
+                self._evict()
+        return changed
+    def _evict(self):
+        self._puts_since_evict = 0
+        self.conn.execute(
+            "DELETE FROM detail_cache WHERE car_id IN ("
+            " SELECT car_id FROM detail_cache ORDER BY last_access DESC LIMIT -1 OFFSET ?)",
+            (self.max_entries,),
+        )
+    def load_table(self, include_expired=True, now=None):
+        """캐시 전체를 한 번에 읽어 열 단위 CarTable과 행별 (carId, 목록 정보, 성능기록부, 특이사항)을 반환"""
+        now = time.time() if now is None else now
+        with self._lock:
+            rows = self.conn.execute(
+                "SELECT car_id, performance, special_note, fetched_at, listing FROM detail_cache"
+            ).fetchall()
+        entries, records, valid = [], [], []
+        for car_id, performance, special_note, fetched_at, listing in rows:
+            if not include_expired and self.ttl and now - fetched_at > self.ttl:
+                continue
+            performance_data = json.loads(performance) if performance else None
+            listing = json.loads(listing) if listing else None
+            entries.append((car_id, listing, performance_data, special_note))
+            records.append(car_record(performance_data, special_note, listing))
+            valid.append(bool(performance_data) and special_note is not None)
+        return CarTable.from_records([e[0] for e in entries], records, valid), entries
+    def reevaluate(self, filter, include_expired=True, now=None):
+        """캐시된 상세 정보로 필터를 다시 적용: (carId, 목록 정보, 성능기록부, 특이사항, 통과 여부)를 생성.
+        규칙 필터는 표 전체를 한 번에 평가한다."""
+        table, entries = self.load_table(include_expired, now)
+        if hasattr(filter, 'evaluate_table'):
+            passed = filter.evaluate_table(table)
+        else:
+            passed = [filter.is_good_car(performance_data, special_note, listing)
+                      for _, listing, performance_data, special_note in entries]
+        for entry, ok in zip(entries, passed):
+            yield entry + (bool(ok),)
+    def close(self):
+        with self._lock:
+            if self.max_entries:
+                self._evict()
+            self.conn.close()
+
+class SavedSearch:
+    """모니터링할 검색 하나: 이름, 검색 URL, 검색 간격(초), 필터"""
+    def __init__(self, name, search_url, check_interval=600, filter=None, incremental=True):
+        self.name = name
         self.search_url = search_url
         self.check_interval = check_interval
+        self.filter = filter or CarConditionFilter()
+        self.incremental = incremental
+        self.cycle = 0
+    @classmethod
+    def from_conditions(cls, name, conditions, check_interval=600, filter=None, limit=1000, incremental=True):
+        """generate_advanced_search_url 인자(dict)로 검색 URL을 만들어 생성"""
+        search_url = set_limit_in_search_url(generate_advanced_search_url(**conditions), limit)
+        return cls(name, search_url, check_interval, filter, incremental)
+    @classmethod
+    def from_config(cls, config):
+        """{"name", "url" 또는 "conditions", "interval", "filter": {...}} 형식의 설정에서 생성"""
+        filter = create_filter(config.get('filter'))
+        interval = config.get('interval', 600)
+        incremental = config.get('incremental', True)
+        if 'conditions' in config:
+            return cls.from_conditions(config['name'], config['conditions'], interval, filter,
+                                       config.get('limit', 1000), incremental)
+        return cls(config['name'], set_limit_in_search_url(config['url'], config.get('limit', 1000)),
+                   interval, filter, incremental)
+    def known_key(self, car_id):
+        # 이름 없는 기본 검색은 기존 known_listings와 호환되도록 carId를 그대로 사용
+        return f"{self.name}:{car_id}" if self.name else car_id
+
+class CrawlScheduler:
+    """여러 검색의 실행 시각 관리.
+
+    시작 시각을 검색 간격 안에서 고르게 분산시켜 한꺼번에 크롤링하지 않게 하고,
+    이후에는 각 검색의 간격에 맞춰 고정 주기로 다시 예약한다.
+    """
+    def __init__(self, searches, start=None):
+        start = time.time() if start is None else start
+        self._heap = []
+        self._seq = 0
+        searches = list(searches)
+        spread = min((search.check_interval for search in searches), default=0)
+        for i, search in enumerate(searches):
+            self._push(start + i * spread / len(searches), search)
+    def _push(self, due, search):
+        self._seq += 1
+        heapq.heappush(self._heap, (due, self._seq, search))
+    def seconds_until_next(self, now=None):
+        if not self._heap:
+            return None
+        now = time.time() if now is None else now
+        return max(0.0, self._heap[0][0] - now)
+    def pop_due(self, now=None):
+        """지금 실행할 검색들을 꺼내고 다음 실행 시각으로 다시 예약"""
+        now = time.time() if now is None else now
+        due = []
+        while self._heap and self._heap[0][0] <= now:
+            scheduled, _, search = heapq.heappop(self._heap)
+            due.append(search)
+            next_due = scheduled + search.check_interval
+            if next_due <= now:
+                # 처리가 밀린 경우 놓친 주기는 건너뜀
+                missed = int((now - scheduled) // search.check_interval)
+                next_due = scheduled + (missed + 1) * search.check_interval
+            self._push(next_due, search)
+        return due
+
+SNAPSHOT_MAGIC = b"ENCARSN1"
+
+class EncarMonitor:
+    def __init__(self, search_url, check_interval, repo, crawler, filter, detail_workers=None,
+                 incremental=True, page_size=50, stop_after_known=20, full_resync_every=36,
+                 searches=None, detail_cache=None, metrics_file=None, fetch_policy=None, max_detail_attempts=5,
+                 snapshot_file=None, history=None):
         self.repo = repo
         self.crawler = crawler
-        self.filter = filter
-        self.known_listings = self.repo.load_known_listings()
-        self.good_cars = self.repo.load_good_cars()
+        self.detail_workers = detail_workers
+        # 여러 검색을 하나의 모니터에서 처리 (searches가 없으면 search_url 하나만 사용)
+        self.searches = list(searches) if searches else [
+            SavedSearch("", search_url, check_interval, filter, incremental)
+        ]
+        self.search_url = self.searches[0].search_url
+        self.check_interval = self.searches[0].check_interval
+        self.filter = self.searches[0].filter
+        self.scheduler = CrawlScheduler(self.searches)
+        # 증분 검색: page_size 단위로 넘기다가 확인한 매물이 연속으로 나오면 중단하고,
+        # full_resync_every 주기마다 한 번은 전체 목록을 다시 확인
+        self.page_size = page_size
+        self.stop_after_known = stop_after_known
+        self.full_resync_every = full_resync_every
+        # 여러 검색에 걸린 매물이나 다시 확인하는 매물의 상세 페이지를 다시 가져오지 않도록 결과를 보관
+        self.detail_cache = detail_cache if detail_cache is not None else DetailCache(max_entries=5000)
+        self.metrics_file = metrics_file
+        # 재시도/백오프/서킷 브레이커. 실패 시 크롤러의 호스트별 요청 속도도 줄임
+        self.fetch_policy = fetch_policy or FetchPolicy(rate_limiter=getattr(crawler, 'rate_limiter', None))
+        # 상세 조회에 실패한 매물: known 키 → (검색, 목록 정보, 실패 횟수). 다음 주기에 다시 조회
+        self.retry_queue = {}
+        self.max_detail_attempts = max_detail_attempts
+        # 목록에서 본 매물의 가격/지역/제목 변경 이력 (encar_history.ListingHistory, 선택)
+        self.history = history
+        # 확인한 매물/재시도 대기열/검색 주기를 담은 바이너리 스냅샷. 저장소와 일치하면 저장소 대신 사용
+        self.snapshot_file = snapshot_file
+        if getattr(self.repo, 'known_index', 'array') != 'array':
+            self.snapshot_file = None
+        with metrics.span("load_state"):
+            if not (self.snapshot_file and self.load_snapshot()):
+                self.known_listings = self.repo.load_known_listings()
+        # 매물마다 바로 저장하는 저장소면 조건에 맞는 차량 목록을 메모리에 쌓지 않음
+        self.keep_good_cars = not getattr(self.repo, 'persists_incrementally', False)
+        self.good_cars = self.repo.load_good_cars() if self.keep_good_cars else []
+        self.good_car_ids = ({str(car.get('carId', '')) for car in self.good_cars} if self.keep_good_cars
+                             else self.repo.good_car_ids())
+    def flush(self):
+        """저장소를 flush하고 모니터 상태 스냅샷을 저장 (주기가 끝날 때와 종료할 때)"""
+        self.repo.flush(self.known_listings, self.good_cars)
+        self.save_snapshot()
+    def save_snapshot(self):
+        """[매직][헤더 길이][JSON 헤더][KnownIdSet 바이너리] 형식으로 모니터 상태 저장"""
+        if not self.snapshot_file or not hasattr(self.known_listings, 'to_bytes'):
+            return
+        header = json.dumps({
+            'repo': self.repo.state_token(),
+            'saved_at': now_str(),
+            'cycles': {search.name: search.cycle for search in self.searches},
+            'retry_queue': [[search.name, dict(listing), attempts]
+                            for search, listing, attempts in self.retry_queue.values()],
+        }, ensure_ascii=False).encode('utf-8')
+        write_bytes_atomic(self.snapshot_file, SNAPSHOT_MAGIC + struct.pack('<I', len(header)) + header
+                           + self.known_listings.to_bytes())
+    def load_snapshot(self):
+        """스냅샷의 검색 주기/재시도 대기열을 복원하고, 저장소와 일치하면 확인한 매물까지 복원해 True"""
+        try:
+            with open(self.snapshot_file, 'rb') as f:
+                data = f.read()
+        except FileNotFoundError:
+            return False
+        try:
+            if not data.startswith(SNAPSHOT_MAGIC):
+                raise ValueError("형식이 다릅니다")
+            start = len(SNAPSHOT_MAGIC) + 4
+            (size,) = struct.unpack_from('<I', data, len(SNAPSHOT_MAGIC))
+            state = json.loads(data[start:start + size])
+            fresh = state.get('repo') == self.repo.state_token()
+            known_listings = KnownIdSet.from_bytes(memoryview(data)[start + size:]) if fresh else None
+            cycles, retry_queue = state['cycles'], state['retry_queue']
+        except (ValueError, KeyError, struct.error) as e:
+            logger.warning(f"스냅샷을 읽지 못해 저장소에서 상태를 불러옵니다 ({self.snapshot_file}): {e}")
+            return False
+        # 검색 주기와 재시도 대기열은 저장소에 없으므로 스냅샷이 오래되었어도 복원
+        searches = {search.name: search for search in self.searches}
+        for search in self.searches:
+            search.cycle = cycles.get(search.name, search.cycle)
+        for name, listing, attempts in retry_queue:
+            if name in searches:
+                self.retry_queue[searches[name].known_key(listing['id'])] = (searches[name], listing, attempts)
+        if not fresh:
+            logger.info("스냅샷 이후 저장소가 바뀌어 확인한 매물은 저장소에서 불러옵니다.")
+            return False
+        self.known_listings = known_listings
+        return True
+    @classmethod
+    def for_searches(cls, searches, repo, crawler, **options):
+        return cls(None, None, repo, crawler, None, searches=searches, **options)
+    def fetch_cycle_listings(self, search):
+        return list(self.iter_cycle_listings(search))
+    def iter_cycle_listings(self, search):
+        """이번 주기에 확인할 검색 결과를 매물 하나씩 생성 (증분 검색은 페이지를 필요할 때 가져옴)"""
+        full_resync = (
+            not search.incremental
+            or (self.full_resync_every and search.cycle % self.full_resync_every == 0)
+        )
+        query = get_search_query(search.search_url) or {}
+        if not full_resync and query.get('sort') != 'ModifiedDate':
+            logger.info("최근 수정순(ModifiedDate) 정렬이 아니어서 전체 목록을 확인합니다.")
+            full_resync = True
+        search.cycle += 1
+        if full_resync:
+            logger.info("전체 목록을 확인합니다.")
+            listings = iter(self.fetch_policy.call(self.crawler.fetch_listings, search.search_url))
+        else:
+            listings = iter_listings_incremental(
+                self.crawler, search.search_url, lambda car_id: search.known_key(car_id) in self.known_listings,
+                self.page_size, self.stop_after_known, policy=self.fetch_policy,
+            )
+        # 확인한 매물도 이력에는 기록 (가격 변경은 확인한 매물에서 생김)
+        return self.history.observe_stream(listings) if self.history is not None else listings
+    def due_retries(self, search):
+        """search에서 조회에 실패해 재시도를 기다리는 매물 목록.
+        오래된 스냅샷에서 복원되어 이미 확인한 매물이 된 항목은 여기서 대기열에서 뺀다."""
+        due = []
+        for key, (queued_search, listing, _) in list(self.retry_queue.items()):
+            if queued_search is not search:
+                continue
+            if key in self.known_listings:
+                del self.retry_queue[key]
+                continue
+            due.append(listing)
+        return due
+    def queue_retry(self, search, listing, error=None):
+        """조회에 실패한 매물을 확인한 것으로 표시하지 않고 재시도 대기열에 넣음.
+        삭제된 매물(PermanentFetchError)은 확인한 것으로 표시하고, max_detail_attempts번 실패하면 대기열에서 뺀다."""
+        key = search.known_key(listing['id'])
+        if isinstance(error, PermanentFetchError):
+            self.retry_queue.pop(key, None)
+            logger.info(f"삭제된 매물입니다: {listing['id']}")
+            # 저장소에 먼저 기록 (BloomKnownSet은 필터를 다시 만들 때 저장소의 키를 읽음)
+            self.repo.add_known_listing(key)
+            self.known_listings.add(key)
+            return
+        entry = self.retry_queue.get(key)
+        attempts = entry[2] if entry else 0
+        # 서킷 브레이커 때문에 조회하지 못한 경우는 실패 횟수에 넣지 않음
+        if not isinstance(error, CircuitOpenError):
+            attempts += 1
+        if attempts >= self.max_detail_attempts:
+            del self.retry_queue[key]
+            metrics.inc("encar_retry_dropped_total")
+            logger.warning(f"상세 조회가 {attempts}번 실패해 재시도 대기열에서 제외합니다: {listing['id']} "
+                           f"(전체 목록 확인 때 다시 발견되면 재시도)")
+            return
+        self.retry_queue[key] = (search, listing, attempts)
+    def fetch_candidate_details(self, listings, errors=None):
+        """carId 기준으로 중복을 제거해 상세 정보를 가져오고 {carId: (성능기록부, 특이사항)} 반환"""
+        details = {}
+        to_fetch = []
+        to_fetch_ids = set()
+        for listing in listings:
+            car_id = listing['id']
+            if car_id in details or car_id in to_fetch_ids:
+                continue
+            cached = self.detail_cache.get(car_id, listing_fingerprint(listing))
+            if cached is not None:
+                details[car_id] = cached
+            else:
+                to_fetch_ids.add(car_id)
+                to_fetch.append(listing)
+        if details:
+            logger.info(f"상세 정보 캐시 사용: {len(details)}개")
+        fetch_errors = {}
+        results = self.crawler.fetch_details([l['link'] for l in to_fetch], self.detail_workers,
+                                             policy=self.fetch_policy, errors=fetch_errors)
+        metrics.inc("encar_detail_cache_hits_total", len(details))
+        for i, (listing, detail) in enumerate(zip(to_fetch, results)):
+            if detail is None:
+                metrics.inc("encar_failures_total", stage="fetch_detail")
+                if errors is not None:
+                    errors[listing['id']] = fetch_errors.get(i)
+                continue
+            details[listing['id']] = detail
+            if self.detail_cache.put(listing['id'], detail, listing):
+                logger.info(f"상세 정보가 이전과 달라졌습니다: {listing['id']}")
+        return details
+    def record_result(self, search, listing, detail):
+        """상세 정보에 검색의 필터를 적용하고, 확인한 매물/조건에 맞는 차량으로 저장"""
+        item_id = listing['id']
+        performance_data, special_note = detail
+        with metrics.span("is_good_car"):
+            is_good_car = search.filter.is_good_car(performance_data, special_note, listing)
+        listing['is_good_car'] = is_good_car
+        # 여러 검색에 걸린 차량은 처음 찾은 검색으로 한 번만 저장
+        if is_good_car and item_id not in self.good_car_ids:
+            good_car = {
+                'carId': item_id,
+                'url': listing['link'],
+                'title': listing['title'],
+                'exchange': performance_data.get('교환', 999),
+                'panel': performance_data.get('판금', 999),
+                'corrosion': performance_data.get('부식', 999),
+                'special_note': special_note,
+                'price': listing.get('price', ''),
+                'region': listing.get('region', ''),
+                'check_time': now_str()
+            }
+            if search.name:
+                good_car['search'] = search.name
+            if self.keep_good_cars:
+                self.good_cars.append(good_car)
+            with metrics.span("repo_add_good_car"):
+                self.repo.add_good_car(good_car)
+            self.good_car_ids.add(item_id)
+        key = search.known_key(item_id)
+        with metrics.span("repo_add_known_listing"):
+            self.repo.add_known_listing(key)
+        self.known_listings.add(key)
+        return is_good_car
+    def _add_candidate(self, search, listing, pending_keys, candidates):
+        key = search.known_key(listing['id'])
+        if key in self.known_listings or key in pending_keys:
+            return
+        pending_keys.add(key)
+        candidates.append((search, listing))
+    def run_cycle(self, searches):
+        logger.info("=" * 50)
+        logger.info(f"매물 확인 시작: {now_str()}")
+        paused = self.fetch_policy.breaker.seconds_until_retry()
+        if paused > 0:
+            logger.warning(f"오류가 많아 조회를 멈춘 상태입니다. {paused:.0f}초 뒤에 다시 시도합니다.")
+            return []
+        self.fetch_policy.start_cycle()
+        cycle_started = time.perf_counter()
+        candidates = []
+        seen = 0
+        for search in searches:
+            if search.name:
+                logger.info(f"[{search.name}] 검색 중...")
+            pending_keys = set()
+            # 목록은 한 행씩 받아 처음 보는 매물만 남기고, 이미 확인한 매물은 바로 버림
+            try:
+                with metrics.span("fetch_listings", search=search.name or "default"):
+                    for listing in self.iter_cycle_listings(search):
+                        seen += 1
+                        self._add_candidate(search, listing, pending_keys, candidates)
+            except Exception as e:
+                logger.warning(f"매물 목록 조회 실패: {e}", extra={'fields': {'search': search.name}})
+                metrics.inc("encar_failures_total", stage="fetch_listings")
+            # 이전 주기에 상세 조회에 실패한 매물도 함께 다시 확인 (새로 받은 목록 정보를 우선)
+            for listing in self.due_retries(search):
+                self._add_candidate(search, listing, pending_keys, candidates)
+        errors = {}
+        with metrics.span("fetch_details"):
+            details = self.fetch_candidate_details([listing for _, listing in candidates], errors)
+        new_listings = []
+        good = 0
+        for search, listing in candidates:
+            detail = details.get(listing['id'])
+            if detail is None:
+                # 조회 실패한 매물은 확인한 것으로 표시하지 않고 다음 주기에 다시 시도
+                self.queue_retry(search, listing, errors.get(listing['id']))
+                continue
+            self.retry_queue.pop(search.known_key(listing['id']), None)
+            if self.record_result(search, listing, detail):
+                good += 1
+            new_listings.append(listing)
+        if new_listings:
+            logger.info(f"새로운 매물 {len(new_listings)}개가 발견되었습니다!")
+            # if self.notifier and self.email_to:
+            #     self.notifier.send(self.email_to, new_listings)
+        else:
+            logger.info("새로운 매물이 없습니다.")
+        with metrics.span("repo_flush"):
+            self.flush()
+        self.record_cycle_metrics(seen, len(candidates), len(new_listings), good,
+                                  time.perf_counter() - cycle_started)
+        if hasattr(self.crawler, 'pool'):
+            logger.info(f"드라이버 풀 상태: {self.crawler.pool.summary()}")
+        if hasattr(self.crawler, 'readiness_summary'):
+            logger.info(f"페이지 준비 시간: {self.crawler.readiness_summary()}")
+        if hasattr(self.crawler, 'stats'):
+            logger.info(f"{getattr(self.crawler, 'stats_label', '크롤러 상태')}: {self.crawler.stats}")
+        return new_listings
+    def record_cycle_metrics(self, seen, candidates, new, good, elapsed):
+        """주기별 카운터/게이지를 갱신하고, metrics_file이 있으면 Prometheus 텍스트로 저장"""
+        failed = candidates - new
+        metrics.inc("encar_cycles_total")
+        metrics.inc("encar_listings_seen_total", seen)
+        metrics.inc("encar_listings_new_total", new)
+        metrics.inc("encar_listings_good_total", good)
+        metrics.set_gauge("encar_cycle_listings_seen", seen)
+        metrics.set_gauge("encar_cycle_listings_new", new)
+        metrics.set_gauge("encar_cycle_failures", failed)
+        metrics.set_gauge("encar_cycle_seconds", round(elapsed, 3))
+        metrics.set_gauge("encar_known_listings", len(self.known_listings))
+        if hasattr(self.known_listings, 'memory_bytes'):
+            metrics.set_gauge("encar_known_listings_bytes", self.known_listings.memory_bytes())
+        metrics.set_gauge("encar_retry_queue", len(self.retry_queue))
+        pool = getattr(self.crawler, 'pool', None) or getattr(getattr(self.crawler, 'fallback', None), 'pool', None)
+        if pool is not None:
+            for name, value in pool.stats.items():
+                metrics.set_gauge("encar_driver_pool", value, stat=name)
+        logger.info("주기 완료", extra={'fields': {
+            'event': 'cycle', 'seen': seen, 'candidates': candidates, 'new': new, 'good': good,
+            'failed': failed, 'retry_queue': len(self.retry_queue), 'duration_ms': round(elapsed * 1000, 1),
+        }})
+        if failed:
+            logger.info(f"조회에 실패한 매물 {failed}개는 다음 주기에 다시 확인합니다. "
+                        f"(재시도 대기 {len(self.retry_queue)}개, 조회 정책: {self.fetch_policy.stats})")
+        if self.metrics_file:
+            metrics.write_prometheus(self.metrics_file)
+    def run_once(self):
+        """모든 검색을 한 번만 확인하고 종료 (cron 등으로 주기적으로 실행할 때)"""
+        try:
+            return self.run_cycle(self.searches)
+        finally:
+            self.close()
+    def close(self):
+        self.crawler.close()
+        self.repo.close()
+        self.detail_cache.close()
+        if self.history is not None:
+            self.history.close()
     def run(self):
-        print(f"매물 모니터링을 시작합니다.")
-        print(f"검색 URL (인코딩됨): {self.search_url}")
-        print(f"검색 간격: {self.check_interval}초")
+        logger.info(f"매물 모니터링을 시작합니다.")
+        for search in self.searches:
+            label = f"[{search.name}] " if search.name else ""
+            logger.info(f"{label}검색 URL (인코딩됨): {search.search_url}")
+            logger.info(f"{label}검색 간격: {search.check_interval}초")
         try:
             while True:
-                print("\n" + "="*50)
-                print(f"매물 확인 시작: {now_str()}")
-                new_listings = []
-                listings = self.crawler.fetch_listings(self.search_url)
-                for listing in listings:
-                    item_id = listing['id']
-                    if item_id in self.known_listings:
-                        continue
-                    performance_data, special_note = self.crawler.fetch_detail(listing['link'])
-                    is_good_car = self.filter.is_good_car(performance_data, special_note)
-                    listing['is_good_car'] = is_good_car
-                    if is_good_car:
-                        self.good_cars.append({
-                            'carId': item_id,
-                            'url': listing['link'],
-                            'title': listing['title'],
-                            'exchange': performance_data.get('교환', 999),
-                            'panel': performance_data.get('판금', 999),
-                            'corrosion': performance_data.get('부식', 999),
-                            'special_note': special_note,
-                            'price': listing.get('price', ''),
-                            'region': listing.get('region', ''),
-                            'check_time': now_str()
-                        })
-                        self.repo.save_good_cars(self.good_cars)
-                    new_listings.append(listing)
-                    self.known_listings.add(item_id)
-                if new_listings:
-                    print(f"새로운 매물 {len(new_listings)}개가 발견되었습니다!")
-                    # if self.notifier and self.email_to:
-                    #     self.notifier.send(self.email_to, new_listings)
-                else:
-                    print("새로운 매물이 없습니다.")
-                self.repo.save_known_listings(self.known_listings)
-                print(f"다음 검색 시간: {datetime.now().fromtimestamp(time.time() + self.check_interval).strftime('%Y-%m-%d %H:%M:%S')}")
-                print("="*50)
-                time.sleep(self.check_interval)
+                due = self.scheduler.pop_due()
+                if due:
+                    self.run_cycle(due)
+                    wait = self.scheduler.seconds_until_next()
+                    logger.info(f"다음 검색 시간: {datetime.fromtimestamp(time.time() + wait).strftime('%Y-%m-%d %H:%M:%S')}")
+                    logger.info("=" * 50)
+                time.sleep(self.scheduler.seconds_until_next())
         except KeyboardInterrupt:
-            print("\n모니터링을 종료합니다.")
-            self.repo.save_known_listings(self.known_listings)
-            self.repo.save_good_cars(self.good_cars)
+            logger.info("모니터링을 종료합니다.")
+            self.flush()
+        finally:
+            self.close()
 
 # main 함수 예시
 if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="엔카 매물 모니터링")
+    parser.add_argument("--backend", choices=["selenium", "http"], default="selenium",
+                        help="크롤러 백엔드 (http는 추출 실패 시 selenium으로 대체)")
+    parser.add_argument("--searches", help="여러 검색을 정의한 JSON 파일 (지정하지 않으면 아래 search_url 하나만 사용)")
+    parser.add_argument("--async", dest="use_async", action="store_true",
+                        help="목록 검색과 상세 조회가 겹쳐서 진행되는 asyncio 파이프라인으로 실행")
+    parser.add_argument("--rescore", action="store_true",
+                        help="크롤링 없이 캐시된 상세 정보에 필터를 다시 적용해 통과한 차량만 출력")
+    parser.add_argument("--price-drops", type=float, metavar="PCT",
+                        help="크롤링 없이 최근 --days일 동안 최고가 대비 PCT%% 이상 가격이 내린 매물 출력")
+    parser.add_argument("--days", type=float, default=7, help="--price-drops의 조회 기간(일)")
+    parser.add_argument("--rules", help="필터로 사용할 선언형 규칙 JSON 파일 (encar_rules.py 참고)")
+    parser.add_argument("--log-level", default="INFO", help="로그 레벨 (DEBUG로 지정하면 단계별 span도 출력)")
+    parser.add_argument("--log-format", choices=["text", "json"], default="text", help="로그 출력 형식")
+    parser.add_argument("--metrics-port", type=int, help="지정하면 이 포트의 /metrics에서 Prometheus 지표 제공")
+    parser.add_argument("--metrics-file", help="주기마다 Prometheus 텍스트 형식 지표를 저장할 파일")
+    parser.add_argument("--role", choices=["standalone", "coordinator", "worker"], default="standalone",
+                        help="coordinator: 목록 검색 후 작업 큐에 넣고 결과를 저장, worker: 자기 샤드의 상세 페이지 조회")
+    parser.add_argument("--queue", default="public/work_queue.db", help="코디네이터와 워커가 함께 쓰는 SQLite 작업 큐")
+    parser.add_argument("--shards", default="worker-1", help="코디네이터: 쉼표로 구분한 샤드(워커) 이름 목록")
+    parser.add_argument("--shard", default="worker-1", help="워커: 이 프로세스가 맡을 샤드 이름")
+    parser.add_argument("--known-index", choices=["array", "bloom"], default="array",
+                        help="확인한 매물 키를 정렬된 정수 배열로 메모리에 둘지(array), "
+                             "Bloom 필터만 두고 DB에서 확인할지(bloom)")
+    parser.add_argument("--once", action="store_true", help="모든 검색을 한 번만 확인하고 종료 (cron 등에서 실행)")
+    parser.add_argument("--data-dir", default="public", help="encar.db, good_cars.json 등을 저장할 디렉터리")
+    parser.add_argument("--snapshot", default="monitor_state.bin",
+                        help="모니터 상태 스냅샷 파일 (--data-dir 기준, 빈 문자열이면 사용하지 않음)")
+    parser.add_argument("--url", help="모니터링할 검색 URL (지정하지 않으면 아래 search_url)")
+    parser.add_argument("--detail-base-url", help="상세 페이지 주소 (대체 서버 등 다른 주소로 실행할 때)")
+    parser.add_argument("--search-api-url", help="검색 API 주소 (대체 서버 등 다른 주소로 실행할 때)")
+    parser.add_argument("--record", metavar="DIR", help="받은 목록/상세 페이지를 압축해 DIR에 기록 (encar_archive.py)")
+    parser.add_argument("--replay", metavar="DIR",
+                        help="브라우저/네트워크 없이 DIR의 기록으로 모니터를 실행 (--data-dir을 지정하지 않으면 임시 디렉터리 사용)")
+    args = parser.parse_args()
+    configure_logging(args.log_level, json_format=args.log_format == "json")
+    if args.metrics_port:
+        metrics.serve(args.metrics_port)
+    if args.replay and args.data_dir == parser.get_default("data_dir"):
+        # 재생 결과가 실제 저장소(public)를 바꾸지 않도록 새 디렉터리에서 시작
+        args.data_dir = tempfile.mkdtemp(prefix="encar-replay-")
+        logger.info(f"재생 결과를 {args.data_dir}에 저장합니다.")
+    data_path = lambda name: os.path.join(args.data_dir, name)
+    detail_cache = DetailCache(data_path("encar.db"), ttl=7 * 24 * 3600, max_entries=50000)
+    car_filter = RuleFilter.from_file(args.rules) if args.rules else CarConditionFilter()
+    if args.rescore:
+        passed = 0
+        for car_id, listing, performance_data, special_note, ok in detail_cache.reevaluate(car_filter):
+            if ok:
+                passed += 1
+                print(f"{car_id}\t{(listing or {}).get('title', '')}\t{(listing or {}).get('price', '')}\t{performance_data}")
+        print(f"캐시된 {len(detail_cache)}개 중 {passed}개가 조건을 통과했습니다.")
+        detail_cache.close()
+        raise SystemExit(0)
+    if args.price_drops is not None:
+        detail_cache.close()
+        history = ListingHistory(data_path("encar.db"))
+        drops = history.price_drops(args.price_drops / 100, days=args.days)
+        for drop in drops:
+            print(f"{drop['carId']}\t{drop['title'] or ''}\t{drop['max_price']:,}만원 → {drop['price']:,}만원"
+                  f"\t-{drop['drop']:.1%}\t{drop['region'] or ''}")
+        print(f"최근 {args.days:g}일 동안 {args.price_drops:g}% 이상 가격이 내린 매물 {len(drops)}개")
+        history.close()
+        raise SystemExit(0)
     search_url = "http://www.encar.com/dc/dc_carsearchlist.do?carType=kor#!%7B%22action%22%3A%22(And.Hidden.N._.Options.%ED%81%AC%EB%A3%A8%EC%A6%88%20%EC%BB%A8%ED%8A%B8%EB%A1%A4(%EC%96%B4%EB%8C%91%ED%8B%B0%EB%B8%8C_)._.Options.360%EB%8F%84%20%EC%96%B4%EB%9D%BC%EC%9A%B4%EB%93%9C%20%EB%B7%B0._.(C.CarType.Y._.(C.Manufacturer.%EA%B8%B0%EC%95%84._.(C.ModelGroup.%EC%8A%A4%ED%8C%85%EC%96%B4._.(C.Model.%EC%8A%A4%ED%8C%85%EC%96%B4._.BadgeGroup.%EA%B0%80%EC%86%94%EB%A6%B0%202000cc.)))))%22%2C%22toggle%22%3A%7B%7D%2C%22layer%22%3A%22%22%2C%22sort%22%3A%22ModifiedDate%22%2C%22page%22%3A1%2C%22limit%22%3A%22300%22%2C%22searchKey%22%3A%22%22%2C%22loginCheck%22%3Afalse%7D"
-    search_url = set_limit_in_search_url(search_url, 1000)
+    search_url = set_limit_in_search_url(args.url or search_url, 1000)
     check_interval = 600
-    repo = CarListingRepository("public/known_listings.json", "public/good_cars.json")
-    crawler = EncarCrawler()
-    filter = CarConditionFilter()
+    crawler_options = {key: value for key, value in (('detail_base_url', args.detail_base_url),
+                                                      ('search_api_url', args.search_api_url)) if value}
+    if args.record:
+        from encar_archive import PageArchive
+        crawler_options['archive'] = PageArchive(args.record)
+    if args.role == "worker":
+        from encar_shard import DetailWorker, WorkQueue
+        # 워커마다 상세 정보 캐시 파일을 따로 둠 (같은 호스트의 워커끼리 쓰기 경합을 줄임)
+        worker_cache = DetailCache(data_path(f"detail_cache_{args.shard}.db"), ttl=7 * 24 * 3600, max_entries=50000)
+        detail_cache.close()
+        worker_crawler = create_crawler(args.backend, pool_size=3, min_request_interval=1.0, **crawler_options)
+        DetailWorker(WorkQueue(args.queue), worker_crawler, args.shard, detail_workers=3, detail_cache=worker_cache).run()
+        raise SystemExit(0)
+    repo = SqliteListingRepository(data_path("encar.db"), data_path("good_cars.json"),
+                                   migrate_from=data_path("known_listings.json"), known_index=args.known_index,
+                                   feed_dir=data_path("feed"))
+    fetch_policy = None
+    if args.replay:
+        from encar_archive import PageArchive, ReplayCrawler, replay, replay_fetch_policy
+        crawler = ReplayCrawler(PageArchive(args.replay))
+        fetch_policy = replay_fetch_policy()
+    else:
+        crawler = create_crawler(args.backend, pool_size=3, max_pages_per_driver=50, min_request_interval=1.0,
+                                 **crawler_options)
+    snapshot_file = data_path(args.snapshot) if args.snapshot and not args.replay else None
+    history = ListingHistory(data_path("encar.db"))
     
-    monitor = EncarMonitor(search_url, check_interval, repo, crawler, filter)
-    monitor.run() 
\ No newline at end of file
+    if args.searches:
+        with open(args.searches, 'r', encoding='utf-8') as f:
+            searches = [SavedSearch.from_config(config) for config in json.load(f)]
+        monitor = EncarMonitor.for_searches(searches, repo, crawler, detail_workers=3, detail_cache=detail_cache,
+                                            metrics_file=args.metrics_file, snapshot_file=snapshot_file, history=history,
+                                            fetch_policy=fetch_policy)
+    else:
+        monitor = EncarMonitor(search_url, check_interval, repo, crawler, car_filter, detail_workers=3,
+                               detail_cache=detail_cache, metrics_file=args.metrics_file, snapshot_file=snapshot_file,
+                               history=history, fetch_policy=fetch_policy)
+    if args.role == "coordinator":
+        from encar_shard import Coordinator, HashRing, WorkQueue
+        Coordinator(monitor, WorkQueue(args.queue), HashRing(args.shards.split(","))).run()
+    elif args.replay:
+        try:
+            replay(monitor, crawler)
+        finally:
+            monitor.close()
+    elif args.once:
+        monitor.run_once()
+    elif args.use_async:
+        from encar_async_monitor import AsyncEncarMonitor
+        AsyncEncarMonitor(monitor, detail_workers=3).run()
+    else:
+        monitor.run() 
\ No newline at end of file
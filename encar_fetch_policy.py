@@ -0,0 +1,186 @@
+"""
+페이지 조회 정책: 재시도(지수 백오프 + jitter), 주기별 재시도 예산, 서킷 브레이커
+
+    policy = FetchPolicy(rate_limiter=crawler.rate_limiter)
+    policy.start_cycle()
+    detail = policy.call(crawler.fetch_detail, url)
+
+일시적인 오류는 백오프 후 다시 시도하고, 재시도 예산을 다 쓰거나 최대 시도 횟수를 넘기면
+예외를 그대로 올려 호출한 쪽(모니터)이 매물을 재시도 대기열에 넣게 한다. 최근 요청의 실패
+비율이 높아지면 서킷 브레이커가 열려 cooldown 동안 요청을 보내지 않고 CircuitOpenError를 낸다.
+"""
+import random
+import threading
+import time
+from collections import deque
+
+from encar_metrics import logger, metrics
+
+class FetchError(Exception):
+    """페이지를 가져오거나 필요한 영역을 찾지 못한 경우"""
+
+class IncompleteDetailError(FetchError):
+    """상세 페이지에서 성능기록부/차량이력 영역을 하나도 찾지 못함 (로딩 실패로 보고 재시도)"""
+
+class PermanentFetchError(FetchError):
+    """삭제된 매물(404 등)처럼 다시 시도해도 소용없는 실패"""
+
+class CircuitOpenError(FetchError):
+    """서킷 브레이커가 열려 있어 요청을 보내지 않음"""
+
+def backoff_delay(attempt, base=1.0, cap=30.0, rng=random):
+    """attempt번째 재시도 전 대기 시간: [0, min(cap, base * 2^attempt)] 범위의 무작위 값 (full jitter)"""
+    return rng.uniform(0, min(cap, base * (2 ** attempt)))
+
+class RetryBudget:
+    """한 모니터링 주기 동안 쓸 수 있는 재시도 횟수"""
+    def __init__(self, per_cycle=20):
+        self.per_cycle = per_cycle
+        self.remaining = per_cycle
+        self._lock = threading.Lock()
+    def reset(self):
+        with self._lock:
+            self.remaining = self.per_cycle
+    def try_spend(self):
+        with self._lock:
+            if self.remaining <= 0:
+                return False
+            self.remaining -= 1
+            return True
+
+class CircuitBreaker:
+    """최근 window개 요청 중 실패 비율이 failure_ratio 이상이면 cooldown(초) 동안 열림.
+
+    cooldown이 지나면 half-open 상태에서 요청 하나만 통과시켜, 성공하면 닫고 실패하면 다시 연다.
+    """
+    CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+    def __init__(self, failure_ratio=0.5, window=20, min_calls=10, cooldown=60.0, clock=time.monotonic):
+        self.failure_ratio = failure_ratio
+        self.min_calls = min_calls
+        self.cooldown = cooldown
+        self.clock = clock
+        self.state = self.CLOSED
+        self.opened_at = None
+        self.outcomes = deque(maxlen=window)
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+    def _set_state(self, state):
+        self.state = state
+        metrics.set_gauge("encar_circuit_open", int(state != self.CLOSED))
+    def allow(self):
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.OPEN:
+                if self.clock() - self.opened_at < self.cooldown:
+                    return False
+                self._set_state(self.HALF_OPEN)
+                self._trial_in_flight = False
+            if self._trial_in_flight:
+                return False
+            self._trial_in_flight = True
+            return True
+    def seconds_until_retry(self):
+        with self._lock:
+            if self.state != self.OPEN:
+                return 0.0
+            return max(0.0, self.cooldown - (self.clock() - self.opened_at))
+    def release(self):
+        """결과를 기록하지 못하고 끝난 요청(KeyboardInterrupt, 작업 취소 등). half-open 시험 요청 자리를 풀어 줌"""
+        with self._lock:
+            self._trial_in_flight = False
+    def record(self, success):
+        with self._lock:
+            if self.state == self.HALF_OPEN:
+                self._trial_in_flight = False
+                if success:
+                    self.outcomes.clear()
+                    self._set_state(self.CLOSED)
+                    logger.info("서킷 브레이커를 닫고 조회를 다시 시작합니다.")
+                else:
+                    self.opened_at = self.clock()
+                    self._set_state(self.OPEN)
+                return
+            self.outcomes.append(success)
+            failures = self.outcomes.count(False)
+            if (self.state == self.CLOSED and len(self.outcomes) >= self.min_calls
+                    and failures / len(self.outcomes) >= self.failure_ratio):
+                self.opened_at = self.clock()
+                self._set_state(self.OPEN)
+                metrics.inc("encar_circuit_opened_total")
+                logger.warning(f"최근 요청 {len(self.outcomes)}개 중 {failures}개가 실패해 "
+                               f"{self.cooldown:.0f}초 동안 조회를 멈춥니다.",
+                               extra={'fields': {'event': 'circuit_open', 'failures': failures}})
+
+class FetchPolicy:
+    """재시도/백오프/재시도 예산/서킷 브레이커를 적용해 조회 함수를 호출"""
+    def __init__(self, max_attempts=3, base_delay=1.0, max_delay=30.0, retries_per_cycle=20,
+                 breaker=None, rate_limiter=None, slow_threshold=10.0, sleep=time.sleep, rng=None):
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.budget = RetryBudget(retries_per_cycle)
+        self.breaker = breaker or CircuitBreaker()
+        # penalize(url)/reward(url)을 지원하는 속도 제한기 (HostRateLimiter)
+        self.rate_limiter = rate_limiter
+        self.slow_threshold = slow_threshold
+        self.sleep = sleep
+        self.rng = rng or random.Random()
+        self.stats = {'calls': 0, 'retries': 0, 'failures': 0, 'rejected': 0, 'budget_exhausted': 0}
+        self._lock = threading.Lock()
+    def _count(self, key):
+        with self._lock:
+            self.stats[key] += 1
+    def start_cycle(self):
+        self.budget.reset()
+    def _adapt(self, url, ok, elapsed):
+        if self.rate_limiter is None:
+            return
+        if not ok or elapsed > self.slow_threshold:
+            self.rate_limiter.penalize(url)
+        else:
+            self.rate_limiter.reward(url)
+    def call(self, fetch, url):
+        self._count('calls')
+        attempt = 0
+        while True:
+            if not self.breaker.allow():
+                self._count('rejected')
+                raise CircuitOpenError(f"서킷 브레이커가 열려 있어 조회하지 않습니다: {url}")
+            started = time.monotonic()
+            try:
+                result = fetch(url)
+            except PermanentFetchError:
+                # 사이트는 정상 응답했으므로 브레이커에는 성공으로 기록
+                self.breaker.record(True)
+                raise
+            except Exception as e:
+                elapsed = time.monotonic() - started
+                self.breaker.record(False)
+                self._adapt(url, False, elapsed)
+                attempt += 1
+                if attempt >= self.max_attempts or isinstance(e, CircuitOpenError):
+                    self._count('failures')
+                    raise
+                if not self.budget.try_spend():
+                    self._count('budget_exhausted')
+                    self._count('failures')
+                    logger.warning(f"이번 주기의 재시도 예산을 모두 사용했습니다: {url}")
+                    raise
+                delay = backoff_delay(attempt, self.base_delay, self.max_delay, self.rng)
+                self._count('retries')
+                metrics.inc("encar_retries_total", reason="backoff")
+                logger.info(f"조회 실패, {delay:.1f}초 후 다시 시도합니다 ({attempt}/{self.max_attempts - 1}): {e}",
+                            extra={'fields': {'url': url, 'attempt': attempt}})
+                self.sleep(delay)
+                continue
+            except BaseException:
+                # 성공/실패를 기록하지 않으면 half-open 상태의 브레이커가 다음 시험 요청을 막음
+                self.breaker.release()
+                raise
+            elapsed = time.monotonic() - started
+            self.breaker.record(True)
+            self._adapt(url, True, elapsed)
+            return result
+    def wrap(self, fetch):
+        return lambda url: self.call(fetch, url)
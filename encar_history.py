@@ -0,0 +1,168 @@
+"""
+매물 가격/목록 정보 이력 (시계열)
+
+목록 검색에서 본 모든 매물의 (carId, 시각, 가격, 지역, 제목)을 기록한다. 변하지 않은 행은
+기록하지 않고, 매물별 현재 상태(listing_state)와 비교해 달라진 경우에만 price_history에
+한 행을 추가한다(delta). 가격은 만원 단위 정수로 저장한다.
+
+    history = ListingHistory("public/encar.db")
+    for listing in history.observe_stream(listings):
+        ...
+    history.price_drops(min_drop=0.1, days=7)   # 최근 7일 동안 10% 이상 가격이 내린 매물
+
+이벤트 종류:
+    new       처음 본 매물
+    price     가격 변경 (prev_price에 이전 가격)
+    info      제목/지역 변경
+    relisted  relist_after(초) 이상 보이지 않다가 다시 나타난 매물
+"""
+import os
+import sqlite3
+import threading
+import time
+
+from encar_metrics import logger, metrics
+from encar_rules import parse_price
+
+# SQLite 변수 개수 제한(999)보다 작게 나누어 조회
+_CHUNK = 500
+
+class ListingHistory:
+    def __init__(self, db_file, relist_after=3 * 24 * 3600, touch_interval=6 * 3600, batch_size=500):
+        self.relist_after = relist_after
+        # last_seen은 touch_interval마다 한 번만 갱신 (변하지 않은 매물은 대부분 기록하지 않음)
+        self.touch_interval = touch_interval
+        self.batch_size = batch_size
+        if db_file != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(db_file)), exist_ok=True)
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(db_file, check_same_thread=False, isolation_level=None)
+        if db_file != ":memory:":
+            self.conn.execute("PRAGMA journal_mode=WAL")
+            self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS listing_state ("
+            " car_id TEXT PRIMARY KEY, price INTEGER, region TEXT, title TEXT,"
+            " first_seen REAL NOT NULL, last_seen REAL NOT NULL, last_change REAL NOT NULL) WITHOUT ROWID"
+        )
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS price_history ("
+            " car_id TEXT NOT NULL, observed_at REAL NOT NULL, event TEXT NOT NULL,"
+            " price INTEGER, prev_price INTEGER, region TEXT, title TEXT,"
+            " PRIMARY KEY (car_id, observed_at, event)) WITHOUT ROWID"
+        )
+        # 가격 변경 행만 담는 부분 인덱스: 기간 내 가격 변경 조회가 전체 이력을 훑지 않음
+        self.conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_price_changes ON price_history (observed_at, car_id)"
+            " WHERE prev_price IS NOT NULL"
+        )
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_price_history_time ON price_history (observed_at)")
+        self.stats = {'observed': 0, 'unchanged': 0, 'new': 0, 'price': 0, 'info': 0, 'relisted': 0}
+    def observe(self, listings, now=None):
+        """목록 행들을 기록하고 이벤트 목록 [(carId, 종류, 이전 가격, 새 가격)]을 반환"""
+        now = time.time() if now is None else now
+        rows = {}
+        for listing in listings:
+            rows[str(listing['id'])] = (parse_price(listing.get('price')), listing.get('region') or None,
+                                        listing.get('title') or None)
+        events = []
+        ids = list(rows)
+        for start in range(0, len(ids), _CHUNK):
+            events += self._observe_chunk({car_id: rows[car_id] for car_id in ids[start:start + _CHUNK]}, now)
+        return events
+    def _observe_chunk(self, rows, now):
+        placeholders = ",".join("?" * len(rows))
+        inserts, new_states, updates, touches, events = [], [], [], [], []
+        with self._lock, self.conn:
+            self.conn.execute("BEGIN")
+            current = {row[0]: row[1:] for row in self.conn.execute(
+                f"SELECT car_id, price, region, title, last_seen FROM listing_state WHERE car_id IN ({placeholders})",
+                list(rows),
+            )}
+            for car_id, (price, region, title) in rows.items():
+                self.stats['observed'] += 1
+                state = current.get(car_id)
+                if state is None:
+                    inserts.append((car_id, now, 'new', price, None, region, title))
+                    new_states.append((car_id, price, region, title, now, now, now))
+                    events.append((car_id, 'new', None, price))
+                    continue
+                old_price, old_region, old_title, last_seen = state
+                kinds = []
+                if now - last_seen >= self.relist_after:
+                    kinds.append(('relisted', None))
+                # 가격이 빠진 행(가격 미표기)은 가격 변경으로 보지 않음
+                if price is not None and price != old_price:
+                    kinds.append(('price', old_price))
+                if (region, title) != (old_region, old_title):
+                    kinds.append(('info', None))
+                if not kinds:
+                    self.stats['unchanged'] += 1
+                    if now - last_seen >= self.touch_interval:
+                        touches.append((now, car_id))
+                    continue
+                for kind, prev_price in kinds:
+                    inserts.append((car_id, now, kind, price, prev_price, region, title))
+                    events.append((car_id, kind, old_price, price))
+                updates.append((price if price is not None else old_price, region, title, now, now, car_id))
+            self.conn.executemany(
+                "INSERT OR IGNORE INTO price_history (car_id, observed_at, event, price, prev_price, region, title)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?)", inserts,
+            )
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO listing_state (car_id, price, region, title, first_seen, last_seen, last_change)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?)", new_states,
+            )
+            self.conn.executemany(
+                "UPDATE listing_state SET price = ?, region = ?, title = ?, last_seen = ?, last_change = ?"
+                " WHERE car_id = ?", updates,
+            )
+            self.conn.executemany("UPDATE listing_state SET last_seen = ? WHERE car_id = ?", touches)
+        for car_id, kind, old_price, price in events:
+            self.stats[kind] += 1
+            metrics.inc("encar_listing_events_total", event=kind)
+            if kind == 'price' and old_price and price < old_price:
+                logger.info(f"가격 인하: {car_id} {old_price:,}만원 → {price:,}만원",
+                            extra={'fields': {'event': 'price_drop', 'car_id': car_id,
+                                              'old_price': old_price, 'price': price}})
+        return events
+    def observe_stream(self, listings, now=None):
+        """목록을 그대로 넘겨주면서 batch_size개씩 모아 기록 (중간에 멈춰도 받은 행까지 기록)"""
+        batch = []
+        try:
+            for listing in listings:
+                batch.append(listing)
+                if len(batch) >= self.batch_size:
+                    self.observe(batch, now)
+                    batch = []
+                yield listing
+        finally:
+            if batch:
+                self.observe(batch, now)
+    def price_drops(self, min_drop=0.1, days=7, now=None):
+        """최근 days일 동안의 최고가 대비 현재 가격이 min_drop 비율 이상 내린 매물 (내림 폭이 큰 순)"""
+        now = time.time() if now is None else now
+        since = now - days * 24 * 3600
+        with self._lock:
+            rows = self.conn.execute(
+                "SELECT h.car_id, MAX(MAX(h.price), MAX(h.prev_price)) AS ref_price, s.price, s.title, s.region,"
+                " MAX(h.observed_at)"
+                " FROM price_history h INDEXED BY idx_price_changes JOIN listing_state s ON s.car_id = h.car_id"
+                " WHERE h.observed_at >= ? AND h.prev_price IS NOT NULL"
+                " GROUP BY h.car_id HAVING s.price <= ref_price * (1 - ?)"
+                " ORDER BY 1.0 * (ref_price - s.price) / ref_price DESC",
+                (since, min_drop),
+            ).fetchall()
+        return [{'carId': car_id, 'max_price': ref_price, 'price': price, 'title': title, 'region': region,
+                 'drop': round((ref_price - price) / ref_price, 4), 'changed_at': changed_at}
+                for car_id, ref_price, price, title, region, changed_at in rows]
+    def history(self, car_id):
+        """carId의 이력 [(시각, 이벤트, 가격, 이전 가격, 지역, 제목)]"""
+        with self._lock:
+            return self.conn.execute(
+                "SELECT observed_at, event, price, prev_price, region, title FROM price_history"
+                " WHERE car_id = ? ORDER BY observed_at", (str(car_id),),
+            ).fetchall()
+    def close(self):
+        with self._lock:
+            self.conn.close()
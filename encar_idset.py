@@ -0,0 +1,214 @@
+"""
+확인한 매물 키를 적은 메모리로 보관하는 집합
+
+known_listings 키("38123456" 또는 "검색이름:38123456")를 64비트 정수 하나로 바꿔 정렬된
+array('q')에 저장한다(KnownIdSet). 문자열 set보다 키당 메모리가 훨씬 작고, 새로 추가한 키는 작은
+버퍼(set)에 모았다가 한꺼번에 병합한다.
+
+키를 메모리에 두지 않으려면 BloomKnownSet을 쓴다. 키당 약 1.2바이트의 Bloom 필터로 없는 키를
+걸러내고, 있을 수도 있는 키만 정확한 저장소(SQLite 등)에서 확인한다.
+
+    known = KnownIdSet.from_keys(repo_keys)
+    known = BloomKnownSet(repo.is_known, repo_keys)
+    if key not in known:
+        known.add(key)
+"""
+import hashlib
+import heapq
+import json
+import math
+import struct
+import sys
+import zlib
+from array import array
+from bisect import bisect_left
+
+# 숫자가 아닌 키를 위한 보조 저장소로 보낼 때 쓰는 표시
+_NOT_NUMERIC = None
+_ID_BITS = 32
+_ID_MASK = (1 << _ID_BITS) - 1
+
+def _namespace_code(name):
+    # 부호 있는 64비트 범위를 넘지 않도록 31비트만 사용
+    return (zlib.crc32(name.encode('utf-8')) & 0x7FFFFFFF) or 1
+
+class BloomFilter:
+    """정수 키용 Bloom 필터 (거짓 양성만 있고 거짓 음성은 없음)"""
+    def __init__(self, capacity, error_rate=0.01):
+        self.capacity = max(1, capacity)
+        self.bits = max(64, int(-self.capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.hashes = max(1, round(self.bits / self.capacity * math.log(2)))
+        self.array = bytearray((self.bits + 7) // 8)
+        self.count = 0
+    def _positions(self, value):
+        # 64비트 곱셈 해시 두 개로 k개의 위치를 만든다 (double hashing)
+        h1 = (value * 0x9E3779B97F4A7C15) & 0xFFFFFFFFFFFFFFFF
+        h2 = ((value ^ (value >> 29)) * 0xBF58476D1CE4E5B9) & 0xFFFFFFFFFFFFFFFF | 1
+        bits = self.bits
+        return [(h1 + i * h2) % bits for i in range(self.hashes)]
+    def add(self, value):
+        for pos in self._positions(value):
+            self.array[pos >> 3] |= 1 << (pos & 7)
+        self.count += 1
+    def __contains__(self, value):
+        data = self.array
+        return all(data[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(value))
+
+class KnownIdSet:
+    """known_listings용 정수 키 집합. set처럼 in, add, update, len, iter를 지원한다"""
+    def __init__(self, buffer_size=4096):
+        self._sorted = array('q')
+        self._buffer = set()
+        self._buffer_size = buffer_size
+        # 정수로 바꿀 수 없는 키 (거의 없음)
+        self._other = set()
+        # 네임스페이스 코드 → 검색 이름 (키를 문자열로 되돌릴 때 사용)
+        self._namespaces = {}
+    @classmethod
+    def from_keys(cls, keys):
+        """키를 한 번에 읽어 정렬 (시작할 때 저장소에서 불러오는 용도)"""
+        known = cls()
+        values = array('q')
+        for key in keys:
+            value = known._encode(key)
+            if value is _NOT_NUMERIC:
+                known._other.add(key)
+            else:
+                values.append(value)
+        known._sorted = array('q', sorted(set(values)))
+        return known
+    def _encode(self, key, register=True):
+        name, sep, car_id = key.rpartition(':')
+        if not car_id.isdigit() or int(car_id) > _ID_MASK:
+            return _NOT_NUMERIC
+        if not sep:
+            return int(car_id)
+        code = _namespace_code(name)
+        known_name = self._namespaces.get(code)
+        if known_name is None:
+            if not register:
+                # 처음 보는 이름이면 정수 키로 저장된 적이 없으므로 보조 저장소만 확인
+                return _NOT_NUMERIC
+            self._namespaces[code] = name
+        elif known_name != name:
+            # 이름의 CRC가 겹치는 경우(매우 드묾)는 보조 저장소로
+            return _NOT_NUMERIC
+        return (code << _ID_BITS) | int(car_id)
+    def _decode(self, value):
+        code, car_id = value >> _ID_BITS, value & _ID_MASK
+        return f"{self._namespaces[code]}:{car_id}" if code else str(car_id)
+    def _merge(self):
+        self._sorted = array('q', heapq.merge(self._sorted, sorted(self._buffer)))
+        self._buffer.clear()
+    def _contains_value(self, value):
+        if value in self._buffer:
+            return True
+        i = bisect_left(self._sorted, value)
+        return i < len(self._sorted) and self._sorted[i] == value
+    def __contains__(self, key):
+        value = self._encode(key, register=False)
+        if value is _NOT_NUMERIC:
+            return key in self._other
+        return self._contains_value(value)
+    def add(self, key):
+        value = self._encode(key)
+        if value is _NOT_NUMERIC:
+            self._other.add(key)
+            return
+        if self._contains_value(value):
+            return
+        self._buffer.add(value)
+        if len(self._buffer) >= self._buffer_size:
+            self._merge()
+    def update(self, keys):
+        for key in keys:
+            self.add(key)
+    def discard(self, key):
+        value = self._encode(key, register=False)
+        if value is _NOT_NUMERIC:
+            self._other.discard(key)
+            return
+        self._buffer.discard(value)
+        i = bisect_left(self._sorted, value)
+        if i < len(self._sorted) and self._sorted[i] == value:
+            del self._sorted[i]
+    def __len__(self):
+        return len(self._sorted) + len(self._buffer) + len(self._other)
+    def __iter__(self):
+        for value in self._sorted:
+            yield self._decode(value)
+        for value in list(self._buffer):
+            yield self._decode(value)
+        yield from list(self._other)
+    def memory_bytes(self):
+        """키 저장에 쓰는 대략적인 바이트 수"""
+        return self._sorted.itemsize * len(self._sorted) + 40 * len(self._buffer)
+    def to_bytes(self):
+        """[헤더 길이][JSON 헤더][정렬 배열] 형식의 바이너리. from_bytes로 키를 다시 파싱하지 않고 복원"""
+        if self._buffer:
+            self._merge()
+        header = json.dumps({
+            'byteorder': sys.byteorder,
+            'namespaces': {str(code): name for code, name in self._namespaces.items()},
+            'other': sorted(self._other),
+        }, ensure_ascii=False).encode('utf-8')
+        return struct.pack('<I', len(header)) + header + self._sorted.tobytes()
+    @classmethod
+    def from_bytes(cls, data):
+        data = memoryview(data)
+        (size,) = struct.unpack_from('<I', data)
+        header = json.loads(bytes(data[4:4 + size]))
+        known = cls()
+        known._sorted.frombytes(data[4 + size:])
+        if header['byteorder'] != sys.byteorder:
+            known._sorted.byteswap()
+        known._namespaces = {int(code): name for code, name in header['namespaces'].items()}
+        known._other = set(header['other'])
+        return known
+
+def _key_hash(key):
+    return int.from_bytes(hashlib.blake2b(key.encode('utf-8'), digest_size=8).digest(), 'little')
+
+class BloomKnownSet:
+    """Bloom 필터 + 정확한 저장소. exact_contains(key)는 필터를 통과한 키에만 호출된다.
+
+    키는 저장소에 따로 기록해야 한다(add는 필터만 갱신하므로 저장소에 먼저 기록한 뒤 호출).
+    필터가 capacity를 넘으면 iter_keys()로 저장소의 키를 다시 읽어 두 배 크기로 만든다.
+    keys는 한 번만 순회하므로 저장소 커서를 그대로 넘겨도 되고, 키 수를 알면 capacity로 알려 준다.
+    """
+    def __init__(self, exact_contains, keys=(), iter_keys=None, capacity=100000, error_rate=0.01):
+        self.exact_contains = exact_contains
+        self.iter_keys = iter_keys
+        self.error_rate = error_rate
+        self.stats = {'filtered': 0, 'exact_lookups': 0}
+        self._build(keys, capacity)
+        if self._bloom.count > self._bloom.capacity and iter_keys is not None:
+            # capacity보다 키가 많았으면 실제 키 수의 두 배 크기로 다시 만듦
+            self._build(iter_keys(), 2 * self._bloom.count)
+    def _build(self, keys, capacity):
+        self._bloom = BloomFilter(capacity, self.error_rate)
+        for key in keys:
+            self._bloom.add(_key_hash(key))
+    def __contains__(self, key):
+        if _key_hash(key) not in self._bloom:
+            self.stats['filtered'] += 1
+            return False
+        self.stats['exact_lookups'] += 1
+        return self.exact_contains(key)
+    def add(self, key):
+        value = _key_hash(key)
+        self._bloom.add(value)
+        if self._bloom.count > self._bloom.capacity and self.iter_keys is not None:
+            self._build(self.iter_keys(), 2 * self._bloom.capacity)
+            # 저장소에 아직 기록되지 않은 키도 잃지 않도록 다시 추가
+            if value not in self._bloom:
+                self._bloom.add(value)
+    def update(self, keys):
+        for key in keys:
+            self.add(key)
+    def __len__(self):
+        return self._bloom.count
+    def __iter__(self):
+        return iter(self.iter_keys()) if self.iter_keys is not None else iter(())
+    def memory_bytes(self):
+        return len(self._bloom.array)
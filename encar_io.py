@@ -0,0 +1,70 @@
+"""
+파일 저장 도우미: 임시 파일에 쓴 뒤 os.replace로 교체하는 원자적 저장과 그때 쓸 파일 권한
+
+    from encar_io import write_json_atomic
+    write_json_atomic("good_cars.json", {'cars': cars}, ensure_ascii=False)
+"""
+import json
+import os
+import tempfile
+import threading
+
+_umask_lock = threading.Lock()
+_umask_value = None
+
+def _read_umask():
+    # 리눅스는 /proc에서 바꾸지 않고 읽을 수 있음
+    try:
+        with open("/proc/self/status", 'r', encoding='ascii') as f:
+            for line in f:
+                if line.startswith("Umask:"):
+                    return int(line.split()[1], 8)
+    except (OSError, ValueError, IndexError):
+        pass
+    # 그 밖에는 바꿔서 읽고 바로 되돌림 (처음 한 번만, 잠금 안에서)
+    value = os.umask(0)
+    os.umask(value)
+    return value
+
+def process_umask():
+    """프로세스 umask. 처음 필요할 때 한 번만 읽어 둔다."""
+    global _umask_value
+    if _umask_value is None:
+        with _umask_lock:
+            if _umask_value is None:
+                _umask_value = _read_umask()
+    return _umask_value
+
+def new_file_mode(path):
+    """원자적 저장으로 path를 교체할 때 쓸 권한: 기존 파일이 있으면 그 권한, 없으면 open()과 같은 0o666 & ~umask.
+    mkstemp의 임시 파일은 0600이라 그대로 교체하면 웹 서버 등 다른 사용자가 읽지 못한다."""
+    try:
+        return os.stat(path).st_mode & 0o7777
+    except FileNotFoundError:
+        return 0o666 & ~process_umask()
+
+def write_json_atomic(path, data, **dump_kwargs):
+    """임시 파일에 쓴 뒤 os.replace로 교체하여, 쓰는 도중 종료되어도 기존 파일이 깨지지 않게 저장"""
+    _write_atomic(path, ".json", 'w', lambda f: json.dump(data, f, **dump_kwargs))
+
+def write_bytes_atomic(path, data):
+    _write_atomic(path, ".bin", 'wb', lambda f: f.write(data))
+
+def write_text_atomic(path, text, suffix=".txt"):
+    _write_atomic(path, suffix, 'w', lambda f: f.write(text))
+
+def _write_atomic(path, suffix, mode, write):
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(prefix=".tmp-", suffix=suffix, dir=directory)
+    try:
+        with os.fdopen(fd, mode, **({} if 'b' in mode else {'encoding': 'utf-8'})) as f:
+            write(f)
+            f.flush()
+            os.fchmod(f.fileno(), new_file_mode(path))
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
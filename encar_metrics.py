@@ -0,0 +1,239 @@
+"""
+모니터 단계별 계측: 타이밍 span, 카운터/게이지/히스토그램, Prometheus 텍스트 출력, JSON 로그
+
+    from encar_metrics import metrics
+    with metrics.span("driver_get", page="detail"):
+        driver.get(url)
+    metrics.inc("encar_listings_seen_total", len(listings))
+    print(metrics.render_prometheus())
+"""
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+from encar_io import write_text_atomic
+
+logger = logging.getLogger("encar")
+
+class LatencyHistogram:
+    """지연 시간(초) 분포를 버킷으로 기록"""
+    BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2, 3, 5, 8, 13, 20, 30)
+    def __init__(self, buckets=BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+        self._lock = threading.Lock()
+    def observe(self, value):
+        idx = len(self.buckets)
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                idx = i
+                break
+        with self._lock:
+            self.counts[idx] += 1
+            self.count += 1
+            self.sum += value
+            self.max = max(self.max, value)
+    def quantile(self, q):
+        """버킷 상한 기준의 근사 분위수"""
+        with self._lock:
+            if not self.count:
+                return 0.0
+            target = q * self.count
+            seen = 0
+            for i, c in enumerate(self.counts):
+                seen += c
+                if seen >= target:
+                    return self.buckets[i] if i < len(self.buckets) else self.max
+            return self.max
+    def cumulative_counts(self):
+        with self._lock:
+            total = 0
+            result = []
+            for bound, c in zip(self.buckets + (float('inf'),), self.counts):
+                total += c
+                result.append((bound, total))
+            return result
+    def summary(self):
+        return {
+            'count': self.count,
+            'avg': round(self.sum / self.count, 3) if self.count else 0.0,
+            'p50': self.quantile(0.5),
+            'p95': self.quantile(0.95),
+            'max': round(self.max, 3),
+        }
+
+def _label_key(labels):
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+def _escape(value):
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def _format_labels(key, extra=()):
+    pairs = list(key) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in pairs) + "}"
+
+# 파싱처럼 밀리초 단위로 끝나는 단계도 구분할 수 있도록 span용 버킷은 더 촘촘하게
+STAGE_BUCKETS = (0.001, 0.005, 0.01, 0.025) + LatencyHistogram.BUCKETS
+
+class Metrics:
+    """카운터, 게이지, 히스토그램 모음 (스레드 안전)"""
+    def __init__(self, help_texts=None, buckets=None):
+        self._lock = threading.Lock()
+        self.counters = {}
+        self.gauges = {}
+        self.histograms = {}
+        self.help = dict(help_texts or {})
+        self.buckets = dict(buckets or {})
+    def describe(self, name, text):
+        self.help[name] = text
+    def inc(self, name, value=1, **labels):
+        key = (name, _label_key(labels))
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+    def set_gauge(self, name, value, **labels):
+        with self._lock:
+            self.gauges[(name, _label_key(labels))] = value
+    def observe(self, name, value, **labels):
+        key = (name, _label_key(labels))
+        with self._lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = LatencyHistogram(self.buckets.get(name, LatencyHistogram.BUCKETS))
+        histogram.observe(value)
+    def counter_value(self, name, **labels):
+        with self._lock:
+            return self.counters.get((name, _label_key(labels)), 0)
+    @contextmanager
+    def span(self, stage, **labels):
+        """블록 실행 시간을 encar_stage_seconds{stage=...} 히스토그램에 기록하고 DEBUG 로그로 남김"""
+        started = time.perf_counter()
+        error = None
+        try:
+            yield
+        except BaseException as e:
+            error = type(e).__name__
+            raise
+        finally:
+            elapsed = time.perf_counter() - started
+            self.observe("encar_stage_seconds", elapsed, stage=stage, **labels)
+            if error:
+                self.inc("encar_stage_errors_total", stage=stage, **labels)
+            if logger.isEnabledFor(logging.DEBUG):
+                fields = dict(labels, span=stage, duration_ms=round(elapsed * 1000, 2))
+                if error:
+                    fields['error'] = error
+                logger.debug("span", extra={'fields': fields})
+    def render_prometheus(self):
+        """Prometheus 텍스트 형식(0.0.4)으로 출력"""
+        lines = []
+        described = set()
+        def header(name, kind):
+            if name in described:
+                return
+            described.add(name)
+            if name in self.help:
+                lines.append(f"# HELP {name} {self.help[name]}")
+            lines.append(f"# TYPE {name} {kind}")
+        with self._lock:
+            counters = sorted(self.counters.items())
+            gauges = sorted(self.gauges.items())
+            histograms = sorted(self.histograms.items(), key=lambda item: item[0])
+        for (name, key), value in counters:
+            header(name, "counter")
+            lines.append(f"{name}{_format_labels(key)} {value}")
+        for (name, key), value in gauges:
+            header(name, "gauge")
+            lines.append(f"{name}{_format_labels(key)} {value}")
+        for (name, key), histogram in histograms:
+            header(name, "histogram")
+            for bound, count in histogram.cumulative_counts():
+                le = "+Inf" if bound == float('inf') else repr(float(bound))
+                lines.append(f"{name}_bucket{_format_labels(key, [('le', le)])} {count}")
+            lines.append(f"{name}_sum{_format_labels(key)} {histogram.sum:.6f}")
+            lines.append(f"{name}_count{_format_labels(key)} {histogram.count}")
+        return "\n".join(lines) + "\n"
+    def write_prometheus(self, path):
+        """node_exporter textfile collector 등에서 읽을 수 있도록 파일로 원자적으로 저장"""
+        write_text_atomic(path, self.render_prometheus(), ".prom")
+    def serve(self, port, host="0.0.0.0"):
+        """/metrics 엔드포인트를 백그라운드 스레드에서 제공"""
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+        registry = self
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, format, *args):
+                pass
+            def do_GET(self):
+                if self.path.split('?', 1)[0] != "/metrics":
+                    self.send_response(404)
+                    self.end_headers()
+                    return
+                body = registry.render_prometheus().encode('utf-8')
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+        httpd = ThreadingHTTPServer((host, port), Handler)
+        httpd.daemon_threads = True
+        threading.Thread(target=httpd.serve_forever, name="encar-metrics", daemon=True).start()
+        return httpd
+
+metrics = Metrics({
+    "encar_stage_seconds": "단계별 소요 시간(초)",
+    "encar_stage_errors_total": "예외로 끝난 단계 수",
+    "encar_listings_seen_total": "목록 검색에서 본 매물 수",
+    "encar_listings_new_total": "새로 확인한 매물 수",
+    "encar_listings_good_total": "조건에 맞는 매물 수",
+    "encar_failures_total": "상세 조회에 실패한 매물 수",
+    "encar_retries_total": "다시 시도한 페이지 조회 수",
+    "encar_cycles_total": "완료한 모니터링 주기 수",
+    "encar_detail_cache_hits_total": "상세 정보 캐시로 대신한 조회 수",
+    "encar_page_ready_seconds": "페이지 이동부터 준비 조건 충족까지 걸린 시간(초)",
+    "encar_page_ready_timeouts_total": "준비 조건을 기다리다 시간 초과된 페이지 수",
+    "encar_cycle_listings_seen": "마지막 주기에 본 매물 수",
+    "encar_cycle_listings_new": "마지막 주기에 새로 확인한 매물 수",
+    "encar_cycle_failures": "마지막 주기에 상세 조회에 실패한 매물 수",
+    "encar_cycle_seconds": "마지막 주기에 걸린 시간(초)",
+    "encar_known_listings": "확인한 매물 키 수",
+    "encar_work_queue": "코디네이터/워커 작업 큐의 샤드·상태별 작업 수",
+    "encar_known_listings_bytes": "확인한 매물 키 집합이 사용하는 대략적인 메모리(바이트)",
+    "encar_archived_pages_total": "--record로 기록한 페이지 수",
+    "encar_parse_missing_total": "성능기록부 영역은 있지만 찾지 못한 항목 수 (교환/판금/부식별)",
+    "encar_listing_events_total": "가격 이력에 기록한 변경 수 (new/price/info/relisted)",
+    "encar_driver_pool": "드라이버 풀 누적 통계",
+    "encar_request_rate": "호스트별 현재 허용 요청 속도(초당)",
+    "encar_circuit_open": "서킷 브레이커가 열려 있으면 1",
+    "encar_circuit_opened_total": "서킷 브레이커가 열린 횟수",
+    "encar_retry_queue": "상세 조회 재시도를 기다리는 매물 수",
+    "encar_retry_dropped_total": "재시도 횟수를 넘겨 대기열에서 제외한 매물 수",
+}, buckets={"encar_stage_seconds": STAGE_BUCKETS})
+
+class JsonFormatter(logging.Formatter):
+    """한 줄에 하나의 JSON 객체로 로그를 출력"""
+    def format(self, record):
+        entry = {
+            'time': self.formatTime(record, "%Y-%m-%dT%H:%M:%S"),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+        }
+        entry.update(getattr(record, 'fields', None) or {})
+        if record.exc_info:
+            entry['exception'] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False)
+
+def configure_logging(level="INFO", json_format=False):
+    """encar 로거 설정: text는 기존 print와 같은 메시지만, json은 구조화된 로그"""
+    handler = logging.StreamHandler()
+    handler.setFormatter(JsonFormatter() if json_format else logging.Formatter("%(message)s"))
+    logger.handlers[:] = [handler]
+    logger.setLevel(level.upper() if isinstance(level, str) else level)
+    logger.propagate = False
@@ -0,0 +1,133 @@
+"""
+파서 회귀 테스트 코퍼스
+
+--record로 기록한 페이지(encar_archive.PageArchive)에서 목록/검색 API/상세 페이지를 골라 코퍼스
+디렉터리로 복사하고, 현재 파서의 결과를 expected.json에 저장한다(build). 파서를 고친 뒤 check를
+실행하면 코퍼스의 모든 페이지를 다시 파싱해 저장된 결과와 다른 페이지를 출력하고, 교환/판금/부식을
+찾지 못한 페이지(999) 수도 함께 보여준다. 달라진 결과가 맞으면 check --update로 기준을 갱신한다.
+
+사용법:
+    python encar_parser_corpus.py build --archive archive --corpus corpus --per-key 1
+    python encar_parser_corpus.py check --corpus corpus
+    python encar_parser_corpus.py check --corpus corpus --update
+"""
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import sys
+
+from encar_archive import PageArchive
+from encar_direct_url_simple import (
+    INSPECTION_KEYS,
+    make_soup,
+    parse_listing_html,
+    parse_performance_html,
+    parse_search_api_results,
+    parse_special_note_html,
+    write_json_atomic,
+)
+from encar_metrics import configure_logging
+
+EXPECTED_FILE = "expected.json"
+
+def parse_page(kind, text):
+    """페이지 종류별 현재 파서의 결과 (JSON으로 저장할 수 있는 형태)"""
+    if kind == 'detail':
+        soup = make_soup(text)
+        return {'performance': parse_performance_html(soup), 'special_note': parse_special_note_html(soup)}
+    listings = parse_listing_html(text) if kind == 'list' else parse_search_api_results(json.loads(text))
+    return [[listing['id'], listing['title'], listing['price'], listing['region']] for listing in listings]
+
+def select_entries(archive, per_key):
+    """내용이 같은 페이지는 하나만, 키(carId/검색 URL)마다 최근 per_key개(0이면 전부)를 고름"""
+    selected, seen, counts = [], set(), {}
+    for entry in reversed(archive.entries()):
+        group = (entry['kind'], entry['key'])
+        if per_key and counts.get(group, 0) >= per_key:
+            continue
+        digest = hashlib.sha1(archive.read(entry).encode('utf-8')).hexdigest()
+        if digest in seen:
+            continue
+        seen.add(digest)
+        counts[group] = counts.get(group, 0) + 1
+        selected.append(entry)
+    return selected[::-1]
+
+def build(args):
+    source = PageArchive(args.archive)
+    corpus = PageArchive(args.corpus)
+    expected_file = os.path.join(args.corpus, EXPECTED_FILE)
+    expected = {}
+    if os.path.exists(expected_file):
+        with open(expected_file, 'r', encoding='utf-8') as f:
+            expected = json.load(f)
+    known_files = {entry['file'] for entry in corpus.entries()}
+    added = 0
+    for entry in select_entries(source, args.per_key):
+        if entry['file'] in known_files:
+            continue
+        target = os.path.join(args.corpus, entry['file'])
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        shutil.copyfile(os.path.join(args.archive, entry['file']), target)
+        with open(corpus.manifest_file, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+        expected[entry['file']] = parse_page(entry['kind'], corpus.read(entry))
+        added += 1
+    write_json_atomic(expected_file, expected, ensure_ascii=False, indent=1, sort_keys=True)
+    print(f"코퍼스에 {added}개 페이지를 추가했습니다 (전체 {len(expected)}개): {args.corpus}")
+
+def check(args):
+    corpus = PageArchive(args.corpus)
+    expected_file = os.path.join(args.corpus, EXPECTED_FILE)
+    with open(expected_file, 'r', encoding='utf-8') as f:
+        expected = json.load(f)
+    changed, missing_fields, no_section, errors = [], {key: 0 for key in INSPECTION_KEYS}, 0, 0
+    entries = corpus.entries()
+    for entry in entries:
+        try:
+            # JSON으로 한 번 변환해 저장된 값과 같은 형태로 비교
+            actual = json.loads(json.dumps(parse_page(entry['kind'], corpus.read(entry)), ensure_ascii=False))
+        except Exception as e:
+            errors += 1
+            print(f"파싱 오류 {entry['file']}: {e}")
+            continue
+        if entry['kind'] == 'detail':
+            performance = actual['performance']
+            if performance is None:
+                no_section += 1
+            else:
+                for key in INSPECTION_KEYS:
+                    missing_fields[key] += performance.get(key) == 999
+        if actual != expected.get(entry['file']):
+            changed.append(entry['file'])
+            print(f"결과가 달라졌습니다 {entry['file']} ({entry['url']})")
+            print(f"  이전: {json.dumps(expected.get(entry['file']), ensure_ascii=False)[:300]}")
+            print(f"  현재: {json.dumps(actual, ensure_ascii=False)[:300]}")
+            expected[entry['file']] = actual
+    details = sum(entry['kind'] == 'detail' for entry in entries)
+    print(f"페이지 {len(entries)}개 (상세 {details}개): 달라짐 {len(changed)}개, 오류 {errors}개, "
+          f"성능기록부 없음 {no_section}개, 항목을 찾지 못함 {missing_fields}")
+    if args.update and changed:
+        write_json_atomic(expected_file, expected, ensure_ascii=False, indent=1, sort_keys=True)
+        print(f"{EXPECTED_FILE}을 현재 결과로 갱신했습니다.")
+        return 0
+    return 1 if changed or errors else 0
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="기록된 페이지로 만든 파서 회귀 테스트 코퍼스")
+    commands = parser.add_subparsers(dest="command", required=True)
+    build_parser = commands.add_parser("build", help="기록에서 페이지를 골라 코퍼스에 추가하고 현재 결과를 저장")
+    build_parser.add_argument("--archive", required=True, help="--record로 기록한 디렉터리")
+    build_parser.add_argument("--corpus", default="corpus", help="코퍼스 디렉터리")
+    build_parser.add_argument("--per-key", type=int, default=1, help="carId/검색 URL마다 남길 최근 페이지 수 (0이면 전부)")
+    check_parser = commands.add_parser("check", help="코퍼스를 다시 파싱해 저장된 결과와 비교")
+    check_parser.add_argument("--corpus", default="corpus", help="코퍼스 디렉터리")
+    check_parser.add_argument("--update", action="store_true", help="달라진 결과를 새 기준으로 저장")
+    args = parser.parse_args()
+    configure_logging("WARNING")
+    if args.command == "build":
+        build(args)
+    else:
+        sys.exit(check(args))
@@ -0,0 +1,220 @@
+"""
+엔카 검색 URL 구조화
+
+검색 URL은 [기본 URL]#![URL 인코딩된 JSON] 형식이고, JSON의 action은 다음 문법을 따른다.
+
+    그룹 := "(" 연산자 "." 항목 ("_." 항목)* ")"      연산자: And, Or, C
+    항목 := 그룹 | 키 "." 값 "."
+    값   := "_"로 이스케이프한 "." ")" "_" 를 포함할 수 있는 문자열 (예: 2.0 → 2_.0)
+
+    (And.Hidden.N._.(C.CarType.Y._.(C.Manufacturer.기아._.(C.ModelGroup.스팅어._.Model.스팅어.))))
+
+parse_action/format_action으로 action 문자열과 트리(ActionGroup, ActionTerm)를 변환하고,
+parse_search_url로 URL 전체를 SearchQuery로 바꾼다. 파싱 결과와 action 인코딩 결과는 캐시되므로
+같은 검색에서 page/limit만 바꾼 URL을 여러 개 만드는 비용은 거의 없다.
+"""
+import json
+import urllib.parse
+from collections import namedtuple
+from functools import lru_cache
+from types import MappingProxyType
+
+AND, OR, CONDITION = "And", "Or", "C"
+OPERATORS = (AND, OR, CONDITION)
+DEFAULT_BASE_URL = "http://www.encar.com/dc/dc_carsearchlist.do?carType=kor"
+# 엔카가 만드는 URL과 같은 형식: 공백 없는 JSON, 괄호는 인코딩하지 않음
+JSON_SEPARATORS = (',', ':')
+QUOTE_SAFE = "()"
+_ESCAPED = "_.)"
+
+class ActionTerm(namedtuple('ActionTerm', 'key value')):
+    """키.값. 형식의 조건 하나 (예: Manufacturer.기아.)"""
+    __slots__ = ()
+    def __str__(self):
+        return format_action(self)
+
+class ActionGroup(namedtuple('ActionGroup', 'op children')):
+    """(And./Or./C. ...) 그룹. children은 ActionTerm/ActionGroup 튜플"""
+    __slots__ = ()
+    def __new__(cls, op, children):
+        if op not in OPERATORS:
+            raise ValueError(f"알 수 없는 연산자: {op!r}")
+        return super().__new__(cls, op, tuple(children))
+    def __str__(self):
+        return format_action(self)
+    def terms(self):
+        """트리에 들어 있는 모든 ActionTerm을 순서대로 반환"""
+        for child in self.children:
+            if isinstance(child, ActionGroup):
+                yield from child.terms()
+            else:
+                yield child
+    def find(self, key):
+        """key에 해당하는 첫 번째 값 (없으면 None)"""
+        return next((term.value for term in self.terms() if term.key == key), None)
+
+class ActionSyntaxError(ValueError):
+    pass
+
+class _ActionParser:
+    def __init__(self, text):
+        self.text = text
+        self.pos = 0
+    def error(self, message):
+        return ActionSyntaxError(f"{message} (위치 {self.pos}): {self.text!r}")
+    def expect(self, token):
+        if not self.text.startswith(token, self.pos):
+            raise self.error(f"'{token}'이(가) 필요합니다")
+        self.pos += len(token)
+    def parse(self):
+        node = self.parse_group()
+        if self.pos != len(self.text):
+            raise self.error("그룹 뒤에 남은 문자가 있습니다")
+        return node
+    def parse_group(self):
+        self.expect("(")
+        end = self.text.find(".", self.pos)
+        if end < 0:
+            raise self.error("연산자가 필요합니다")
+        op = self.text[self.pos:end]
+        if op not in OPERATORS:
+            raise self.error(f"알 수 없는 연산자 {op!r}")
+        self.pos = end + 1
+        children = [self.parse_item()]
+        while self.text.startswith("_.", self.pos):
+            self.pos += 2
+            children.append(self.parse_item())
+        self.expect(")")
+        return ActionGroup(op, children)
+    def parse_item(self):
+        if self.text.startswith("(", self.pos):
+            return self.parse_group()
+        end = self.text.find(".", self.pos)
+        if end <= self.pos:
+            raise self.error("조건 키가 필요합니다")
+        key = self.text[self.pos:end]
+        self.pos = end + 1
+        return ActionTerm(key, self.parse_value())
+    def parse_value(self):
+        text = self.text
+        chars = []
+        while self.pos < len(text):
+            ch = text[self.pos]
+            if ch == "_" and self.pos + 1 < len(text):
+                chars.append(text[self.pos + 1])
+                self.pos += 2
+            elif ch == ".":
+                self.pos += 1
+                # 값 끝의 "." 다음에는 구분자("_."), 그룹 닫기(")") 또는 끝이 와야 한다.
+                # 그렇지 않으면 이스케이프하지 않은 "."(예: 2.0)로 보고 값에 포함
+                if self.pos >= len(text) or text[self.pos] == ")" or text.startswith("_.", self.pos):
+                    return "".join(chars)
+                chars.append(".")
+            else:
+                chars.append(ch)
+                self.pos += 1
+        raise self.error("값이 '.'으로 끝나지 않았습니다")
+
+@lru_cache(maxsize=1024)
+def parse_action(text):
+    """action 문자열을 ActionGroup 트리로 변환 (문법에 맞지 않으면 ActionSyntaxError)"""
+    return _ActionParser(text).parse()
+
+def escape_value(value):
+    return "".join("_" + ch if ch in _ESCAPED else ch for ch in str(value))
+
+@lru_cache(maxsize=1024)
+def format_action(node):
+    """ActionGroup/ActionTerm 트리를 action 문자열로 변환"""
+    if isinstance(node, ActionTerm):
+        return f"{node.key}.{escape_value(node.value)}."
+    return f"({node.op}." + "_.".join(format_action(child) for child in node.children) + ")"
+
+@lru_cache(maxsize=1024)
+def _encode_action_field(action):
+    return urllib.parse.quote('"action":' + json.dumps(action, ensure_ascii=False), safe=QUOTE_SAFE)
+
+def _quote_field(key, value):
+    return urllib.parse.quote(
+        json.dumps(key, ensure_ascii=False) + ":" + json.dumps(value, ensure_ascii=False, separators=JSON_SEPARATORS),
+        safe=QUOTE_SAFE,
+    )
+
+# typed=True: 1, 1.0, True가 서로 다른 캐시 항목이 되도록 (JSON 표현이 다름)
+_quote_scalar_field = lru_cache(maxsize=4096, typed=True)(_quote_field)
+
+def _encode_field(key, value):
+    if key == 'action':
+        return _encode_action_field(format_action(value) if isinstance(value, (ActionGroup, ActionTerm)) else value)
+    if value is None or isinstance(value, (str, int, float)):
+        return _quote_scalar_field(key, value)
+    return _quote_field(key, value)
+
+class SearchQuery:
+    """검색 URL의 기본 주소와 #! JSON 필드. action은 파싱할 수 있으면 ActionGroup, 아니면 원래 문자열"""
+    __slots__ = ('base_url', 'params', 'action')
+    def __init__(self, base_url, params):
+        params = dict(params)
+        action = params.get('action')
+        if isinstance(action, str):
+            try:
+                action = parse_action(action.strip())
+            except ActionSyntaxError:
+                pass
+        if action is not None:
+            params['action'] = action
+        self.base_url = base_url
+        self.params = MappingProxyType(params)
+        self.action = action
+    def get(self, key, default=None):
+        return self.params.get(key, default)
+    def with_params(self, **changes):
+        """일부 필드만 바꾼 새 SearchQuery (action 트리는 그대로 공유)"""
+        return SearchQuery(self.base_url, {**self.params, **changes})
+    def to_dict(self):
+        """JSON으로 직렬화할 수 있는 dict (action은 문자열)"""
+        params = dict(self.params)
+        if isinstance(self.action, (ActionGroup, ActionTerm)):
+            params['action'] = format_action(self.action)
+        return params
+    def to_url(self):
+        encoded = "%2C".join(_encode_field(key, value) for key, value in self.params.items())
+        return f"{self.base_url}#!%7B{encoded}%7D"
+    def __eq__(self, other):
+        return isinstance(other, SearchQuery) and (self.base_url, dict(self.params)) == (other.base_url, dict(other.params))
+    def __repr__(self):
+        return f"SearchQuery({self.base_url!r}, {self.to_dict()!r})"
+
+@lru_cache(maxsize=1024)
+def parse_search_url(url):
+    """#! 형식의 엔카 검색 URL을 SearchQuery로 변환 (형식이 맞지 않으면 None)"""
+    if '#!' not in url:
+        return None
+    base_url, encoded = url.split('#!', 1)
+    try:
+        params = json.loads(urllib.parse.unquote(encoded))
+    except ValueError:
+        return None
+    if not isinstance(params, dict):
+        return None
+    return SearchQuery(base_url, params)
+
+def build_model_action(levels, badge_details=None, hidden="N"):
+    """[(키, 값), ...] 순서의 차종 계층으로 action 트리 생성.
+
+    마지막 단계는 조건 하나(키.값.)로, 그 위 단계는 (C.키.값._.하위) 그룹으로 감싼다.
+    badge_details가 여러 개면 마지막 단계 아래에 (Or.BadgeDetail.a._.BadgeDetail.b.) 그룹을 둔다.
+    """
+    levels = [(key, value) for key, value in levels if value]
+    if not levels:
+        raise ValueError("검색 조건이 하나 이상 필요합니다")
+    details = [ActionTerm("BadgeDetail", detail) for detail in (badge_details or ())]
+    if len(details) > 1:
+        node = ActionGroup(CONDITION, [ActionTerm(*levels[-1]), ActionGroup(OR, details)])
+    elif details:
+        node = ActionGroup(CONDITION, [ActionTerm(*levels[-1]), details[0]])
+    else:
+        node = ActionTerm(*levels[-1])
+    for key, value in reversed(levels[:-1]):
+        node = ActionGroup(CONDITION, [ActionTerm(key, value), node])
+    return ActionGroup(AND, [ActionTerm("Hidden", hidden), node])
@@ -0,0 +1,227 @@
+"""
+선언형 차량 조건 규칙
+
+규칙은 JSON으로 정의하고 한 번 컴파일해 두면 매물 하나를 평가하는 predicate(filter.matches)와
+열(column) 단위로 저장된 여러 매물을 한 번에 평가하는 배치 모드(filter.evaluate_table)로 사용할 수 있다.
+numpy가 설치되어 있으면 배치 모드는 numpy 배열 연산으로, 없으면 파이썬 리스트로 계산한다.
+
+    {"all": [
+        {"field": "exchange", "op": "<=", "value": 1},
+        {"field": "panel", "op": "==", "value": 0},
+        {"field": "price", "op": "between", "value": [1500, 3000]},
+        {"field": "region", "op": "in", "value": ["서울", "경기"]},
+        {"not": {"field": "title", "op": "contains", "value": "렌트"}},
+        {"any": [{"field": "special_note", "op": "==", "value": "없음"},
+                 {"field": "special_note", "op": "contains", "value": "영업"}]}
+    ]}
+
+최상위에 리스트를 쓰면 "all"과 같다. 값이 없는 필드(가격 미표기 등)는 어떤 비교도 통과하지 않는다.
+"""
+import json
+import operator
+from importlib.util import find_spec
+
+# numpy는 배치 모드에서 처음 표를 만들 때 불러온다 (매물 하나씩 평가할 때는 필요 없음)
+HAS_NUMPY = find_spec("numpy") is not None
+np = None
+
+def _load_numpy():
+    global np
+    if np is None and HAS_NUMPY:
+        import numpy
+        np = numpy
+    return np
+
+# 필드 이름 → 종류. 성능기록부 항목은 값이 없으면 기존과 같이 999로 본다
+NUMERIC_FIELDS = ('exchange', 'panel', 'corrosion', 'price')
+TEXT_FIELDS = ('region', 'title', 'special_note')
+FIELDS = NUMERIC_FIELDS + TEXT_FIELDS
+INSPECTION_FIELDS = {'exchange': '교환', 'panel': '판금', 'corrosion': '부식'}
+MISSING_INSPECTION = 999
+
+COMPARISONS = {
+    '<': operator.lt, '<=': operator.le, '>': operator.gt, '>=': operator.ge,
+    '==': operator.eq, '!=': operator.ne,
+}
+TEXT_OPS = ('==', '!=', 'in', 'not_in', 'contains', 'contains_any', 'not_contains')
+NUMERIC_OPS = tuple(COMPARISONS) + ('between', 'in', 'not_in')
+
+class RuleError(ValueError):
+    pass
+
+def parse_price(price):
+    """'1,234만원' 같은 문자열에서 만원 단위 정수를 얻음 (숫자가 없으면 None)"""
+    if price is None or isinstance(price, (int, float)):
+        return price
+    digits = ''.join(ch for ch in price.split('만원', 1)[0] if ch.isdigit())
+    return int(digits) if digits else None
+
+def car_record(performance_data, special_note, listing=None):
+    """규칙이 참조하는 필드만 모은 평면 dict"""
+    performance_data = performance_data or {}
+    listing = listing or {}
+    record = {field: performance_data.get(key, MISSING_INSPECTION) for field, key in INSPECTION_FIELDS.items()}
+    record['price'] = parse_price(listing.get('price'))
+    record['region'] = listing.get('region') or None
+    record['title'] = listing.get('title') or None
+    record['special_note'] = special_note
+    return record
+
+class CarTable:
+    """매물 여러 건을 필드별 열로 저장한 표. numpy가 있으면 각 열은 numpy 배열"""
+    def __init__(self, car_ids, columns, valid):
+        self.car_ids = car_ids
+        self.columns = columns
+        # 성능기록부와 특이사항이 모두 있는 행 (없으면 어떤 규칙도 통과하지 않음)
+        self.valid = valid
+    @classmethod
+    def from_records(cls, car_ids, records, valid=None):
+        columns = {field: [] for field in FIELDS}
+        for record in records:
+            for field in FIELDS:
+                columns[field].append(record[field])
+        if valid is None:
+            valid = [True] * len(car_ids)
+        if _load_numpy() is not None:
+            for field in NUMERIC_FIELDS:
+                columns[field] = np.array([np.nan if v is None else v for v in columns[field]], dtype=float)
+            for field in TEXT_FIELDS:
+                columns[field] = np.array(columns[field], dtype=object)
+            valid = np.array(valid, dtype=bool)
+        return cls(list(car_ids), columns, valid)
+    def __len__(self):
+        return len(self.car_ids)
+
+# ---- 컴파일 ----
+# 각 규칙 노드는 (매물 하나용 predicate, 열 단위 mask 함수) 쌍으로 컴파일된다
+
+def _numeric_leaf(field, op, value):
+    if op == 'between':
+        low, high = value
+        def matches(record):
+            v = record[field]
+            return v is not None and low <= v <= high
+        def mask(table):
+            column = table.columns[field]
+            if np is not None:
+                return (column >= low) & (column <= high)
+            return [v is not None and low <= v <= high for v in column]
+    elif op in ('in', 'not_in'):
+        values = frozenset(value)
+        negate = op == 'not_in'
+        def matches(record):
+            v = record[field]
+            return v is not None and (v in values) != negate
+        def mask(table):
+            column = table.columns[field]
+            if np is not None:
+                return np.isin(column, list(values), invert=negate) & ~np.isnan(column)
+            return [v is not None and (v in values) != negate for v in column]
+    else:
+        compare = COMPARISONS[op]
+        def matches(record):
+            v = record[field]
+            return v is not None and compare(v, value)
+        def mask(table):
+            column = table.columns[field]
+            if np is not None:
+                return compare(column, value) & ~np.isnan(column)
+            return [v is not None and compare(v, value) for v in column]
+    return matches, mask
+
+def _text_leaf(field, op, value):
+    if op in ('==', '!=', 'in', 'not_in'):
+        values = frozenset([value] if op in ('==', '!=') else value)
+        negate = op in ('!=', 'not_in')
+        test = lambda v: (v in values) != negate
+    elif op == 'contains':
+        test = lambda v: value in v
+    elif op == 'not_contains':
+        test = lambda v: value not in v
+    else:
+        keywords = tuple(value)
+        test = lambda v: any(keyword in v for keyword in keywords)
+    def matches(record):
+        v = record[field]
+        return v is not None and test(v)
+    def mask(table):
+        column = table.columns[field]
+        result = [v is not None and test(v) for v in column]
+        return np.fromiter(result, dtype=bool, count=len(result)) if np is not None else result
+    return matches, mask
+
+def _combine(parts, any_of):
+    predicates = tuple(p for p, _ in parts)
+    masks = tuple(m for _, m in parts)
+    if any_of:
+        matches = lambda record: any(p(record) for p in predicates)
+    else:
+        matches = lambda record: all(p(record) for p in predicates)
+    def mask(table):
+        if not masks:
+            result = [not any_of] * len(table)
+            return np.array(result, dtype=bool) if np is not None else result
+        result = masks[0](table)
+        for m in masks[1:]:
+            other = m(table)
+            if np is not None:
+                result = (result | other) if any_of else (result & other)
+            else:
+                result = [(a or b) if any_of else (a and b) for a, b in zip(result, other)]
+        return result
+    return matches, mask
+
+def _negate(part):
+    predicate, mask = part
+    def negated_mask(table):
+        result = mask(table)
+        return ~result if np is not None else [not v for v in result]
+    return (lambda record: not predicate(record)), negated_mask
+
+def compile_rule(node):
+    """규칙(dict/list)을 (predicate, mask) 쌍으로 컴파일"""
+    if isinstance(node, list):
+        return _combine([compile_rule(n) for n in node], any_of=False)
+    if not isinstance(node, dict):
+        raise RuleError(f"규칙은 dict 또는 list여야 합니다: {node!r}")
+    if 'all' in node:
+        return _combine([compile_rule(n) for n in node['all']], any_of=False)
+    if 'any' in node:
+        return _combine([compile_rule(n) for n in node['any']], any_of=True)
+    if 'not' in node:
+        return _negate(compile_rule(node['not']))
+    field, op, value = node.get('field'), node.get('op'), node.get('value')
+    if field in NUMERIC_FIELDS:
+        if op not in NUMERIC_OPS:
+            raise RuleError(f"{field}에는 {op} 연산을 사용할 수 없습니다")
+        if op == 'between' and (not isinstance(value, (list, tuple)) or len(value) != 2):
+            raise RuleError(f"between 값은 [최소, 최대] 형식이어야 합니다: {value!r}")
+        return _numeric_leaf(field, op, value)
+    if field in TEXT_FIELDS:
+        if op not in TEXT_OPS:
+            raise RuleError(f"{field}에는 {op} 연산을 사용할 수 없습니다")
+        return _text_leaf(field, op, value)
+    raise RuleError(f"알 수 없는 필드: {field!r} (사용 가능: {', '.join(FIELDS)})")
+
+class RuleFilter:
+    """컴파일된 규칙. is_good_car는 CarConditionFilter와 같은 방식으로 호출할 수 있다"""
+    def __init__(self, rules):
+        self.rules = rules
+        self._predicate, self._mask = compile_rule(rules)
+    @classmethod
+    def from_file(cls, path):
+        with open(path, 'r', encoding='utf-8') as f:
+            return cls(json.load(f))
+    def matches(self, record):
+        return self._predicate(record)
+    def is_good_car(self, performance_data, special_note, listing=None):
+        # 성능기록부나 특이사항을 확인하지 못한 매물은 통과시키지 않음
+        if not performance_data or special_note is None:
+            return False
+        return self._predicate(car_record(performance_data, special_note, listing))
+    def evaluate_table(self, table):
+        """표 전체를 한 번에 평가해 행별 통과 여부(bool 배열/리스트)를 반환"""
+        result = self._mask(table)
+        if np is not None:
+            return result & table.valid
+        return [ok and valid for ok, valid in zip(result, table.valid)]
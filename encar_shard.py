@@ -0,0 +1,367 @@
+"""
+코디네이터/워커 모드: 상세 페이지 조회를 여러 프로세스(또는 호스트)로 나누기
+
+코디네이터는 목록 검색만 하고, 처음 보는 매물을 SQLite 작업 큐(WorkQueue)에 넣는다.
+각 작업은 carId의 consistent hash로 샤드(워커 이름)가 정해지므로 같은 매물은 항상 같은
+워커가 맡고, 워커를 추가/제거해도 일부 매물만 다른 워커로 옮겨진다. 워커는 자기 샤드의
+작업을 일정 시간 임대(lease)해 상세 페이지를 가져오고 결과를 큐에 기록한다. 워커가 죽어
+임대 시간이 지나면 같은 샤드의 다른 프로세스가 작업을 다시 가져간다.
+
+코디네이터는 결과를 모아 EncarMonitor.record_result로 저장소(CarListingRepository /
+SqliteListingRepository)에 반영하고, 실패한 매물은 모니터의 재시도 대기열에 넣는다.
+
+    python encar_direct_url_simple.py --role coordinator --shards w1,w2 --queue public/work_queue.db
+    python encar_direct_url_simple.py --role worker --shard w1 --queue public/work_queue.db
+    python encar_direct_url_simple.py --role worker --shard w2 --queue public/work_queue.db
+
+여러 호스트에서 실행할 때는 큐 파일을 모든 호스트가 접근할 수 있는 디스크에 둔다
+(SQLite 파일 잠금을 제대로 지원하지 않는 네트워크 파일 시스템은 피한다).
+"""
+import hashlib
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+from bisect import bisect
+
+from encar_direct_url_simple import listing_fingerprint, now_str
+from encar_fetch_policy import CircuitOpenError, FetchError, FetchPolicy, PermanentFetchError
+from encar_metrics import logger, metrics
+
+# 결과에 저장한 예외 이름 → 코디네이터에서 다시 만들 예외 (재시도 대기열의 처리 방식이 달라짐)
+ERROR_TYPES = {cls.__name__: cls for cls in (PermanentFetchError, CircuitOpenError)}
+
+def _hash64(text):
+    return int.from_bytes(hashlib.md5(text.encode('utf-8')).digest()[:8], 'big')
+
+class HashRing:
+    """가상 노드(replicas개)를 둔 consistent hash ring"""
+    def __init__(self, nodes, replicas=64):
+        self.replicas = replicas
+        self._points = []
+        self._owners = []
+        self.nodes = []
+        for node in nodes:
+            self.add(node)
+    def add(self, node):
+        if node in self.nodes:
+            return
+        self.nodes.append(node)
+        points = sorted(zip(self._points, self._owners))
+        points += [(_hash64(f"{node}#{i}"), node) for i in range(self.replicas)]
+        points.sort()
+        self._points = [point for point, _ in points]
+        self._owners = [owner for _, owner in points]
+    def remove(self, node):
+        if node not in self.nodes:
+            return
+        self.nodes.remove(node)
+        kept = [(point, owner) for point, owner in zip(self._points, self._owners) if owner != node]
+        self._points = [point for point, _ in kept]
+        self._owners = [owner for _, owner in kept]
+    def node_for(self, key):
+        if not self._points:
+            raise ValueError("샤드가 하나도 없습니다")
+        i = bisect(self._points, _hash64(str(key))) % len(self._points)
+        return self._owners[i]
+
+class WorkQueue:
+    """상세 조회 작업과 결과를 담는 SQLite 큐. 여러 프로세스가 같은 파일을 함께 사용한다.
+
+    작업 상태: pending → leased(워커가 임대) → done(결과 기록, 코디네이터가 가져가면 삭제).
+    known 키가 기본 키이므로 코디네이터가 같은 매물을 다시 넣어도 중복되지 않는다.
+    """
+    def __init__(self, db_file, lease_seconds=300):
+        self.db_file = db_file
+        self.lease_seconds = lease_seconds
+        directory = os.path.dirname(os.path.abspath(db_file))
+        os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        # 다른 프로세스가 쓰는 중이면 timeout(초)까지 기다림
+        self.conn = sqlite3.connect(db_file, check_same_thread=False, isolation_level=None, timeout=30)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS detail_tasks ("
+            " key TEXT PRIMARY KEY, car_id TEXT NOT NULL, search TEXT NOT NULL, shard TEXT NOT NULL,"
+            " listing TEXT NOT NULL, status TEXT NOT NULL DEFAULT 'pending', worker TEXT,"
+            " lease_until REAL, queued_at REAL NOT NULL) WITHOUT ROWID"
+        )
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_detail_tasks_shard ON detail_tasks (shard, status)")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS detail_results ("
+            " key TEXT PRIMARY KEY, performance TEXT, special_note TEXT, error TEXT, error_type TEXT,"
+            " worker TEXT NOT NULL, finished_at REAL NOT NULL) WITHOUT ROWID"
+        )
+    def enqueue(self, tasks, ring):
+        """tasks: (known 키, 검색 이름, 목록 정보) 목록. 새로 들어간 작업 수를 반환"""
+        now = time.time()
+        rows = [(key, listing['id'], search_name, ring.node_for(listing['id']),
+                 json.dumps(dict(listing), ensure_ascii=False), now)
+                for key, search_name, listing in tasks]
+        with self._lock, self.conn:
+            self.conn.execute("BEGIN IMMEDIATE")
+            before = self.conn.total_changes
+            self.conn.executemany(
+                "INSERT OR IGNORE INTO detail_tasks (key, car_id, search, shard, listing, queued_at)"
+                " VALUES (?, ?, ?, ?, ?, ?)", rows,
+            )
+            return self.conn.total_changes - before
+    def rebalance(self, ring):
+        """샤드 구성이 바뀌었을 때 아직 임대되지 않은 작업을 새 ring 기준으로 다시 배정"""
+        moved = 0
+        with self._lock, self.conn:
+            self.conn.execute("BEGIN IMMEDIATE")
+            rows = self.conn.execute(
+                "SELECT key, car_id, shard FROM detail_tasks WHERE status != 'done'"
+            ).fetchall()
+            for key, car_id, shard in rows:
+                new_shard = ring.node_for(car_id)
+                if new_shard != shard:
+                    self.conn.execute("UPDATE detail_tasks SET shard = ? WHERE key = ?", (new_shard, key))
+                    moved += 1
+        return moved
+    def lease(self, shard, worker, limit=20, now=None):
+        """shard의 대기 작업(또는 임대 시간이 지난 작업)을 최대 limit개 임대: [(key, 목록 정보)]"""
+        now = time.time() if now is None else now
+        with self._lock, self.conn:
+            self.conn.execute("BEGIN IMMEDIATE")
+            rows = self.conn.execute(
+                "SELECT key, listing FROM detail_tasks WHERE shard = ?"
+                " AND (status = 'pending' OR (status = 'leased' AND lease_until < ?))"
+                " ORDER BY queued_at LIMIT ?", (shard, now, limit),
+            ).fetchall()
+            self.conn.executemany(
+                "UPDATE detail_tasks SET status = 'leased', worker = ?, lease_until = ? WHERE key = ?",
+                [(worker, now + self.lease_seconds, key) for key, _ in rows],
+            )
+        return [(key, json.loads(listing)) for key, listing in rows]
+    def complete(self, key, worker, detail=None, error=None):
+        """작업 결과 기록. detail이 None이면 error(예외)를 실패 원인으로 저장"""
+        if detail is not None:
+            performance_data, special_note = detail
+            performance = json.dumps(performance_data, ensure_ascii=False) if performance_data else None
+            row = (key, performance, special_note, None, None, worker, time.time())
+        else:
+            row = (key, None, None, str(error or "상세 정보 없음"), type(error).__name__ if error else None,
+                   worker, time.time())
+        with self._lock, self.conn:
+            self.conn.execute("BEGIN IMMEDIATE")
+            self.conn.execute(
+                "INSERT OR REPLACE INTO detail_results"
+                " (key, performance, special_note, error, error_type, worker, finished_at)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?)", row,
+            )
+            self.conn.execute("UPDATE detail_tasks SET status = 'done' WHERE key = ?", (key,))
+    def collect(self, limit=1000):
+        """완료된 결과를 꺼내고 큐에서 삭제: [(key, 검색 이름, 목록 정보, 상세 정보 또는 None, 예외 또는 None)]"""
+        with self._lock, self.conn:
+            self.conn.execute("BEGIN IMMEDIATE")
+            rows = self.conn.execute(
+                "SELECT r.key, t.search, t.listing, r.performance, r.special_note, r.error, r.error_type"
+                " FROM detail_results r JOIN detail_tasks t ON t.key = r.key LIMIT ?", (limit,),
+            ).fetchall()
+            keys = [(row[0],) for row in rows]
+            self.conn.executemany("DELETE FROM detail_results WHERE key = ?", keys)
+            self.conn.executemany("DELETE FROM detail_tasks WHERE key = ?", keys)
+        results = []
+        for key, search_name, listing, performance, special_note, error, error_type in rows:
+            if error is None:
+                detail, exc = ((json.loads(performance) if performance else None), special_note), None
+            else:
+                detail, exc = None, ERROR_TYPES.get(error_type, FetchError)(error)
+            results.append((key, search_name, json.loads(listing), detail, exc))
+        return results
+    def counts(self):
+        """{(샤드, 상태): 작업 수}"""
+        with self._lock:
+            rows = self.conn.execute(
+                "SELECT shard, status, COUNT(*) FROM detail_tasks GROUP BY shard, status"
+            ).fetchall()
+        return {(shard, status): count for shard, status, count in rows}
+    def close(self):
+        with self._lock:
+            self.conn.close()
+
+class Coordinator:
+    """목록 검색과 결과 병합을 맡는 프로세스. 상세 조회는 워커에게 맡긴다"""
+    def __init__(self, monitor, queue, ring, poll_interval=5.0, collect_batch=1000):
+        self.monitor = monitor
+        self.queue = queue
+        self.ring = ring
+        self.poll_interval = poll_interval
+        self.collect_batch = collect_batch
+        self.searches = {search.name: search for search in monitor.searches}
+        self.stats = {'queued': 0, 'cached': 0, 'merged': 0, 'failed': 0, 'good': 0}
+        moved = queue.rebalance(ring)
+        if moved:
+            logger.info(f"샤드 구성이 바뀌어 대기 중인 작업 {moved}개를 다시 배정했습니다.")
+    def scan(self, searches):
+        """검색 결과에서 처음 보는 매물을 큐에 넣음. 상세 정보 캐시에 있는 매물은 바로 저장"""
+        monitor = self.monitor
+        monitor.fetch_policy.start_cycle()
+        queued = 0
+        for search in searches:
+            label = f"[{search.name}] " if search.name else ""
+            candidates = {}
+            def add(listing):
+                key = search.known_key(listing['id'])
+                if key not in monitor.known_listings:
+                    candidates.setdefault(key, listing)
+            try:
+                with metrics.span("fetch_listings", search=search.name or "default"):
+                    for listing in monitor.iter_cycle_listings(search):
+                        metrics.inc("encar_listings_seen_total")
+                        add(listing)
+            except Exception as e:
+                logger.warning(f"{label}매물 목록 조회 실패: {e}")
+                metrics.inc("encar_failures_total", stage="fetch_listings")
+            for listing in monitor.due_retries(search):
+                add(listing)
+            tasks = []
+            for key, listing in candidates.items():
+                cached = monitor.detail_cache.get(listing['id'], listing_fingerprint(listing))
+                if cached is not None:
+                    self.stats['cached'] += 1
+                    self._record(search, listing, cached)
+                else:
+                    tasks.append((key, search.name, listing))
+            added = self.queue.enqueue(tasks, self.ring)
+            queued += added
+            logger.info(f"{label}작업 큐에 매물 {added}개를 넣었습니다. (이미 대기 중 {len(tasks) - added}개)")
+        self.stats['queued'] += queued
+        return queued
+    def _record(self, search, listing, detail):
+        self.monitor.retry_queue.pop(search.known_key(listing['id']), None)
+        metrics.inc("encar_listings_new_total")
+        if self.monitor.record_result(search, listing, detail):
+            self.stats['good'] += 1
+            metrics.inc("encar_listings_good_total")
+    def merge(self):
+        """워커가 기록한 결과를 저장소에 반영. 반영한 결과 수를 반환"""
+        monitor = self.monitor
+        merged = 0
+        while True:
+            results = self.queue.collect(self.collect_batch)
+            for key, search_name, listing, detail, error in results:
+                search = self.searches.get(search_name)
+                if search is None:
+                    logger.warning(f"알 수 없는 검색의 결과를 건너뜁니다: {search_name!r} ({key})")
+                    continue
+                if detail is None:
+                    self.stats['failed'] += 1
+                    metrics.inc("encar_failures_total", stage="fetch_detail")
+                    monitor.queue_retry(search, listing, error)
+                    continue
+                monitor.detail_cache.put(listing['id'], detail, listing)
+                self._record(search, listing, detail)
+            merged += len(results)
+            if len(results) < self.collect_batch:
+                break
+        if merged:
+            self.stats['merged'] += merged
+            with metrics.span("repo_flush"):
+                monitor.flush()
+            logger.info(f"워커 결과 {merged}개를 반영했습니다. 처리 현황: {self.stats}")
+        for (shard, status), count in self.queue.counts().items():
+            metrics.set_gauge("encar_work_queue", count, shard=shard, status=status)
+        if monitor.metrics_file:
+            metrics.write_prometheus(monitor.metrics_file)
+        return merged
+    def run(self):
+        monitor = self.monitor
+        logger.info(f"코디네이터를 시작합니다. 샤드: {', '.join(self.ring.nodes)}")
+        try:
+            while True:
+                due = monitor.scheduler.pop_due()
+                if due:
+                    logger.info("=" * 50)
+                    logger.info(f"매물 확인 시작: {now_str()}")
+                    paused = monitor.fetch_policy.breaker.seconds_until_retry()
+                    if paused > 0:
+                        logger.warning(f"오류가 많아 조회를 멈춘 상태입니다. {paused:.0f}초 뒤에 다시 시도합니다.")
+                    else:
+                        self.scan(due)
+                        # 캐시로 바로 저장한 매물과 검색 주기를 반영 (워커 결과는 merge에서 flush)
+                        with metrics.span("repo_flush"):
+                            monitor.flush()
+                self.merge()
+                time.sleep(min(self.poll_interval, monitor.scheduler.seconds_until_next()))
+        except KeyboardInterrupt:
+            logger.info("코디네이터를 종료합니다.")
+            self.merge()
+            monitor.flush()
+        finally:
+            monitor.close()
+            self.queue.close()
+
+class DetailWorker:
+    """자기 샤드의 작업을 임대해 상세 페이지를 가져오고 결과를 큐에 기록"""
+    def __init__(self, queue, crawler, shard, detail_workers=None, batch_size=20, poll_interval=2.0,
+                 fetch_policy=None, detail_cache=None, worker_id=None):
+        self.queue = queue
+        self.crawler = crawler
+        self.shard = shard
+        self.detail_workers = detail_workers
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.fetch_policy = fetch_policy or FetchPolicy(rate_limiter=getattr(crawler, 'rate_limiter', None))
+        self.detail_cache = detail_cache
+        self.worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}"
+        self.stats = {'leased': 0, 'fetched': 0, 'failed': 0, 'cached': 0}
+    def process_batch(self):
+        """작업을 한 번 임대해 처리하고, 처리한 작업 수를 반환"""
+        tasks = self.queue.lease(self.shard, self.worker_id, self.batch_size)
+        if not tasks:
+            return 0
+        self.stats['leased'] += len(tasks)
+        self.fetch_policy.start_cycle()
+        details = {}
+        to_fetch = {}
+        for _, listing in tasks:
+            car_id = listing['id']
+            cached = self.detail_cache.get(car_id, listing_fingerprint(listing)) if self.detail_cache else None
+            if cached is not None:
+                self.stats['cached'] += 1
+                details[car_id] = (cached, None)
+            else:
+                # 여러 검색에 걸린 같은 매물은 한 번만 조회
+                to_fetch.setdefault(car_id, listing)
+        listings = list(to_fetch.values())
+        errors = {}
+        with metrics.span("fetch_details"):
+            results = self.crawler.fetch_details([listing['link'] for listing in listings], self.detail_workers,
+                                                 policy=self.fetch_policy, errors=errors)
+        for i, (listing, detail) in enumerate(zip(listings, results)):
+            details[listing['id']] = (detail, errors.get(i))
+            if detail is not None and self.detail_cache is not None:
+                self.detail_cache.put(listing['id'], detail, listing)
+        for key, listing in tasks:
+            detail, error = details[listing['id']]
+            self.stats['fetched' if detail is not None else 'failed'] += 1
+            self.queue.complete(key, self.worker_id, detail, error)
+        return len(tasks)
+    def run(self, stop_when_idle=False):
+        logger.info(f"워커 {self.worker_id}를 시작합니다. 샤드: {self.shard}")
+        try:
+            while True:
+                paused = self.fetch_policy.breaker.seconds_until_retry()
+                if paused > 0:
+                    time.sleep(paused)
+                    continue
+                processed = self.process_batch()
+                if processed:
+                    logger.info(f"작업 {processed}개 처리. 처리 현황: {self.stats}")
+                    continue
+                if stop_when_idle:
+                    break
+                time.sleep(self.poll_interval)
+        except KeyboardInterrupt:
+            logger.info("워커를 종료합니다.")
+        finally:
+            self.crawler.close()
+            self.queue.close()
+            if self.detail_cache is not None:
+                self.detail_cache.close()
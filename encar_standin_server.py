@@ -0,0 +1,283 @@
+"""
+엔카 대신 사용하는 로컬 HTTP 서버 (벤치마크/오프라인 확인용)
+
+실제 사이트와 같은 구조의 페이지를 만들어 제공한다.
+- /dc/dc_carsearchlist.do : 검색 결과 페이지. 실제 사이트처럼 #! JSON의 page/limit을 읽어
+  스크립트로 table.car_list tr[data-index] 행을 채운다.
+- /rows?page=&limit=        : 위 페이지가 불러오는 행 HTML
+- /search/car/list/general  : 검색 API(JSON). EncarHttpCrawler가 사용
+- /cars/detail/<carId>      : 성능기록부/차량이력 영역이 있는 상세 페이지
+
+매물 수, 응답 지연(latency/jitter)을 설정할 수 있고, add_listings()로 새 매물이
+올라온 상황을 흉내 낼 수 있다. error_rate 비율의 요청에 error_status(기본 503)로 응답하거나
+fail_next(n)으로 다음 n개 요청을 연속으로 실패시켜 재시도/서킷 브레이커 동작을 확인할 수 있다.
+
+사용법:
+    python encar_standin_server.py --port 8765 --total 1000 --latency 0.2
+"""
+import argparse
+import hashlib
+import json
+import random
+import threading
+import time
+import urllib.parse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+REGIONS = ["서울", "경기", "인천", "부산", "대구"]
+MODELS = [
+    ("기아", "스팅어", "가솔린 2000cc", "2.0 터보 2WD"),
+    ("기아", "K5", "가솔린 2000cc", "2.0 프레스티지"),
+    ("현대", "그랜저", "가솔린 2500cc", "2.5 익스클루시브"),
+]
+SPECIAL_NOTES = [(), (), (), ("렌트",), ("영업",)]
+
+def synthetic_car(car_id):
+    """carId로부터 항상 같은 가짜 매물 정보를 만든다"""
+    h = int(hashlib.md5(str(car_id).encode()).hexdigest(), 16)
+    manufacturer, model, badge_group, badge = MODELS[h % len(MODELS)]
+    return {
+        'id': str(car_id),
+        'manufacturer': manufacturer,
+        'model': model,
+        'badge_group': badge_group,
+        'badge': badge,
+        'price': 1500 + (h >> 8) % 2500,
+        'region': REGIONS[(h >> 16) % len(REGIONS)],
+        'mileage': (h >> 24) % 150000,
+        'exchange': (h >> 32) % 3,
+        'panel': 0 if (h >> 40) % 3 else 1,
+        'corrosion': 0 if (h >> 48) % 5 else 1,
+        'special_notes': SPECIAL_NOTES[(h >> 56) % len(SPECIAL_NOTES)],
+    }
+
+def render_listing_row(index, car):
+    return (
+        f'<tr data-index="{index}" data-impression="{car["id"]}|0|{index}">'
+        f'<td class="inf"><a href="/cars/detail/{car["id"]}">'
+        f'<span class="cls"><strong>{car["manufacturer"]}</strong> <em>{car["model"]}</em></span> '
+        f'<span class="dtl"><strong>{car["badge_group"]}</strong> <em>{car["badge"]}</em></span></a>'
+        f'<span class="detail"><span class="yer">20/03식</span> <span class="km">{car["mileage"]:,}km</span> '
+        f'<span class="loc">{car["region"]}</span></span></td>'
+        f'<td class="prc_hs"><strong>{car["price"]:,}</strong></td></tr>'
+    )
+
+def build_listing_page(rows, start_id=38000000):
+    """행이 rows개 들어 있는 정적 검색 결과 페이지"""
+    trs = "".join(render_listing_row(i, synthetic_car(start_id + i)) for i in range(rows))
+    return ('<html><head><meta charset="utf-8"></head><body><table class="car_list"><tbody>'
+            + trs + '</tbody></table></body></html>')
+
+def build_detail_page(exchange=1, panel=0, corrosion=0, special_notes=()):
+    """성능기록부(체크리스트 레이아웃)와 차량이력 영역을 가진 상세 페이지"""
+    def value(count):
+        return "<p>없음</p>" if count == 0 else f"<p><span>{count}</span>건</p>"
+    notes = "".join(f"<li>{note}</li>" for note in special_notes)
+    return (
+        '<html><head><meta charset="utf-8"></head><body>'
+        '<div data-impression="성능기록부"><ul class="DetailInspect_check_list__x1">'
+        f'<li><p>교환</p>{value(exchange)}</li>'
+        f'<li><p>판금</p>{value(panel)}</li>'
+        f'<li><p>부식</p>{value(corrosion)}</li>'
+        '</ul></div>'
+        '<div data-impression="차량이력"><ul>'
+        '<li><p>소유자 변경</p><ul><li>1회</li></ul></li>'
+        f'<li><p>특이 사항</p><ul>{notes}</ul></li>'
+        '</ul></div></body></html>'
+    )
+
+SEARCH_PAGE = """<html><head><meta charset="utf-8"><title>검색 결과</title></head><body>
+<table class="car_list"><tbody></tbody></table>
+<script>
+(function () {
+    var tbody = document.querySelector('table.car_list tbody');
+    function load() {
+        var query = {};
+        try { query = JSON.parse(decodeURIComponent(location.hash.slice(2))); } catch (e) {}
+        var page = query.page || 1, limit = query.limit || 20;
+        tbody.innerHTML = '';
+        var xhr = new XMLHttpRequest();
+        xhr.open('GET', '/rows?page=' + page + '&limit=' + limit);
+        xhr.onload = function () {
+            tbody.innerHTML = xhr.responseText || '<tr class="no_result"><td>검색결과가 없습니다.</td></tr>';
+        };
+        xhr.send();
+    }
+    load();
+    window.addEventListener('hashchange', load);
+})();
+</script></body></html>"""
+
+class StandinCatalog:
+    """최근 등록순으로 정렬된 가짜 매물 목록"""
+    def __init__(self, total=1000, start_id=38000000):
+        self._lock = threading.Lock()
+        self.next_id = start_id + total
+        # 최신 매물이 앞에 오도록 내림차순
+        self.ids = list(range(start_id + total - 1, start_id - 1, -1))
+        self._id_set = set(self.ids)
+        # 가격을 바꾼 매물 (가격 이력 확인용)
+        self.prices = {}
+    def set_price(self, car_id, price):
+        """매물 가격(만원)을 바꿈"""
+        with self._lock:
+            self.prices[int(car_id)] = price
+    def add_listings(self, count):
+        """새 매물 count개를 목록 맨 앞에 추가"""
+        with self._lock:
+            new_ids = list(range(self.next_id + count - 1, self.next_id - 1, -1))
+            self.next_id += count
+            self.ids = new_ids + self.ids
+            self._id_set.update(new_ids)
+        return [str(car_id) for car_id in new_ids]
+    def page(self, offset, limit):
+        with self._lock:
+            ids = self.ids[offset:offset + limit]
+            prices = {car_id: self.prices[car_id] for car_id in ids if car_id in self.prices}
+        cars = [synthetic_car(car_id) for car_id in ids]
+        for car in cars:
+            car['price'] = prices.get(int(car['id']), car['price'])
+        return cars
+    def __len__(self):
+        return len(self.ids)
+    def __contains__(self, car_id):
+        with self._lock:
+            return car_id.isdigit() and int(car_id) in self._id_set
+
+class StandinServer:
+    """백그라운드 스레드에서 동작하는 가짜 엔카 서버"""
+    def __init__(self, host="127.0.0.1", port=0, total=1000, latency=0.0, jitter=0.0, seed=0,
+                 error_rate=0.0, error_status=503):
+        self.catalog = StandinCatalog(total)
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self._fail_remaining = 0
+        self.random = random.Random(seed)
+        self.requests = {}
+        # 처음 요청을 받은 시각(time.time()). 시작 시간 벤치마크에서 사용하며 None으로 되돌릴 수 있다
+        self.first_request_at = None
+        self._lock = threading.Lock()
+        self.httpd = ThreadingHTTPServer((host, port), self._handler_class())
+        self.httpd.daemon_threads = True
+        self._thread = None
+    @property
+    def base_url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+    @property
+    def detail_base_url(self):
+        return f"{self.base_url}/cars/detail/"
+    @property
+    def search_api_url(self):
+        return f"{self.base_url}/search/car/list/general"
+    def search_url(self, action="(And.Hidden.N._.CarType.Y.)", limit=1000):
+        query = {"action": action, "toggle": {}, "layer": "", "sort": "ModifiedDate",
+                 "page": 1, "limit": str(limit), "searchKey": "", "loginCheck": False}
+        return (f"{self.base_url}/dc/dc_carsearchlist.do?carType=kor#!"
+                + urllib.parse.quote(json.dumps(query, ensure_ascii=False)))
+    def start(self):
+        self._thread = threading.Thread(target=self.httpd.serve_forever, name="encar-standin", daemon=True)
+        self._thread.start()
+        return self
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+    def __enter__(self):
+        return self.start()
+    def __exit__(self, *exc):
+        self.stop()
+    def _delay(self):
+        with self._lock:
+            delay = self.latency + (self.random.uniform(0, self.jitter) if self.jitter else 0.0)
+        if delay > 0:
+            time.sleep(delay)
+    def _count(self, route):
+        with self._lock:
+            if self.first_request_at is None:
+                self.first_request_at = time.time()
+            self.requests[route] = self.requests.get(route, 0) + 1
+    def fail_next(self, count):
+        """다음 count개 요청을 error_status로 실패시킴 (일시적인 장애 흉내)"""
+        with self._lock:
+            self._fail_remaining = count
+    def _should_fail(self):
+        with self._lock:
+            if self._fail_remaining > 0:
+                self._fail_remaining -= 1
+                fail = True
+            else:
+                fail = bool(self.error_rate) and self.random.random() < self.error_rate
+            if fail:
+                self.requests['errors'] = self.requests.get('errors', 0) + 1
+            return fail
+    def _handler_class(self):
+        server = self
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, format, *args):
+                pass
+            def _send(self, status, body, content_type="text/html; charset=utf-8"):
+                data = body.encode('utf-8')
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+            def do_GET(self):
+                parts = urllib.parse.urlsplit(self.path)
+                params = dict(urllib.parse.parse_qsl(parts.query))
+                path = parts.path
+                server._delay()
+                if server._should_fail():
+                    self._send(server.error_status, "injected error")
+                    return
+                if path == "/dc/dc_carsearchlist.do":
+                    server._count("search")
+                    self._send(200, SEARCH_PAGE)
+                elif path == "/rows":
+                    server._count("rows")
+                    page, limit = int(params.get('page', 1)), int(params.get('limit', 20))
+                    offset = (page - 1) * limit
+                    cars = server.catalog.page(offset, limit)
+                    self._send(200, "".join(render_listing_row(offset + i, car) for i, car in enumerate(cars)))
+                elif path == "/search/car/list/general":
+                    server._count("api")
+                    _, _sort, offset, limit = (params.get('sr') or "|ModifiedDate|0|20").split('|')
+                    cars = server.catalog.page(int(offset), int(limit))
+                    results = [{'Id': car['id'], 'Manufacturer': car['manufacturer'], 'Model': car['model'],
+                                'Badge': car['badge'], 'Price': float(car['price']),
+                                'OfficeCityState': car['region']} for car in cars]
+                    self._send(200, json.dumps({'Count': len(server.catalog), 'SearchResults': results},
+                                               ensure_ascii=False), "application/json; charset=utf-8")
+                elif path.startswith("/cars/detail/"):
+                    server._count("detail")
+                    car_id = path.rsplit('/', 1)[-1]
+                    if car_id not in server.catalog:
+                        self._send(404, "not found")
+                        return
+                    car = synthetic_car(car_id)
+                    self._send(200, build_detail_page(car['exchange'], car['panel'], car['corrosion'],
+                                                      car['special_notes']))
+                else:
+                    self._send(404, "not found")
+        return Handler
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="로컬 엔카 대체 서버")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--total", type=int, default=1000, help="매물 수")
+    parser.add_argument("--latency", type=float, default=0.0, help="응답마다 추가할 지연(초)")
+    parser.add_argument("--jitter", type=float, default=0.0, help="지연에 더할 무작위 값의 최대치(초)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="오류로 응답할 요청 비율 (0~1)")
+    parser.add_argument("--error-status", type=int, default=503, help="오류 응답 상태 코드")
+    args = parser.parse_args()
+    server = StandinServer(args.host, args.port, args.total, args.latency, args.jitter,
+                           error_rate=args.error_rate, error_status=args.error_status)
+    print(f"대체 서버 실행 중: {server.base_url}")
+    print(f"검색 URL: {server.search_url()}")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        server.stop()
@@ -0,0 +1,112 @@
+"""
+--once 실행의 시작 시간 벤치마크
+
+로컬 대체 서버를 띄우고 확인한 매물 N개가 저장된 상태에서 encar_direct_url_simple.py --once를
+별도 프로세스로 여러 번 실행한다. 프로세스 시작부터 대체 서버가 첫 요청을 받을 때까지의 시간
+(time-to-first-request)과 전체 실행 시간을, 저장소(SQLite)에서 상태를 읽는 경우와 스냅샷을
+읽는 경우로 나누어 측정한다. 모듈 import 시간도 함께 기록한다.
+
+사용법:
+    python encar_startup_bench.py --known 300000 --runs 5 --output startup_results.json
+    python encar_startup_bench.py --compare startup_results.json
+"""
+import argparse
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+from encar_benchmark import compare, percentile
+from encar_direct_url_simple import SqliteListingRepository
+from encar_metrics import configure_logging
+from encar_standin_server import StandinServer
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+MAIN_SCRIPT = os.path.join(SCRIPT_DIR, "encar_direct_url_simple.py")
+SNAPSHOT_NAME = "monitor_state.bin"
+
+def seed_state(data_dir, server, known):
+    """대체 서버의 매물과 가상의 매물 known개를 확인한 것으로 저장"""
+    repo = SqliteListingRepository(os.path.join(data_dir, "encar.db"), os.path.join(data_dir, "good_cars.json"))
+    repo.save_known_listings(str(10_000_000 + i) for i in range(known))
+    repo.save_known_listings(car['id'] for car in server.catalog.page(0, len(server.catalog)))
+    repo.close()
+
+def measure_import(runs):
+    code = "import time; t = time.perf_counter(); import encar_direct_url_simple; print(time.perf_counter() - t)"
+    samples = []
+    for _ in range(runs):
+        out = subprocess.run([sys.executable, "-c", code], cwd=SCRIPT_DIR, capture_output=True, text=True, check=True)
+        samples.append(float(out.stdout.strip().splitlines()[-1]))
+    return samples
+
+def run_once(server, data_dir, snapshot, backend):
+    command = [
+        sys.executable, MAIN_SCRIPT, "--once", "--backend", backend, "--log-level", "WARNING",
+        "--data-dir", data_dir, "--snapshot", snapshot,
+        "--url", server.search_url(limit=len(server.catalog)),
+        "--detail-base-url", server.detail_base_url, "--search-api-url", server.search_api_url,
+    ]
+    server.first_request_at = None
+    started = time.time()
+    subprocess.run(command, cwd=SCRIPT_DIR, check=True)
+    finished = time.time()
+    if server.first_request_at is None:
+        raise RuntimeError("대체 서버가 요청을 받지 못했습니다")
+    return server.first_request_at - started, finished - started
+
+def run_benchmark(args):
+    data_dir = tempfile.mkdtemp(prefix="encar-startup-")
+    server = StandinServer(total=args.total).start()
+    results = {}
+    try:
+        seed_state(data_dir, server, args.known)
+        import_samples = measure_import(args.runs)
+        for mode in ("repo", "snapshot"):
+            snapshot = SNAPSHOT_NAME if mode == "snapshot" else ""
+            if mode == "snapshot":
+                # 처음 한 번은 저장소에서 읽고 스냅샷을 만든다
+                run_once(server, data_dir, snapshot, args.backend)
+            first_request, total = [], []
+            for _ in range(args.runs):
+                ttfr, elapsed = run_once(server, data_dir, snapshot, args.backend)
+                first_request.append(ttfr)
+                total.append(elapsed)
+            results[f'{mode}_first_request_p50_s'] = round(percentile(first_request, 50), 4)
+            results[f'{mode}_first_request_max_s'] = round(max(first_request), 4)
+            results[f'{mode}_run_p50_s'] = round(percentile(total, 50), 4)
+        results['import_p50_s'] = round(percentile(import_samples, 50), 4)
+        snapshot_path = os.path.join(data_dir, SNAPSHOT_NAME)
+        results['snapshot_bytes'] = os.path.getsize(snapshot_path) if os.path.exists(snapshot_path) else 0
+        results['server_requests'] = dict(server.requests)
+    finally:
+        server.stop()
+        shutil.rmtree(data_dir, ignore_errors=True)
+    return {
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'environment': {'python': platform.python_version(), 'platform': platform.platform()},
+        'config': {k: v for k, v in vars(args).items() if k not in ('output', 'compare')},
+        'results': results,
+    }
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="--once 실행의 시작 시간(time-to-first-request) 벤치마크")
+    parser.add_argument("--backend", choices=["selenium", "http"], default="http")
+    parser.add_argument("--known", type=int, default=100000, help="미리 저장해 둘 확인한 매물 수")
+    parser.add_argument("--total", type=int, default=50, help="대체 서버의 매물 수")
+    parser.add_argument("--runs", type=int, default=5, help="방식별 실행 횟수")
+    parser.add_argument("--output", default="startup_results.json", help="결과를 저장할 JSON 파일")
+    parser.add_argument("--compare", help="비교할 이전 결과 JSON 파일")
+    args = parser.parse_args()
+    configure_logging("WARNING")
+    report = run_benchmark(args)
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(json.dumps(report['results'], ensure_ascii=False, indent=2))
+    print(f"결과 저장: {args.output}")
+    if args.compare:
+        compare(report, args.compare)
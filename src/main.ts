@@ -1,33 +1,171 @@
 import './style.css'
 
 type Car = {
+    carId?: string;
     title?: string;
     price?: string;
     region?: string;
     exchange?: number | string;
     panel?: number | string;
     corrosion?: number | string;
+    special_note?: string;
     url?: string;
+    check_time?: string;
 };
 
+// feed/index.json: 제목별 차량 수와 그룹 파일 (그룹 파일 이름에 내용 해시가 들어 있음)
+type FeedGroup = {
+    title: string;
+    count: number;
+    file: string;
+    hash: string;
+};
+
+type FeedIndex = {
+    updated?: string;
+    total: number;
+    columns: (keyof Car)[];
+    groups: FeedGroup[];
+};
+
+type Tab = {
+    title: string;
+    count: number;
+    load: () => Promise<Car[]>;
+};
+
+// 가상 스크롤: 보이는 행과 앞뒤 OVERSCAN개만 그림 (행 높이는 처음 그린 행으로 다시 잼)
+const ROW_HEIGHT = 44;
+const OVERSCAN = 10;
+
 const root = document.getElementById('car-list-root') as HTMLElement;
 
+function escapeHtml(value: unknown): string {
+    return String(value).replace(/[&<>"']/g, ch => `&#${ch.charCodeAt(0)};`);
+}
+
 function groupByTitle(cars: Car[]): Record<string, Car[]> {
     return cars.reduce((acc, car) => {
         const title = car.title || '제목 없음';
-        if (!acc[title]) acc[title] = [];
-        acc[title].push(car);
+        (acc[title] ??= []).push(car);
         return acc;
     }, {} as Record<string, Car[]>);
 }
 
-function renderTabs(cars: Car[]): void {
-    if (!cars.length) {
+async function fetchJson<T>(url: string, init?: RequestInit): Promise<T> {
+    const res = await fetch(url, init);
+    if (!res.ok) throw new Error('파일 없음');
+    return res.json() as Promise<T>;
+}
+
+// 그룹 파일은 내용이 바뀌면 이름도 바뀌므로 한 번 받은 것은 다시 받지 않음
+const groupCache = new Map<string, Promise<Car[]>>();
+
+function loadGroup(columns: (keyof Car)[], group: FeedGroup): Promise<Car[]> {
+    let cars = groupCache.get(group.file);
+    if (!cars) {
+        cars = fetchJson<{ rows: unknown[][] }>(`feed/${group.file}`).then(data =>
+            data.rows.map(row => Object.fromEntries(columns.map((column, i) => [column, row[i]])) as Car)
+        );
+        cars.catch(() => groupCache.delete(group.file));
+        groupCache.set(group.file, cars);
+    }
+    return cars;
+}
+
+async function loadTabs(): Promise<Tab[]> {
+    try {
+        const index = await fetchJson<FeedIndex>('feed/index.json', { cache: 'no-cache' });
+        return index.groups.map(group => ({
+            title: group.title,
+            count: group.count,
+            load: () => loadGroup(index.columns, group),
+        }));
+    } catch {
+        // 피드가 없으면 good_cars.json 전체를 받아 제목별로 나눔
+        const data = await fetchJson<{ cars?: Car[] }>('good_cars.json');
+        const grouped = groupByTitle(Array.isArray(data.cars) ? data.cars : []);
+        return Object.entries(grouped).map(([title, cars]) => ({
+            title,
+            count: cars.length,
+            load: () => Promise.resolve(cars),
+        }));
+    }
+}
+
+function renderRow(car: Car): string {
+    return `
+        <tr>
+            <td>${escapeHtml(car.price || '-')}</td>
+            <td>${escapeHtml(car.region || '-')}</td>
+            <td>${escapeHtml(car.exchange ?? '-')}</td>
+            <td>${escapeHtml(car.panel ?? '-')}</td>
+            <td>${escapeHtml(car.corrosion ?? '-')}</td>
+            <td>${car.url ? `<a class="car-link" href="${escapeHtml(car.url)}" target="_blank">바로가기</a>` : '-'}</td>
+        </tr>
+    `;
+}
+
+function renderTable(container: Element, group: Car[]): void {
+    container.innerHTML = `
+        <section class="car-group">
+            <div class="table-wrap">
+                <table class="car-table">
+                    <thead>
+                        <tr>
+                            <th>가격</th>
+                            <th>지역</th>
+                            <th>교환</th>
+                            <th>판금</th>
+                            <th>부식</th>
+                            <th>링크</th>
+                        </tr>
+                    </thead>
+                    <tbody></tbody>
+                </table>
+            </div>
+        </section>
+    `;
+    const wrap = container.querySelector<HTMLElement>('.table-wrap')!;
+    const tbody = container.querySelector('tbody')!;
+    let rowHeight = ROW_HEIGHT;
+    let start = -1;
+    let end = -1;
+    let frame = 0;
+
+    // 보이는 범위의 행만 그리고, 나머지 높이는 위아래 빈 행으로 채움
+    function renderRows() {
+        frame = 0;
+        const visible = Math.ceil(wrap.clientHeight / rowHeight) || 20;
+        const nextStart = Math.max(0, Math.floor(wrap.scrollTop / rowHeight) - OVERSCAN);
+        const nextEnd = Math.min(group.length, nextStart + visible + 2 * OVERSCAN);
+        if (nextStart === start && nextEnd === end) return;
+        start = nextStart;
+        end = nextEnd;
+        tbody.innerHTML = `
+            <tr class="spacer" style="height:${start * rowHeight}px"></tr>
+            ${group.slice(start, end).map(renderRow).join('')}
+            <tr class="spacer" style="height:${(group.length - end) * rowHeight}px"></tr>
+        `;
+    }
+
+    wrap.onscroll = () => {
+        if (!frame) frame = requestAnimationFrame(renderRows);
+    };
+    renderRows();
+    const measured = tbody.querySelector('tr:not(.spacer)')?.getBoundingClientRect().height;
+    if (measured && Math.abs(measured - rowHeight) > 0.5) {
+        rowHeight = measured;
+        start = end = -1;
+        renderRows();
+    }
+}
+
+function renderTabs(tabs: Tab[]): void {
+    if (!tabs.length) {
         root.innerHTML = `<div class="empty-message">조건에 맞는 차량이 없습니다.</div>`;
         return;
     }
-    const grouped = groupByTitle(cars);
-    const titles = Object.keys(grouped);
     let activeIdx = 0;
 
     // 탭 바와 컨텐츠 영역을 분리해서 렌더링
@@ -39,44 +177,22 @@ function renderTabs(cars: Car[]): void {
     const tabContent = root.querySelector('#tab-content')!;
 
     // 탭 바 버튼 생성
-    tabBar.innerHTML = titles.map((title, i) => `
-        <button class="tab-btn${i === activeIdx ? ' active' : ''}" data-idx="${i}">${title}</button>
+    tabBar.innerHTML = tabs.map((tab, i) => `
+        <button class="tab-btn${i === activeIdx ? ' active' : ''}" data-idx="${i}">${escapeHtml(tab.title)} (${tab.count})</button>
     `).join('');
 
-    // 컨텐츠 렌더 함수
-    function renderContent(idx: number) {
-        const titleKey = titles[idx] ?? '';
-        const group: Car[] = (titleKey && grouped[titleKey]) ? grouped[titleKey] : [];
-        tabContent.innerHTML = `
-            <section class="car-group">
-                <div class="table-wrap">
-                    <table class="car-table">
-                        <thead>
-                            <tr>
-                                <th>가격</th>
-                                <th>지역</th>
-                                <th>교환</th>
-                                <th>판금</th>
-                                <th>부식</th>
-                                <th>링크</th>
-                            </tr>
-                        </thead>
-                        <tbody>
-                            ${group.map((car: Car) => `
-                                <tr>
-                                    <td>${car.price || '-'}</td>
-                                    <td>${car.region || '-'}</td>
-                                    <td>${car.exchange ?? '-'}</td>
-                                    <td>${car.panel ?? '-'}</td>
-                                    <td>${car.corrosion ?? '-'}</td>
-                                    <td>${car.url ? `<a class=\"car-link\" href=\"${car.url}\" target=\"_blank\">바로가기</a>` : '-'}</td>
-                                </tr>
-                            `).join('')}
-                        </tbody>
-                    </table>
-                </div>
-            </section>
-        `;
+    // 컨텐츠 렌더 함수: 선택한 탭의 그룹 파일만 받아서 그림
+    async function renderContent(idx: number) {
+        const tab = tabs[idx];
+        if (!tab) return;
+        tabContent.innerHTML = `<div class="empty-message">차량 정보를 불러오는 중입니다...</div>`;
+        try {
+            const group = await tab.load();
+            // 받는 동안 다른 탭을 선택했으면 그리지 않음
+            if (idx === activeIdx) renderTable(tabContent, group);
+        } catch {
+            if (idx === activeIdx) tabContent.innerHTML = `<div class="empty-message">차량 데이터를 불러오지 못했습니다.</div>`;
+        }
     }
 
     // 최초 컨텐츠 렌더
@@ -88,9 +204,8 @@ function renderTabs(cars: Car[]): void {
         btn.onclick = () => {
             const idx = Number(btn.dataset.idx);
             if (idx !== activeIdx) {
-                if (tabBtns[activeIdx]) {
-                    tabBtns[activeIdx].classList.remove('active');
-                }
+                // noUncheckedIndexedAccess: activeIdx는 let이라 인덱스 접근이 좁혀지지 않음
+                tabBtns[activeIdx]?.classList.remove('active');
                 btn.classList.add('active');
                 activeIdx = idx;
                 renderContent(activeIdx);
@@ -104,15 +219,8 @@ function renderError(message: string): void {
     root.innerHTML = `<div class="empty-message">${message}</div>`;
 }
 
-fetch('good_cars.json')
-    .then(res => {
-        if (!res.ok) throw new Error('파일 없음');
-        return res.json();
-    })
-    .then((data: { cars?: Car[] }) => {
-        const cars = Array.isArray(data.cars) ? data.cars : [];
-        renderTabs(cars);
-    })
+loadTabs()
+    .then(renderTabs)
     .catch(() => {
         renderError('good_cars.json 파일이 존재하지 않거나<br>차량 데이터가 없습니다.');
     });
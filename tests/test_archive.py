@@ -0,0 +1,58 @@
+import pytest
+
+from encar_archive import PageArchive, ReplayCrawler, replay, replay_fetch_policy, search_page
+from encar_direct_url_simple import (
+    CarConditionFilter,
+    EncarHttpCrawler,
+    EncarMonitor,
+    SqliteListingRepository,
+    set_page_in_search_url,
+)
+from encar_standin_server import StandinServer
+
+@pytest.fixture
+def server():
+    with StandinServer(total=60) as server:
+        yield server
+
+def open_monitor(data_dir, search_url, crawler, **options):
+    repo = SqliteListingRepository(str(data_dir / "encar.db"), str(data_dir / "good_cars.json"))
+    return EncarMonitor(search_url, 600, repo, crawler, CarConditionFilter(), detail_workers=4,
+                        page_size=20, stop_after_known=5, **options)
+
+def test_search_page_ignores_page_and_limit(server):
+    url = server.search_url(limit=1000)
+    search, page = search_page(url)
+    assert page == 1
+    assert search_page(set_page_in_search_url(url, 3, 20)) == (search, 3)
+    assert search_page(server.search_url(action="(And.Hidden.N._.CarType.N.)"))[0] != search
+
+def test_replay_recording_made_from_non_empty_state(server, tmp_path):
+    search_url = server.search_url(limit=1000)
+    crawler = EncarHttpCrawler(min_request_interval=0, detail_base_url=server.detail_base_url,
+                               search_api_url=server.search_api_url)
+    monitor = open_monitor(tmp_path / "live", search_url, crawler)
+    try:
+        # 기록하지 않은 첫 주기(전체 목록 확인)로 확인한 매물을 채운 뒤, 증분 검색 주기만 기록
+        monitor.run_cycle(monitor.searches)
+        crawler.archive = PageArchive(str(tmp_path / "archive"))
+        new_ids = server.catalog.add_listings(3)
+        monitor.run_cycle(monitor.searches)
+        new_ids += server.catalog.add_listings(2)
+        monitor.run_cycle(monitor.searches)
+    finally:
+        monitor.close()
+    archive = PageArchive(str(tmp_path / "archive"))
+    assert {entry['key'] for entry in archive.entries('detail')} == set(new_ids)
+
+    # 빈 상태에서 재생하면 첫 주기는 limit=1000 전체 목록을 요청하지만 기록은 page_size=20 페이지
+    crawler = ReplayCrawler(archive, server.detail_base_url)
+    monitor = open_monitor(tmp_path / "replay", search_url, crawler, fetch_policy=replay_fetch_policy())
+    try:
+        assert replay(monitor, crawler) == 2
+        assert crawler.pending_listings() == 0
+        assert crawler.stats['listing_pages'] == len(archive.entries()) - len(new_ids)
+        assert crawler.stats['detail_pages'] == len(new_ids)
+        assert all(monitor.repo.is_known(car_id) for car_id in new_ids)
+    finally:
+        monitor.close()
@@ -0,0 +1,85 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from encar_async_monitor import AsyncEncarMonitor
+from encar_direct_url_simple import (
+    CarConditionFilter,
+    EncarHttpCrawler,
+    EncarMonitor,
+    SavedSearch,
+    SqliteListingRepository,
+)
+from encar_fetch_policy import CircuitBreaker, FetchError, FetchPolicy
+from encar_standin_server import StandinServer
+
+@pytest.fixture
+def server():
+    # 상세 조회가 겹치도록 응답마다 지연
+    with StandinServer(total=4, latency=0.2) as server:
+        yield server
+
+def open_monitor(tmp_path, server):
+    crawler = EncarHttpCrawler(min_request_interval=0, detail_base_url=server.detail_base_url,
+                               search_api_url=server.search_api_url)
+    repo = SqliteListingRepository(str(tmp_path / "encar.db"), str(tmp_path / "good_cars.json"))
+    # 같은 검색 조건을 이름만 달리 두 번: 두 검색의 매물이 겹침
+    searches = [SavedSearch(name, server.search_url(), check_interval=0.3, filter=CarConditionFilter())
+                for name in ("a", "b")]
+    policy = FetchPolicy(breaker=CircuitBreaker(min_calls=1000), sleep=lambda delay: None)
+    return EncarMonitor(None, None, repo, crawler, None, searches=searches, fetch_policy=policy,
+                        snapshot_file=str(tmp_path / "monitor_state.bin"))
+
+async def run_until(pipeline, done, timeout=10.0):
+    stop = asyncio.Event()
+    task = asyncio.create_task(pipeline.run_async(stop))
+    deadline = time.monotonic() + timeout
+    while not done() and time.monotonic() < deadline:
+        await asyncio.sleep(0.05)
+    stop.set()
+    await asyncio.wait_for(task, timeout)
+
+def test_pipeline_dedupes_details_and_shuts_down(tmp_path, server):
+    monitor = open_monitor(tmp_path, server)
+    pipeline = AsyncEncarMonitor(monitor, detail_workers=8)
+    try:
+        asyncio.run(run_until(pipeline, lambda: pipeline.stats['fetched'] >= 8))
+        assert pipeline.stats['fetched'] == 8
+        assert pipeline.stats['failed'] == 0
+        # 두 검색에 걸린 매물 4개의 상세 페이지는 한 번씩만 조회
+        assert server.requests['detail'] == 4
+        assert pipeline._in_flight == {}
+        keys = [search.known_key(car['id']) for search in monitor.searches for car in server.catalog.page(0, 4)]
+        assert all(monitor.repo.is_known(key) for key in keys)
+        # 종료할 때 flush하면서 스냅샷도 저장
+        assert monitor.load_snapshot()
+    finally:
+        monitor.close()
+
+def test_cancelled_fetch_releases_waiters(tmp_path, server):
+    monitor = open_monitor(tmp_path, server)
+    pipeline = AsyncEncarMonitor(monitor)
+    started = threading.Event()
+    def slow_fetch(url):
+        started.set()
+        time.sleep(0.3)
+        return {'교환': 0, '판금': 0, '부식': 0}, "없음"
+    monitor.crawler.fetch_detail = slow_fetch
+    listing = {'id': "1", 'link': server.detail_base_url + "1", 'title': "", 'price': "", 'region': ""}
+    async def scenario():
+        first = asyncio.create_task(pipeline._fetch_detail(listing))
+        await asyncio.to_thread(started.wait, 2)
+        second = asyncio.create_task(pipeline._fetch_detail(listing))
+        await asyncio.sleep(0)
+        first.cancel()
+        # 먼저 조회하던 작업이 취소되어도 같은 매물을 기다리던 작업은 끝남
+        return await asyncio.wait_for(second, 2)
+    try:
+        detail, error = asyncio.run(scenario())
+        assert detail is None
+        assert isinstance(error, FetchError)
+        assert pipeline._in_flight == {}
+    finally:
+        monitor.close()
@@ -0,0 +1,57 @@
+import os
+import stat
+
+import pytest
+
+import encar_io
+from encar_direct_url_simple import write_bytes_atomic, write_json_atomic
+from encar_metrics import Metrics
+
+def mode(path):
+    return stat.S_IMODE(os.stat(path).st_mode)
+
+def test_new_file_uses_umask(tmp_path):
+    path = str(tmp_path / "good_cars.json")
+    write_json_atomic(path, {'cars': []})
+    # mkstemp의 0600이 아니라 open()으로 만든 파일과 같은 권한
+    assert mode(path) == 0o666 & ~encar_io.process_umask()
+    assert not [name for name in os.listdir(tmp_path) if name.startswith(".tmp-")]
+
+def test_existing_file_keeps_mode(tmp_path):
+    path = str(tmp_path / "monitor_state.bin")
+    write_bytes_atomic(path, b"old")
+    os.chmod(path, 0o604)
+    write_bytes_atomic(path, b"new")
+    assert mode(path) == 0o604
+    with open(path, 'rb') as f:
+        assert f.read() == b"new"
+
+def test_write_prometheus_mode(tmp_path):
+    path = str(tmp_path / "encar.prom")
+    metrics = Metrics()
+    metrics.inc("encar_cycles_total")
+    metrics.write_prometheus(path)
+    assert mode(path) == 0o666 & ~encar_io.process_umask()
+    os.chmod(path, 0o640)
+    metrics.write_prometheus(path)
+    assert mode(path) == 0o640
+    with open(path, 'r', encoding='utf-8') as f:
+        assert "encar_cycles_total 1" in f.read()
+
+def test_write_prometheus_removes_tmp_on_error(tmp_path, monkeypatch):
+    def broken_fsync(fd):
+        raise OSError("disk full")
+    monkeypatch.setattr(os, 'fsync', broken_fsync)
+    with pytest.raises(OSError):
+        Metrics().write_prometheus(str(tmp_path / "encar.prom"))
+    assert os.listdir(tmp_path) == []
+
+def test_umask_is_read_without_changing_it():
+    before = os.umask(0o027)
+    try:
+        encar_io._umask_value = None
+        assert encar_io.process_umask() == 0o027
+        assert os.umask(0o027) == 0o027
+    finally:
+        os.umask(before)
+        encar_io._umask_value = None
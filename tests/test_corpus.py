@@ -0,0 +1,38 @@
+import argparse
+import json
+import os
+
+from encar_archive import PageArchive
+from encar_parser_corpus import build, check, select_entries
+
+CORPUS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "corpus")
+
+def test_committed_corpus_matches_parsers(capsys):
+    # 파서를 바꿔 결과가 달라졌다면 python encar_parser_corpus.py check --corpus tests/corpus 로 확인
+    assert check(argparse.Namespace(corpus=CORPUS, update=False)) == 0
+    assert "달라짐 0개, 오류 0개" in capsys.readouterr().out
+
+def test_build_and_check_detects_changes(tmp_path, capsys):
+    archive = PageArchive(str(tmp_path / "archive"))
+    detail_url = "https://fem.encar.com/cars/detail/1"
+    html = '<div data-impression="성능기록부"><ul><li>교환 1건</li><li>판금 없음</li><li>부식 없음</li></ul></div>'
+    archive.record('detail', detail_url, html)
+    archive.record('detail', detail_url, html)
+    archive.record('detail', detail_url, html.replace("교환 1건", "교환 없음"))
+    # 내용이 같은 페이지는 하나만, 키마다 최근 per_key개만 고름
+    assert len(select_entries(archive, 0)) == 2
+    assert len(select_entries(archive, 1)) == 1
+    corpus = str(tmp_path / "corpus")
+    build(argparse.Namespace(archive=archive.archive_dir, corpus=corpus, per_key=0))
+    assert check(argparse.Namespace(corpus=corpus, update=False)) == 0
+    expected_file = os.path.join(corpus, "expected.json")
+    with open(expected_file, 'r', encoding='utf-8') as f:
+        expected = json.load(f)
+    for result in expected.values():
+        result['performance']['교환'] = 5
+    with open(expected_file, 'w', encoding='utf-8') as f:
+        json.dump(expected, f, ensure_ascii=False)
+    assert check(argparse.Namespace(corpus=corpus, update=False)) == 1
+    assert check(argparse.Namespace(corpus=corpus, update=True)) == 0
+    assert check(argparse.Namespace(corpus=corpus, update=False)) == 0
+    capsys.readouterr()
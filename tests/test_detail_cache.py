@@ -0,0 +1,113 @@
+import pytest
+
+from encar_direct_url_simple import (
+    CarConditionFilter,
+    DetailCache,
+    EncarHttpCrawler,
+    EncarMonitor,
+    SqliteListingRepository,
+    listing_fingerprint,
+    make_listing,
+)
+from encar_standin_server import StandinServer
+
+DETAIL = ({'교환': 0, '판금': 1, '부식': 0}, "없음")
+
+def listing(car_id, price="2,500만원", title="기아 K5 2.0 프레스티지"):
+    return make_listing(car_id, title, price, "서울")
+
+def test_hit_returns_stored_detail():
+    cache = DetailCache(ttl=100)
+    assert cache.get("1", now=0) is None
+    assert cache.put("1", DETAIL, listing("1"), now=0) is False
+    assert cache.get("1", listing_fingerprint(listing("1")), now=10) == DETAIL
+    assert cache.stats['hits'] == 1 and cache.stats['misses'] == 1
+
+def test_entry_expires_after_ttl():
+    cache = DetailCache(ttl=100)
+    cache.put("1", DETAIL, now=0)
+    assert cache.get("1", now=100) == DETAIL
+    assert cache.get("1", now=100.5) is None
+    assert cache.stats['expired'] == 1
+    # 다시 저장하면 그 시각부터 다시 유효
+    cache.put("1", DETAIL, now=100.5)
+    assert cache.get("1", now=150) == DETAIL
+
+def test_zero_ttl_never_expires():
+    cache = DetailCache(ttl=0)
+    cache.put("1", DETAIL, now=0)
+    assert cache.get("1", now=10 ** 9) == DETAIL
+
+def test_fingerprint_change_invalidates():
+    cache = DetailCache()
+    cache.put("1", DETAIL, listing("1"), now=0)
+    assert cache.get("1", listing_fingerprint(listing("1", price="2,300만원")), now=1) is None
+    assert cache.get("1", listing_fingerprint(listing("1", title="기아 K5 2.0 트렌디")), now=1) is None
+    assert cache.stats['changed_listing'] == 2
+    # 지문 없이 조회하거나 지역만 바뀌면 그대로 사용
+    assert cache.get("1", now=1) == DETAIL
+    moved = make_listing("1", "기아 K5 2.0 프레스티지", "2,500만원", "부산")
+    assert cache.get("1", listing_fingerprint(moved), now=1) == DETAIL
+
+def test_put_reports_content_change():
+    cache = DetailCache()
+    assert cache.put("1", DETAIL, now=0) is False
+    assert cache.put("1", DETAIL, now=1) is False
+    assert cache.put("1", ({'교환': 1, '판금': 1, '부식': 0}, "없음"), now=2) is True
+    assert cache.put("1", ({'교환': 1, '판금': 1, '부식': 0}, "렌트"), now=3) is True
+    assert cache.stats['changed_content'] == 2
+    # 키 순서만 다른 것은 같은 내용
+    assert cache.put("1", ({'부식': 0, '판금': 1, '교환': 1}, "렌트"), now=4) is False
+
+def test_lru_eviction_runs_every_100_puts():
+    cache = DetailCache(ttl=0, max_entries=50)
+    for i in range(99):
+        cache.put(str(i), DETAIL, now=i)
+    # 100번째 저장 전까지는 정리하지 않음
+    assert len(cache) == 99
+    # 가장 먼저 저장한 항목을 최근에 사용
+    cache.get("0", now=1000)
+    cache.put("99", DETAIL, now=99)
+    assert len(cache) == 50
+    assert cache.get("0", now=1001) == DETAIL
+    assert cache.get("1", now=1001) is None
+    assert cache.get("50", now=1001) is None
+    assert cache.get("51", now=1001) == DETAIL
+    assert cache.get("99", now=1001) == DETAIL
+
+def test_close_evicts_pending_overflow(tmp_path):
+    db_file = str(tmp_path / "cache.db")
+    cache = DetailCache(db_file, ttl=0, max_entries=5)
+    for i in range(10):
+        cache.put(str(i), DETAIL, now=i)
+    assert len(cache) == 10
+    cache.close()
+    cache = DetailCache(db_file, ttl=0, max_entries=5)
+    assert len(cache) == 5
+    assert cache.get("9", now=20) == DETAIL
+    cache.close()
+
+@pytest.fixture
+def server():
+    with StandinServer(total=3) as server:
+        yield server
+
+def test_stale_fingerprint_forces_refetch(tmp_path, server):
+    crawler = EncarHttpCrawler(min_request_interval=0, detail_base_url=server.detail_base_url,
+                               search_api_url=server.search_api_url)
+    repo = SqliteListingRepository(str(tmp_path / "encar.db"), str(tmp_path / "good_cars.json"))
+    monitor = EncarMonitor(server.search_url(), 600, repo, crawler, CarConditionFilter(), detail_workers=1)
+    listings = crawler.fetch_listings(server.search_url())
+    details = monitor.fetch_candidate_details(listings)
+    assert sorted(details) == sorted(l['id'] for l in listings)
+    assert server.requests['detail'] == 3
+    # 같은 목록 행이면 캐시 사용
+    assert monitor.fetch_candidate_details(listings) == details
+    assert server.requests['detail'] == 3
+    # 가격이 바뀐 매물만 다시 가져옴
+    listings[1]['price'] = "1,000만원"
+    assert monitor.fetch_candidate_details(listings) == details
+    assert server.requests['detail'] == 4
+    assert monitor.fetch_candidate_details(listings) == details
+    assert server.requests['detail'] == 4
+    monitor.close()
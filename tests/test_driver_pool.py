@@ -0,0 +1,143 @@
+import threading
+import time
+
+import pytest
+
+from encar_direct_url_simple import ChromeDriverPool
+
+class FakeDriver:
+    def __init__(self, number):
+        self.number = number
+        self.crashed = False
+        self.quit_called = False
+    @property
+    def current_url(self):
+        if self.crashed:
+            raise ConnectionError("browser is gone")
+        return "about:blank"
+    def quit(self):
+        self.quit_called = True
+
+class FakeFactory:
+    def __init__(self):
+        self.drivers = []
+        self._lock = threading.Lock()
+    def __call__(self):
+        with self._lock:
+            driver = FakeDriver(len(self.drivers) + 1)
+            self.drivers.append(driver)
+        return driver
+
+def test_reuses_idle_driver():
+    factory = FakeFactory()
+    pool = ChromeDriverPool(factory, size=2, max_pages_per_driver=0)
+    for _ in range(5):
+        with pool.lease() as driver:
+            assert driver is factory.drivers[0]
+    assert len(factory.drivers) == 1
+    assert pool.summary()['startups'] == 1
+    assert pool.summary()['startups_avoided'] == 4
+    assert pool.summary()['pages_total'] == 5
+
+def test_leases_at_most_size_drivers():
+    factory = FakeFactory()
+    pool = ChromeDriverPool(factory, size=2)
+    lock = threading.Lock()
+    in_use = set()
+    most = [0]
+    def work():
+        with pool.lease() as driver:
+            with lock:
+                assert driver not in in_use
+                in_use.add(driver)
+                most[0] = max(most[0], len(in_use))
+            time.sleep(0.02)
+            with lock:
+                in_use.discard(driver)
+    threads = [threading.Thread(target=work) for _ in range(6)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert most[0] == 2
+    assert len(factory.drivers) == 2
+    assert pool.summary()['pages_total'] == 6
+
+def test_recycles_after_max_pages():
+    factory = FakeFactory()
+    pool = ChromeDriverPool(factory, max_pages_per_driver=3)
+    used = []
+    for _ in range(7):
+        with pool.lease() as driver:
+            used.append(driver.number)
+    assert used == [1, 1, 1, 2, 2, 2, 3]
+    assert factory.drivers[0].quit_called and factory.drivers[1].quit_called
+    assert not factory.drivers[2].quit_called
+    summary = pool.summary()
+    assert summary['recycled'] == 2
+    assert summary['startups'] == 3
+    assert summary['pages_per_driver'] == round(7 / 3, 1)
+
+def test_replaces_driver_that_crashed_during_lease():
+    factory = FakeFactory()
+    pool = ChromeDriverPool(factory)
+    with pytest.raises(RuntimeError):
+        with pool.lease() as driver:
+            driver.crashed = True
+            raise RuntimeError("page load failed")
+    assert factory.drivers[0].quit_called
+    with pool.lease() as driver:
+        assert driver.number == 2
+    assert pool.summary()['crashes'] == 1
+
+def test_keeps_healthy_driver_after_failed_page():
+    factory = FakeFactory()
+    pool = ChromeDriverPool(factory)
+    with pytest.raises(ValueError):
+        with pool.lease():
+            raise ValueError("parse failed")
+    with pool.lease() as driver:
+        assert driver.number == 1
+    assert pool.summary()['crashes'] == 0
+
+def test_replaces_idle_driver_that_died():
+    factory = FakeFactory()
+    pool = ChromeDriverPool(factory)
+    with pool.lease() as driver:
+        pass
+    # 풀에서 쉬는 동안 브라우저가 종료됨
+    driver.crashed = True
+    with pool.lease() as replacement:
+        assert replacement.number == 2
+    assert driver.quit_called
+    assert pool.summary()['crashes'] == 1
+
+def test_failed_startup_frees_slot():
+    factory = FakeFactory()
+    calls = [0]
+    def flaky_factory():
+        calls[0] += 1
+        if calls[0] == 1:
+            raise OSError("chromedriver not found")
+        return factory()
+    pool = ChromeDriverPool(flaky_factory, size=1)
+    with pytest.raises(OSError):
+        with pool.lease():
+            pass
+    with pool.lease() as driver:
+        assert driver.number == 1
+
+def test_close_quits_idle_and_returned_drivers():
+    factory = FakeFactory()
+    pool = ChromeDriverPool(factory, size=2)
+    with pool.lease():
+        pass
+    with pool.lease() as first:
+        with pool.lease() as second:
+            pool.close()
+            # 빌려 간 드라이버는 반납할 때 종료
+            assert not first.quit_called and not second.quit_called
+    assert all(driver.quit_called for driver in factory.drivers)
+    with pytest.raises(RuntimeError):
+        with pool.lease():
+            pass
@@ -0,0 +1,52 @@
+import json
+import os
+import stat
+
+import encar_io
+from encar_direct_url_simple import GoodCarsFeed
+
+def car(car_id, title):
+    return {'carId': car_id, 'title': title, 'price': "2,500만원", 'region': "서울", 'exchange': 0, 'panel': 0,
+            'corrosion': 0, 'special_note': "없음", 'url': f"https://example.test/{car_id}", 'check_time': ""}
+
+def read_json(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+def test_feed_writes_changed_groups_only(tmp_path):
+    feed_dir = str(tmp_path / "feed")
+    feed = GoodCarsFeed(feed_dir)
+    feed.add(car("1", "스팅어"))
+    feed.add(car("2", "K5"))
+    feed.flush()
+    index = read_json(os.path.join(feed_dir, "index.json"))
+    assert [(group['title'], group['count']) for group in index['groups']] == [("스팅어", 1), ("K5", 1)]
+    files = {group['title']: group['file'] for group in index['groups']}
+    feed.add(car("3", "스팅어"))
+    feed.flush()
+    index = read_json(os.path.join(feed_dir, "index.json"))
+    new_files = {group['title']: group['file'] for group in index['groups']}
+    assert new_files["K5"] == files["K5"]
+    assert new_files["스팅어"] != files["스팅어"]
+    # 이전 그룹 파일은 지워짐
+    assert not os.path.exists(os.path.join(feed_dir, files["스팅어"]))
+    rows = read_json(os.path.join(feed_dir, new_files["스팅어"]))['rows']
+    assert [row[index['columns'].index('carId')] for row in rows] == ["1", "3"]
+    # 다시 열면 기존 그룹에 이어서 추가
+    reopened = GoodCarsFeed(feed_dir)
+    assert reopened.exists
+    reopened.add(car("4", "K5"))
+    reopened.flush()
+    index = read_json(os.path.join(feed_dir, "index.json"))
+    assert [group['count'] for group in index['groups']] == [2, 2]
+
+def test_feed_files_are_not_private(tmp_path):
+    feed_dir = str(tmp_path / "feed")
+    feed = GoodCarsFeed(feed_dir)
+    feed.add(car("1", "스팅어"))
+    feed.flush()
+    expected = 0o666 & ~encar_io.process_umask()
+    index = read_json(os.path.join(feed_dir, "index.json"))
+    paths = [os.path.join(feed_dir, "index.json")] + [os.path.join(feed_dir, g['file']) for g in index['groups']]
+    for path in paths:
+        assert stat.S_IMODE(os.stat(path).st_mode) == expected
@@ -0,0 +1,122 @@
+import threading
+import time
+
+import pytest
+
+from encar_direct_url_simple import EncarHttpCrawler, HostRateLimiter, fetch_details_concurrently
+from encar_fetch_policy import PermanentFetchError
+from encar_standin_server import StandinServer
+
+@pytest.fixture
+def server():
+    with StandinServer(total=6, latency=0.02) as server:
+        yield server
+
+@pytest.fixture
+def crawler(server):
+    crawler = EncarHttpCrawler(min_request_interval=0, pool_size=4, detail_base_url=server.detail_base_url,
+                               search_api_url=server.search_api_url)
+    yield crawler
+    crawler.close()
+
+def detail_urls(server, count):
+    return [server.detail_base_url + car['id'] for car in server.catalog.page(0, count)]
+
+def test_results_keep_input_order_when_finishing_out_of_order():
+    # 앞쪽 항목일수록 늦게 끝나도록
+    delays = [0.08, 0.06, 0.04, 0.02, 0.0]
+    finished = []
+    def fetch(i):
+        time.sleep(delays[i])
+        finished.append(i)
+        return f"detail-{i}"
+    results = fetch_details_concurrently(fetch, range(5), max_workers=5)
+    assert results == [f"detail-{i}" for i in range(5)]
+    assert finished != sorted(finished)
+
+def test_runs_up_to_max_workers_at_once():
+    lock = threading.Lock()
+    running = [0, 0]  # 현재, 최대
+    def fetch(i):
+        with lock:
+            running[0] += 1
+            running[1] = max(running[1], running[0])
+        time.sleep(0.03)
+        with lock:
+            running[0] -= 1
+        return i
+    assert fetch_details_concurrently(fetch, range(8), max_workers=3) == list(range(8))
+    assert running[1] == 3
+
+def test_empty_input():
+    assert fetch_details_concurrently(lambda url: url, [], max_workers=4) == []
+
+def test_partial_failure_fills_errors_map():
+    def fetch(i):
+        if i % 2:
+            raise ValueError(f"실패 {i}")
+        return i
+    errors = {}
+    results = fetch_details_concurrently(fetch, range(5), max_workers=2, errors=errors)
+    assert results == [0, None, 2, None, 4]
+    assert sorted(errors) == [1, 3]
+    assert all(isinstance(e, ValueError) for e in errors.values())
+
+def test_http_details_in_order_with_missing_car(server, crawler):
+    urls = detail_urls(server, 4)
+    urls.insert(2, server.detail_base_url + "1")  # 카탈로그에 없는 carId → 404
+    expected = [crawler.fetch_detail(url) if i != 2 else None for i, url in enumerate(urls)]
+    errors = {}
+    results = crawler.fetch_details(urls, errors=errors)
+    assert results == expected
+    assert list(errors) == [2]
+    assert isinstance(errors[2], PermanentFetchError)
+
+def test_rate_limiter_spaces_requests_to_same_host():
+    limiter = HostRateLimiter(min_interval=0.05)
+    stamps = []
+    lock = threading.Lock()
+    def worker():
+        for _ in range(3):
+            limiter.wait("http://a.example/detail")
+            with lock:
+                stamps.append(time.monotonic())
+    threads = [threading.Thread(target=worker) for _ in range(3)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    stamps.sort()
+    assert len(stamps) == 9
+    # 첫 요청은 바로 나가고 이후는 min_interval 간격으로 예약되므로 9번째 요청은 8간격 뒤에 나감
+    assert stamps[-1] - stamps[0] >= 8 * 0.05 - 0.01
+
+def test_rate_limiter_keeps_hosts_independent():
+    limiter = HostRateLimiter(min_interval=0.5)
+    start = time.monotonic()
+    limiter.wait("http://a.example/1")
+    limiter.wait("http://b.example/1")
+    limiter.wait("http://c.example:8080/1")
+    assert time.monotonic() - start < 0.1
+
+def test_rate_limiter_disabled_with_zero_interval():
+    limiter = HostRateLimiter(min_interval=0)
+    start = time.monotonic()
+    for _ in range(100):
+        limiter.wait("http://a.example/1")
+    assert time.monotonic() - start < 0.1
+    assert limiter.rate("http://a.example/1") is None
+
+def test_rate_limiter_penalize_and_reward():
+    limiter = HostRateLimiter(min_interval=1.0, min_rate_factor=0.25, recovery=0.5)
+    url = "http://a.example/1"
+    limiter.penalize(url)
+    assert limiter.rate(url) == 0.5
+    limiter.penalize(url)
+    limiter.penalize(url)
+    assert limiter.rate(url) == 0.25
+    limiter.reward(url)
+    assert limiter.rate(url) == 0.75
+    limiter.reward(url)
+    assert limiter.rate(url) == 1.0
+    assert limiter.rate("http://b.example/1") == 1.0
@@ -0,0 +1,210 @@
+import pytest
+import requests
+
+from encar_direct_url_simple import CarConditionFilter, EncarHttpCrawler, EncarMonitor, SqliteListingRepository
+from encar_fetch_policy import (
+    CircuitBreaker,
+    CircuitOpenError,
+    FetchPolicy,
+    PermanentFetchError,
+    RetryBudget,
+    backoff_delay,
+)
+from encar_metrics import metrics
+from encar_standin_server import StandinServer
+
+class MaxRandom:
+    """uniform이 항상 상한을 돌려줘 백오프 시간을 예측할 수 있게 함"""
+    def uniform(self, low, high):
+        return high
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+    def __call__(self):
+        return self.now
+
+@pytest.fixture
+def server():
+    with StandinServer(total=3) as server:
+        yield server
+
+@pytest.fixture
+def crawler(server):
+    crawler = EncarHttpCrawler(min_request_interval=0, detail_base_url=server.detail_base_url,
+                               search_api_url=server.search_api_url)
+    yield crawler
+    crawler.close()
+
+def make_policy(sleeps, **options):
+    options.setdefault('breaker', CircuitBreaker(min_calls=1000))
+    return FetchPolicy(sleep=sleeps.append, rng=MaxRandom(), **options)
+
+def detail_url(server):
+    return server.detail_base_url + server.catalog.page(0, 1)[0]['id']
+
+def test_backoff_grows_until_cap():
+    assert [backoff_delay(attempt, 1.0, 10.0, MaxRandom()) for attempt in range(1, 6)] == [2, 4, 8, 10, 10]
+
+def test_retries_with_backoff_until_success(server, crawler):
+    sleeps = []
+    policy = make_policy(sleeps, max_attempts=4, base_delay=0.5)
+    server.fail_next(3)
+    performance, note = policy.call(crawler.fetch_detail, detail_url(server))
+    assert performance is not None
+    assert sleeps == [1.0, 2.0, 4.0]
+    assert policy.stats['retries'] == 3
+    assert server.requests['errors'] == 3
+
+def test_gives_up_after_max_attempts(server, crawler):
+    sleeps = []
+    policy = make_policy(sleeps, max_attempts=2)
+    server.fail_next(5)
+    with pytest.raises(requests.HTTPError):
+        policy.call(crawler.fetch_detail, detail_url(server))
+    assert len(sleeps) == 1
+    assert policy.stats['failures'] == 1
+
+def test_retry_budget_limits_retries_per_cycle(server, crawler):
+    sleeps = []
+    policy = make_policy(sleeps, max_attempts=5, retries_per_cycle=2)
+    server.fail_next(10)
+    with pytest.raises(requests.HTTPError):
+        policy.call(crawler.fetch_detail, detail_url(server))
+    # 재시도 2번 뒤 예산이 없어 중단
+    assert len(sleeps) == 2
+    assert policy.stats['budget_exhausted'] == 1
+    assert policy.budget.remaining == 0
+    policy.start_cycle()
+    assert policy.budget.remaining == 2
+
+def test_retry_budget_try_spend():
+    budget = RetryBudget(per_cycle=1)
+    assert budget.try_spend()
+    assert not budget.try_spend()
+
+def test_permanent_error_is_not_retried(server, crawler):
+    sleeps = []
+    policy = make_policy(sleeps)
+    with pytest.raises(PermanentFetchError):
+        policy.call(crawler.fetch_detail, server.detail_base_url + "1")
+    assert sleeps == []
+    assert server.requests['detail'] == 1
+    # 사이트는 정상 응답했으므로 브레이커에는 성공으로 기록
+    assert list(policy.breaker.outcomes) == [True]
+
+def test_breaker_opens_and_recovers_through_half_open(server, crawler):
+    clock = FakeClock()
+    breaker = CircuitBreaker(failure_ratio=0.5, window=4, min_calls=4, cooldown=30.0, clock=clock)
+    policy = make_policy([], max_attempts=1, breaker=breaker)
+    url = detail_url(server)
+    server.error_rate = 1.0
+    for _ in range(4):
+        with pytest.raises(requests.HTTPError):
+            policy.call(crawler.fetch_detail, url)
+    assert breaker.state == CircuitBreaker.OPEN
+    requests_before = server.requests['errors']
+    with pytest.raises(CircuitOpenError):
+        policy.call(crawler.fetch_detail, url)
+    # 열려 있는 동안에는 요청을 보내지 않음
+    assert server.requests['errors'] == requests_before
+    assert breaker.seconds_until_retry() == 30.0
+    clock.now = 31.0
+    # half-open: 시험 요청이 실패하면 다시 열림
+    with pytest.raises(requests.HTTPError):
+        policy.call(crawler.fetch_detail, url)
+    assert breaker.state == CircuitBreaker.OPEN
+    clock.now = 62.0
+    server.error_rate = 0.0
+    assert policy.call(crawler.fetch_detail, url)[0] is not None
+    assert breaker.state == CircuitBreaker.CLOSED
+
+def test_half_open_allows_one_trial():
+    clock = FakeClock()
+    breaker = CircuitBreaker(window=2, min_calls=2, cooldown=10.0, clock=clock)
+    breaker.record(False)
+    breaker.record(False)
+    clock.now = 11.0
+    assert breaker.allow()
+    assert not breaker.allow()
+    breaker.record(True)
+    assert breaker.state == CircuitBreaker.CLOSED
+
+def test_interrupted_trial_releases_half_open_breaker():
+    clock = FakeClock()
+    breaker = CircuitBreaker(window=2, min_calls=2, cooldown=10.0, clock=clock)
+    breaker.record(False)
+    breaker.record(False)
+    clock.now = 11.0
+    policy = FetchPolicy(breaker=breaker, sleep=lambda delay: None)
+    def interrupted(url):
+        raise KeyboardInterrupt
+    with pytest.raises(KeyboardInterrupt):
+        policy.call(interrupted, "http://example.test/1")
+    # 시험 요청이 결과 없이 끝났으므로 다음 시험 요청을 통과시킴
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    assert policy.call(lambda url: "ok", "http://example.test/1") == "ok"
+    assert breaker.state == CircuitBreaker.CLOSED
+
+def open_monitor(tmp_path, server, crawler, max_detail_attempts):
+    repo = SqliteListingRepository(str(tmp_path / "encar.db"), str(tmp_path / "good_cars.json"))
+    policy = FetchPolicy(max_attempts=1, breaker=CircuitBreaker(min_calls=1000), sleep=lambda delay: None)
+    return EncarMonitor(server.search_url(), 600, repo, crawler, CarConditionFilter(), detail_workers=1,
+                        fetch_policy=policy, max_detail_attempts=max_detail_attempts)
+
+def fail_details_only(monkeypatch, server, crawler):
+    # 목록은 정상으로 받고 상세 페이지만 실패하게 함
+    fetch_listings = crawler.fetch_listings
+    def listings_without_errors(url):
+        error_rate, server.error_rate = server.error_rate, 0.0
+        try:
+            return fetch_listings(url)
+        finally:
+            server.error_rate = error_rate
+    monkeypatch.setattr(crawler, 'fetch_listings', listings_without_errors)
+
+def test_retry_queue_retries_then_succeeds(tmp_path, monkeypatch, server, crawler):
+    fail_details_only(monkeypatch, server, crawler)
+    monitor = open_monitor(tmp_path, server, crawler, max_detail_attempts=3)
+    try:
+        server.error_rate = 1.0
+        assert monitor.run_cycle(monitor.searches) == []
+        assert sorted(entry[2] for entry in monitor.retry_queue.values()) == [1, 1, 1]
+        assert not any(key in monitor.known_listings for key in monitor.retry_queue)
+        server.error_rate = 0.0
+        assert len(monitor.run_cycle(monitor.searches)) == 3
+        assert monitor.retry_queue == {}
+    finally:
+        monitor.close()
+
+def test_retry_queue_drops_after_max_attempts(tmp_path, monkeypatch, server, crawler):
+    fail_details_only(monkeypatch, server, crawler)
+    monitor = open_monitor(tmp_path, server, crawler, max_detail_attempts=2)
+    dropped = metrics.counter_value("encar_retry_dropped_total")
+    try:
+        server.error_rate = 1.0
+        monitor.run_cycle(monitor.searches)
+        assert len(monitor.retry_queue) == 3
+        monitor.run_cycle(monitor.searches)
+        assert monitor.retry_queue == {}
+        assert metrics.counter_value("encar_retry_dropped_total") == dropped + 3
+        # 확인한 것으로 표시하지 않으므로 전체 목록 확인 때 다시 발견되면 재시도
+        assert len(monitor.known_listings) == 0
+    finally:
+        monitor.close()
+
+def test_queue_retry_error_kinds(tmp_path, server, crawler):
+    monitor = open_monitor(tmp_path, server, crawler, max_detail_attempts=2)
+    search = monitor.searches[0]
+    listing = {'id': "1", 'title': "", 'price': "", 'region': ""}
+    try:
+        # 서킷 브레이커 때문에 조회하지 못한 경우는 실패 횟수에 넣지 않음
+        monitor.queue_retry(search, listing, CircuitOpenError("open"))
+        assert monitor.retry_queue["1"][2] == 0
+        # 삭제된 매물은 확인한 것으로 표시
+        monitor.queue_retry(search, listing, PermanentFetchError("404"))
+        assert monitor.retry_queue == {}
+        assert "1" in monitor.known_listings
+        assert monitor.repo.is_known("1")
+    finally:
+        monitor.close()
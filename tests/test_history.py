@@ -0,0 +1,102 @@
+import sqlite3
+
+import pytest
+
+from encar_history import ListingHistory
+
+DAY = 24 * 3600
+
+def row(car_id, price, region="서울", title="기아 K5"):
+    return {'id': car_id, 'price': f"{price:,}만원" if price else "", 'region': region, 'title': title}
+
+@pytest.fixture
+def history():
+    history = ListingHistory(":memory:", relist_after=3 * DAY, touch_interval=6 * 3600)
+    yield history
+    history.close()
+
+def test_new_listing(history):
+    assert history.observe([row("1", 2500)], now=0) == [("1", 'new', None, 2500)]
+    assert history.history("1") == [(0, 'new', 2500, None, "서울", "기아 K5")]
+
+def test_unchanged_listing_is_not_recorded(history):
+    history.observe([row("1", 2500)], now=0)
+    assert history.observe([row("1", 2500)], now=60) == []
+    assert len(history.history("1")) == 1
+    assert history.stats['unchanged'] == 1
+
+def test_price_change(history):
+    history.observe([row("1", 2500)], now=0)
+    assert history.observe([row("1", 2300)], now=60) == [("1", 'price', 2500, 2300)]
+    assert history.history("1")[-1] == (60, 'price', 2300, 2500, "서울", "기아 K5")
+    # 가격이 빠진 행은 가격 변경으로 보지 않고 이전 가격을 유지
+    assert history.observe([row("1", None)], now=120) == []
+    assert history.observe([row("1", 2300)], now=180) == []
+
+def test_info_change(history):
+    history.observe([row("1", 2500)], now=0)
+    assert history.observe([row("1", 2500, region="부산")], now=60) == [("1", 'info', 2500, 2500)]
+    assert history.observe([row("1", 2400, region="부산", title="기아 K5 프레스티지")], now=120) == [
+        ("1", 'price', 2500, 2400), ("1", 'info', 2500, 2400)]
+    assert [(at, event) for at, event, *_ in history.history("1")][:2] == [(0, 'new'), (60, 'info')]
+    assert sorted(event for at, event, *_ in history.history("1") if at == 120) == ['info', 'price']
+
+def test_relisted_after_absence(history):
+    history.observe([row("1", 2500)], now=0)
+    assert history.observe([row("1", 2500)], now=3 * DAY - 1) == []
+    # 마지막으로 본 시각(touch_interval마다 갱신)부터 relist_after가 지나야 다시 등록으로 봄
+    assert history.observe([row("1", 2500)], now=6 * DAY - 2) == []
+    assert history.observe([row("1", 2400)], now=9 * DAY) == [("1", 'relisted', 2500, 2400),
+                                                             ("1", 'price', 2500, 2400)]
+    assert history.stats['relisted'] == 1
+
+def test_price_drops_threshold(history):
+    history.observe([row("1", 3000), row("2", 3000), row("3", 3000)], now=0)
+    history.observe([row("1", 2500), row("2", 2800), row("3", 3100)], now=DAY)
+    drops = history.price_drops(min_drop=0.1, days=7, now=2 * DAY)
+    assert [d['carId'] for d in drops] == ["1"]
+    assert drops[0]['max_price'] == 3000 and drops[0]['price'] == 2500
+    assert drops[0]['drop'] == round(500 / 3000, 4)
+    assert drops[0]['changed_at'] == DAY
+    assert [d['carId'] for d in history.price_drops(min_drop=0.05, days=7, now=2 * DAY)] == ["1", "2"]
+
+def test_price_drops_use_highest_price_in_window(history):
+    history.observe([row("1", 3000)], now=0)
+    history.observe([row("1", 3300)], now=DAY)
+    history.observe([row("1", 2900)], now=2 * DAY)
+    # 기간 내 최고가(3300) 기준으로 약 12% 인하
+    drops = history.price_drops(min_drop=0.1, days=7, now=3 * DAY)
+    assert drops[0]['max_price'] == 3300 and drops[0]['price'] == 2900
+
+def test_price_drops_window(history):
+    history.observe([row("1", 3000), row("2", 3000)], now=0)
+    history.observe([row("1", 2000)], now=DAY)
+    history.observe([row("2", 2000)], now=9 * DAY)
+    assert [d['carId'] for d in history.price_drops(min_drop=0.1, days=7, now=10 * DAY)] == ["2"]
+    assert sorted(d['carId'] for d in history.price_drops(min_drop=0.1, days=10, now=10 * DAY)) == ["1", "2"]
+
+def test_price_drops_on_fresh_db(tmp_path):
+    # INDEXED BY는 인덱스가 없으면 오류가 나므로 새 파일에서도 조회가 되어야 함
+    db_file = str(tmp_path / "encar.db")
+    history = ListingHistory(db_file)
+    assert history.price_drops() == []
+    history.close()
+    history = ListingHistory(db_file)
+    history.observe([row("1", 3000)], now=0)
+    history.observe([row("1", 2000)], now=1)
+    assert [d['carId'] for d in history.price_drops(now=2)] == ["1"]
+    history.close()
+    conn = sqlite3.connect(db_file)
+    names = {name for (name,) in conn.execute("SELECT name FROM sqlite_master WHERE type = 'index'")}
+    conn.close()
+    assert "idx_price_changes" in names
+
+def test_observe_stream_records_partial_batches(history):
+    history.batch_size = 2
+    stream = history.observe_stream([row(str(i), 2500) for i in range(5)], now=0)
+    assert [listing['id'] for listing in stream] == ["0", "1", "2", "3", "4"]
+    assert history.stats['new'] == 5
+    stream = history.observe_stream([row(str(i), 2400) for i in range(5, 10)], now=0)
+    next(stream)
+    stream.close()
+    assert history.stats['new'] == 6
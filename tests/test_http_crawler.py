@@ -0,0 +1,115 @@
+import pytest
+import requests
+
+from encar_direct_url_simple import EncarHttpCrawler, IncompleteDetailError
+from encar_standin_server import StandinServer, synthetic_car
+
+class FakeBrowserCrawler:
+    """HTTP로 처리하지 못한 페이지를 넘겨받는 브라우저 크롤러 대역"""
+    def __init__(self):
+        self.calls = []
+        self.closed = False
+    def fetch_listings(self, search_url):
+        self.calls.append(('list', search_url))
+        return [{'id': "browser"}]
+    def fetch_detail(self, detail_url):
+        self.calls.append(('detail', detail_url))
+        return {'교환': 0, '판금': 0, '부식': 0}, "브라우저"
+    def close(self):
+        self.closed = True
+
+@pytest.fixture
+def server():
+    with StandinServer(total=20) as server:
+        yield server
+
+def make_crawler(server, fallback=None, **options):
+    options.setdefault('detail_base_url', server.detail_base_url)
+    options.setdefault('search_api_url', server.search_api_url)
+    return EncarHttpCrawler(fallback=fallback, min_request_interval=0, **options)
+
+def expected_detail(car_id):
+    car = synthetic_car(car_id)
+    performance = {'교환': car['exchange'], '판금': car['panel'], '부식': car['corrosion']}
+    return performance, ", ".join(car['special_notes']) or "없음"
+
+def test_listings_come_from_search_api(server):
+    crawler = make_crawler(server)
+    listings = crawler.fetch_listings(server.search_url(limit=5))
+    # 검색 페이지는 스크립트로 채워지므로 API로 넘어감
+    assert server.requests == {'search': 1, 'api': 1}
+    assert [l['id'] for l in listings] == [car['id'] for car in server.catalog.page(0, 5)]
+    car = synthetic_car(listings[0]['id'])
+    assert listings[0]['title'] == f"{car['manufacturer']} {car['model']} {car['badge']}"
+    assert listings[0]['price'] == f"{car['price']:,}만원"
+    assert listings[0]['region'] == car['region']
+    assert listings[0]['link'] == server.detail_base_url + car['id']
+    assert crawler.stats['http_listings'] == 1
+
+def test_search_api_follows_page_and_limit(server):
+    crawler = make_crawler(server)
+    search_url = server.search_url(limit=5).replace("%22page%22%3A%201", "%22page%22%3A%203")
+    listings = crawler.fetch_listings(search_url)
+    assert [l['id'] for l in listings] == [car['id'] for car in server.catalog.page(10, 5)]
+
+def test_listings_without_search_api(server):
+    crawler = make_crawler(server, use_search_api=False)
+    assert crawler.fetch_listings(server.search_url(limit=5)) == []
+    assert 'api' not in server.requests
+
+def test_details_are_parsed_over_http(server):
+    crawler = make_crawler(server)
+    for car in server.catalog.page(0, 20):
+        assert crawler.fetch_detail(server.detail_base_url + car['id']) == expected_detail(car['id'])
+    assert server.requests['detail'] == 20
+    assert crawler.stats['http_details'] == 20
+
+def test_empty_listing_page_falls_back_to_browser(server):
+    fallback = FakeBrowserCrawler()
+    with StandinServer(total=0) as empty:
+        crawler = make_crawler(empty, fallback=fallback)
+        search_url = empty.search_url(limit=5)
+        assert crawler.fetch_listings(search_url) == [{'id': "browser"}]
+    assert fallback.calls == [('list', search_url)]
+    assert crawler.stats['fallback_listings'] == 1
+    assert crawler.stats['http_listings'] == 0
+
+def test_non_json_api_response_falls_back_to_browser(server):
+    fallback = FakeBrowserCrawler()
+    # API 대신 HTML이 돌아오는 경우 (차단 페이지 등)
+    crawler = make_crawler(server, fallback=fallback, search_api_url=server.base_url + "/dc/dc_carsearchlist.do")
+    assert crawler.fetch_listings(server.search_url(limit=5)) == [{'id': "browser"}]
+    assert crawler.stats['fallback_listings'] == 1
+
+def test_non_json_api_response_raises_without_fallback(server):
+    crawler = make_crawler(server, search_api_url=server.base_url + "/dc/dc_carsearchlist.do")
+    with pytest.raises(ValueError):
+        crawler.fetch_listings(server.search_url(limit=5))
+
+def test_detail_without_inspection_falls_back_to_browser(server):
+    fallback = FakeBrowserCrawler()
+    # 상세 영역이 없는 페이지가 돌아오는 경우
+    crawler = make_crawler(server, fallback=fallback, detail_base_url=server.base_url + "/dc/dc_carsearchlist.do?id=")
+    detail_url = crawler.detail_base_url + server.catalog.page(0, 1)[0]['id']
+    assert crawler.fetch_detail(detail_url) == ({'교환': 0, '판금': 0, '부식': 0}, "브라우저")
+    assert fallback.calls == [('detail', detail_url)]
+    assert crawler.stats['fallback_details'] == 1
+    crawler.close()
+    assert fallback.closed
+
+def test_detail_without_inspection_raises_without_fallback(server):
+    crawler = make_crawler(server, detail_base_url=server.base_url + "/dc/dc_carsearchlist.do?id=")
+    with pytest.raises(IncompleteDetailError):
+        crawler.fetch_detail(crawler.detail_base_url + "1")
+
+def test_http_errors_are_not_sent_to_browser(server):
+    fallback = FakeBrowserCrawler()
+    crawler = make_crawler(server, fallback=fallback)
+    server.fail_next(1)
+    with pytest.raises(requests.HTTPError):
+        crawler.fetch_listings(server.search_url(limit=5))
+    server.fail_next(1)
+    with pytest.raises(requests.HTTPError):
+        crawler.fetch_detail(server.detail_base_url + server.catalog.page(0, 1)[0]['id'])
+    # 일시적인 오류는 조회 정책이 재시도하도록 그대로 올림
+    assert fallback.calls == []
@@ -0,0 +1,83 @@
+from encar_idset import BloomKnownSet, KnownIdSet
+
+def test_known_id_set_membership():
+    known = KnownIdSet.from_keys(["38000001", "기본:38000002", "not-a-number"])
+    assert "38000001" in known
+    assert "기본:38000002" in known
+    assert "not-a-number" in known
+    assert "38000002" not in known
+    assert "다른검색:38000002" not in known
+    known.add("38000003")
+    known.add("38000003")
+    assert "38000003" in known
+    assert len(known) == 4
+    known.discard("38000001")
+    assert "38000001" not in known
+    assert sorted(known) == sorted(["기본:38000002", "not-a-number", "38000003"])
+
+def test_known_id_set_merges_buffer():
+    known = KnownIdSet(buffer_size=8)
+    keys = [str(38000000 + i) for i in range(100, 0, -1)]
+    known.update(keys)
+    assert len(known) == 100
+    assert all(key in known for key in keys)
+    assert "38000000" not in known
+
+def test_known_id_set_bytes_round_trip():
+    known = KnownIdSet.from_keys(["38000001", "기본:38000002", "x"])
+    known.add("38000009")
+    restored = KnownIdSet.from_bytes(known.to_bytes())
+    assert sorted(restored) == sorted(known)
+    assert "기본:38000002" in restored
+    assert "x" in restored
+
+def test_bloom_known_set_uses_exact_lookup():
+    stored = {str(38000000 + i) for i in range(1000)}
+    known = BloomKnownSet(stored.__contains__, stored, iter_keys=lambda: iter(stored), capacity=2000)
+    assert all(key in known for key in stored)
+    misses = [str(39000000 + i) for i in range(1000)]
+    assert not any(key in known for key in misses)
+    # 거짓 양성만 정확한 저장소로 확인하므로 대부분은 필터에서 걸러짐
+    assert known.stats['filtered'] > 900
+
+def test_bloom_known_set_keeps_key_that_crosses_capacity():
+    stored = []
+    known = BloomKnownSet(stored.__contains__, (), iter_keys=lambda: iter(stored), capacity=100)
+    for i in range(100):
+        key = str(38000000 + i)
+        stored.append(key)
+        known.add(key)
+    # 저장소에 기록하기 전에 add해도 필터를 다시 만들 때 키를 잃지 않음
+    key = "38000100"
+    known.add(key)
+    assert known._bloom.capacity == 200
+    stored.append(key)
+    assert all(k in known for k in stored)
+
+def test_bloom_known_set_streams_keys_and_resizes():
+    stored = [str(38000000 + i) for i in range(500)]
+    # 한 번만 순회할 수 있는 iterator를 넘겨도 되고, capacity보다 많으면 실제 키 수에 맞춰 다시 만듦
+    known = BloomKnownSet(stored.__contains__, iter(stored), iter_keys=lambda: iter(stored), capacity=100)
+    assert known._bloom.capacity == 1000
+    assert len(known) == 500
+    assert all(key in known for key in stored)
+
+def test_sqlite_repository_bloom_index_crosses_capacity(tmp_path):
+    from encar_direct_url_simple import SqliteListingRepository
+    repo = SqliteListingRepository(str(tmp_path / "encar.db"), str(tmp_path / "good_cars.json"),
+                                   known_index="bloom")
+    try:
+        repo.save_known_listings([str(38000000 + i) for i in range(10)])
+        assert all(key in repo.load_known_listings() for key in repo.iter_known_listings())
+        # load_known_listings와 같은 구성에 capacity만 작게
+        known = BloomKnownSet(repo.is_known, repo.iter_known_listings(), iter_keys=repo.iter_known_listings,
+                              capacity=10)
+        for i in range(10, 15):
+            key = str(38000000 + i)
+            repo.add_known_listing(key)
+            known.add(key)
+        assert known._bloom.capacity == 20
+        assert all(key in known for key in repo.iter_known_listings())
+        assert "38000015" not in known
+    finally:
+        repo.close()
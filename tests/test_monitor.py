@@ -0,0 +1,105 @@
+import json
+
+import pytest
+
+from encar_direct_url_simple import (
+    CarListingRepository,
+    CrawlScheduler,
+    EncarMonitor,
+    SavedSearch,
+    SqliteListingRepository,
+    make_listing,
+)
+
+GOOD = ({'교환': 0, '판금': 0, '부식': 0}, "없음")
+
+class NullCrawler:
+    def close(self):
+        pass
+
+def open_repo(kind, tmp_path):
+    good_cars_file = str(tmp_path / "good_cars.json")
+    feed_dir = str(tmp_path / "feed")
+    if kind == "json":
+        return CarListingRepository(str(tmp_path / "known_listings.json"), good_cars_file, feed_dir=feed_dir)
+    return SqliteListingRepository(str(tmp_path / "encar.db"), good_cars_file, feed_dir=feed_dir)
+
+def read_json(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+@pytest.mark.parametrize("kind", ["json", "sqlite"])
+def test_car_matching_several_searches_is_saved_once(tmp_path, kind):
+    searches = [SavedSearch("a", "https://example.test/a"), SavedSearch("b", "https://example.test/b")]
+    monitor = EncarMonitor.for_searches(searches, open_repo(kind, tmp_path), NullCrawler())
+    for search in searches:
+        assert monitor.record_result(search, make_listing("1", "기아 K5", "2,500만원", "서울"), GOOD)
+    assert monitor.record_result(searches[1], make_listing("2", "기아 K5", "2,600만원", "서울"), GOOD)
+    # 확인한 매물은 검색마다 기록
+    assert {"a:1", "b:1", "b:2"} <= set(monitor.known_listings)
+    monitor.flush()
+    cars = read_json(tmp_path / "good_cars.json")['cars']
+    assert [(car['carId'], car['search']) for car in cars] == [("1", "a"), ("2", "b")]
+    assert read_json(tmp_path / "feed" / "index.json")['total'] == 2
+    monitor.repo.close()
+    # 다시 열어도 이미 저장된 차량은 추가하지 않음
+    monitor = EncarMonitor.for_searches(searches, open_repo(kind, tmp_path), NullCrawler())
+    assert monitor.good_car_ids == {"1", "2"}
+    monitor.record_result(SavedSearch("c", "https://example.test/c"), make_listing("1", "기아 K5", "2,500만원", "서울"),
+                          GOOD)
+    monitor.flush()
+    assert len(read_json(tmp_path / "good_cars.json")['cars']) == 2
+    monitor.repo.close()
+
+def test_scheduler_spreads_start_times():
+    searches = [SavedSearch(name, "", check_interval) for name, check_interval in
+                (("a", 600), ("b", 900), ("c", 300), ("d", 1200))]
+    scheduler = CrawlScheduler(searches, start=1000)
+    # 가장 짧은 간격(300초)을 검색 수로 나눠 75초씩 띄움
+    assert [search.name for search in scheduler.pop_due(1000)] == ["a"]
+    assert scheduler.seconds_until_next(1000) == 75
+    assert scheduler.pop_due(1074) == []
+    assert [search.name for search in scheduler.pop_due(1075)] == ["b"]
+    assert [search.name for search in scheduler.pop_due(1225)] == ["c", "d"]
+
+def test_scheduler_reschedules_on_fixed_period():
+    search = SavedSearch("a", "", 600)
+    scheduler = CrawlScheduler([search], start=0)
+    assert scheduler.pop_due(0) == [search]
+    # 늦게 처리해도 다음 실행은 원래 주기에 맞춤
+    assert scheduler.pop_due(650) == [search]
+    assert scheduler.seconds_until_next(650) == 550
+    assert scheduler.pop_due(1199) == []
+    assert scheduler.pop_due(1200) == [search]
+
+def test_scheduler_skips_missed_ticks():
+    search = SavedSearch("a", "", 600)
+    scheduler = CrawlScheduler([search], start=0)
+    scheduler.pop_due(0)
+    # 3주기 넘게 밀려도 한 번만 실행하고 다음 주기 경계로 예약
+    assert scheduler.pop_due(2000) == [search]
+    assert scheduler.seconds_until_next(2000) == 400
+    assert scheduler.pop_due(2399) == []
+    assert scheduler.pop_due(2400) == [search]
+
+def test_scheduler_without_searches():
+    scheduler = CrawlScheduler([], start=0)
+    assert scheduler.seconds_until_next(0) is None
+    assert scheduler.pop_due(10 ** 9) == []
+
+def test_stale_snapshot_retry_for_known_car_is_dropped(tmp_path):
+    snapshot_file = str(tmp_path / "monitor_state.bin")
+    search = SavedSearch("a", "https://example.test/a")
+    monitor = EncarMonitor.for_searches([search], open_repo("json", tmp_path), NullCrawler(),
+                                        snapshot_file=snapshot_file)
+    for car_id in ("1", "2"):
+        monitor.queue_retry(search, make_listing(car_id, "기아 K5", "2,500만원", "서울"), RuntimeError("timeout"))
+    monitor.flush()
+    # 스냅샷을 저장한 뒤 "1"이 확인한 매물로 저장됨 (스냅샷은 오래된 것이 됨)
+    open_repo("json", tmp_path).save_known_listings(["a:1"])
+    search = SavedSearch("a", "https://example.test/a")
+    monitor = EncarMonitor.for_searches([search], open_repo("json", tmp_path), NullCrawler(),
+                                        snapshot_file=snapshot_file)
+    assert set(monitor.retry_queue) == {"a:1", "a:2"}
+    assert [listing['id'] for listing in monitor.due_retries(search)] == ["2"]
+    assert set(monitor.retry_queue) == {"a:2"}
@@ -0,0 +1,69 @@
+import json
+
+from conftest import read_fixture
+from encar_direct_url_simple import (
+    iter_listing_html,
+    parse_listing_html,
+    parse_performance_html,
+    parse_search_api_results,
+    parse_special_note_html,
+)
+from encar_metrics import metrics
+
+def test_listing_html_rows():
+    listings = parse_listing_html(read_fixture("listing_page.html"), "https://example.test/detail/")
+    assert [listing['id'] for listing in listings] == ['38000001', '38000002', '38000003']
+    first = listings[0]
+    assert first['title'] == "기아 스팅어 2.0 터보 2WD"
+    assert first['price'] == "2,500만원"
+    assert first['region'] == "서울"
+    assert first['link'] == "https://example.test/detail/38000001"
+    # 가격/지역이 없는 행은 빈 문자열
+    assert listings[2]['price'] == ""
+    assert listings[2]['region'] == ""
+
+def test_iter_listing_html_matches_parse():
+    html = read_fixture("listing_page.html")
+    assert list(iter_listing_html(html)) == parse_listing_html(html)
+
+def test_listing_html_without_table():
+    assert parse_listing_html("<html><body><p>검색결과가 없습니다.</p></body></html>") == []
+
+def test_search_api_results():
+    data = json.loads(read_fixture("search_api.json"))
+    listings = parse_search_api_results(data, "https://example.test/detail/")
+    assert [listing['id'] for listing in listings] == ['38000011', '38000012', '38000013']
+    assert listings[0]['title'] == "기아 스팅어 2.0 터보 2WD 플래티넘"
+    assert listings[0]['price'] == "2,650만원"
+    assert listings[1]['price'] == "1,990만원"
+    assert listings[1]['region'] == "부산"
+    assert listings[2]['price'] == ""
+    assert parse_search_api_results({}) == []
+
+def test_performance_checklist_layout():
+    html = read_fixture("detail_checklist.html")
+    assert parse_performance_html(html) == {'교환': 1, '판금': 0, '부식': 0}
+    assert parse_special_note_html(html) == "없음"
+
+def test_performance_legacy_layout():
+    html = read_fixture("detail_legacy.html")
+    assert parse_performance_html(html) == {'교환': 0, '판금': 2, '부식': 0}
+    assert parse_special_note_html(html) == "영업용 사용이력\n렌트 사용이력"
+
+def test_performance_partial_uses_999_sentinel():
+    before = metrics.counter_value("encar_parse_missing_total", field='부식')
+    html = read_fixture("detail_partial.html")
+    assert parse_performance_html(html) == {'교환': 3, '판금': 1, '부식': 999}
+    assert metrics.counter_value("encar_parse_missing_total", field='부식') == before + 1
+    # 특이 사항 항목은 있지만 내용이 없으면 "없음"
+    assert parse_special_note_html(html) == "없음"
+
+def test_no_inspection_section():
+    html = read_fixture("detail_no_inspection.html")
+    assert parse_performance_html(html) is None
+    # 차량이력 영역은 있지만 특이 사항 항목이 없음
+    assert parse_special_note_html(html) is None
+
+def test_section_without_any_item_is_missing():
+    html = '<div data-impression="성능기록부"><ul><li>사고 없음</li></ul></div>'
+    assert parse_performance_html(html) is None
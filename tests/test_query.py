@@ -0,0 +1,112 @@
+import json
+import random
+import urllib.parse
+
+import pytest
+
+from encar_direct_url_simple import generate_advanced_search_url, set_limit_in_search_url, set_page_in_search_url
+from encar_query import (
+    OPERATORS,
+    ActionGroup,
+    ActionSyntaxError,
+    ActionTerm,
+    format_action,
+    parse_action,
+    parse_search_url,
+)
+
+CORRECT_URL = "http://www.encar.com/dc/dc_carsearchlist.do?carType=kor#!%7B%22action%22%3A%22(And.Hidden.N._.(C.CarType.Y._.(C.Manufacturer.%EA%B8%B0%EC%95%84._.(C.ModelGroup.%EC%8A%A4%ED%8C%85%EC%96%B4._.(C.Model.%EC%8A%A4%ED%8C%85%EC%96%B4._.(C.BadgeGroup.%EA%B0%80%EC%86%94%EB%A6%B0%202000cc._.Badge.2_.0%20%ED%84%B0%EB%B3%B4%202WD.))))))%22%2C%22toggle%22%3A%7B%7D%2C%22layer%22%3A%22%22%2C%22sort%22%3A%22ModifiedDate%22%2C%22page%22%3A1%2C%22limit%22%3A20%2C%22searchKey%22%3A%22%22%2C%22loginCheck%22%3Afalse%7D"
+# OR 조건과 이스케이프하지 않은 "2.0"이 들어 있는 URL
+PROBLEMATIC_URL = "http://www.encar.com/dc/dc_carsearchlist.do?carType=kor#!%7B%22action%22%3A%20%22%28And.Hidden.N._.%28C.CarType.Y._.%28C.Manufacturer.%EA%B8%B0%EC%95%84._.%28C.ModelGroup.%EC%8A%A4%ED%8C%85%EC%96%B4._.Model.%EC%8A%A4%ED%8C%85%EC%96%B4._.%28C.BadgeGroup.%EA%B0%80%EC%86%94%EB%A6%B0%202000cc._.%28C.Badge.2.0%20%ED%84%B0%EB%B3%B4%202WD._.%28Or.BadgeDetail.%ED%94%8C%EB%9E%98%ED%8B%B0%EB%84%98._.BadgeDetail.%EB%93%9C%EB%A6%BC%EC%97%90%EB%94%94%EC%85%98.%29%29%29%29%29%29%29%22%2C%20%22toggle%22%3A%20%7B%7D%2C%20%22layer%22%3A%20%22%22%2C%20%22sort%22%3A%20%22ModifiedDate%22%2C%20%22page%22%3A%201%2C%20%22limit%22%3A%2020%2C%20%22searchKey%22%3A%20%22%22%2C%20%22loginCheck%22%3A%20false%7D"
+# 모니터 기본 검색 URL (Options, 이스케이프된 괄호 포함)
+OPTIONS_URL = "http://www.encar.com/dc/dc_carsearchlist.do?carType=kor#!%7B%22action%22%3A%22(And.Hidden.N._.Options.%ED%81%AC%EB%A3%A8%EC%A6%88%20%EC%BB%A8%ED%8A%B8%EB%A1%A4(%EC%96%B4%EB%8C%91%ED%8B%B0%EB%B8%8C_)._.Options.360%EB%8F%84%20%EC%96%B4%EB%9D%BC%EC%9A%B4%EB%93%9C%20%EB%B7%B0._.(C.CarType.Y._.(C.Manufacturer.%EA%B8%B0%EC%95%84._.(C.ModelGroup.%EC%8A%A4%ED%8C%85%EC%96%B4._.(C.Model.%EC%8A%A4%ED%8C%85%EC%96%B4._.BadgeGroup.%EA%B0%80%EC%86%94%EB%A6%B0%202000cc.)))))%22%2C%22toggle%22%3A%7B%7D%2C%22layer%22%3A%22%22%2C%22sort%22%3A%22ModifiedDate%22%2C%22page%22%3A1%2C%22limit%22%3A%22300%22%2C%22searchKey%22%3A%22%22%2C%22loginCheck%22%3Afalse%7D"
+STINGER = ("Y", "기아", "스팅어", "스팅어", "가솔린 2000cc", "2.0 터보 2WD")
+
+def raw_action(url):
+    return json.loads(urllib.parse.unquote(url.split('#!', 1)[1]))['action']
+
+@pytest.mark.parametrize("url", [CORRECT_URL, OPTIONS_URL, generate_advanced_search_url(*STINGER)])
+def test_encar_urls_round_trip_exactly(url):
+    query = parse_search_url(url)
+    assert isinstance(query.action, ActionGroup)
+    assert format_action(query.action) == raw_action(url)
+    # 엔카와 같은 형식(공백 없는 JSON, 괄호 그대로)으로 인코딩되므로 URL도 그대로 복원됨
+    assert query.to_url() == url
+
+@pytest.mark.parametrize("url", [CORRECT_URL, PROBLEMATIC_URL, OPTIONS_URL])
+def test_parse_serialize_parse_reaches_fixed_point(url):
+    query = parse_search_url(url)
+    canonical = query.to_url()
+    again = parse_search_url(canonical)
+    assert again == query
+    assert again.action == query.action
+    assert again.to_url() == canonical
+
+def test_problematic_url_is_readable():
+    query = parse_search_url(PROBLEMATIC_URL)
+    assert query.action.find("Badge") == "2.0 터보 2WD"
+    assert [term.value for term in query.action.terms() if term.key == "BadgeDetail"] == ["플래티넘", "드림에디션"]
+
+def test_options_value_with_parentheses():
+    assert parse_search_url(OPTIONS_URL).action.find("Options") == "크루즈 컨트롤(어댑티브)"
+
+def test_generated_url_matches_encar():
+    assert generate_advanced_search_url(*STINGER) == CORRECT_URL
+
+def test_generated_or_condition():
+    url = generate_advanced_search_url(*STINGER, badge_details=["플래티넘", "드림에디션"])
+    action = parse_search_url(url).action
+    assert [term.value for term in action.terms() if term.key == "BadgeDetail"] == ["플래티넘", "드림에디션"]
+    assert "(Or.BadgeDetail.플래티넘._.BadgeDetail.드림에디션.)" in format_action(action)
+
+def test_page_and_limit_keep_conditions():
+    paged = parse_search_url(set_page_in_search_url(CORRECT_URL, 3, 50))
+    assert paged.get('page') == 3 and paged.get('limit') == "50"
+    assert paged.action == parse_search_url(CORRECT_URL).action
+    assert parse_search_url(set_limit_in_search_url(OPTIONS_URL, 1000)).get('limit') == "1000"
+
+def test_invalid_urls():
+    assert parse_search_url("http://www.encar.com/dc/dc_carsearchlist.do") is None
+    assert parse_search_url("http://www.encar.com/#!not-json") is None
+    assert parse_search_url("http://www.encar.com/#!%5B1%5D") is None
+    with pytest.raises(ActionSyntaxError):
+        parse_action("(And.Hidden.N.")
+    with pytest.raises(ActionSyntaxError):
+        parse_action("(Xor.Hidden.N.)")
+
+def random_value(rng):
+    alphabet = "가나다ab12 ._)(-_"
+    return "".join(rng.choice(alphabet) for _ in range(rng.randint(1, 8)))
+
+def random_node(rng, depth=0):
+    if depth > 3 or rng.random() < 0.4:
+        return ActionTerm(rng.choice(["Hidden", "Model", "Badge", "Options"]), random_value(rng))
+    return ActionGroup(rng.choice(OPERATORS), [random_node(rng, depth + 1) for _ in range(rng.randint(1, 3))])
+
+def test_random_trees_round_trip():
+    rng = random.Random(0)
+    for _ in range(500):
+        node = ActionGroup(rng.choice(OPERATORS), [random_node(rng) for _ in range(rng.randint(1, 3))])
+        text = format_action(node)
+        assert parse_action(text) == node, text
+        assert format_action(parse_action(text)) == text
+
+def test_cached_parse_returns_equal_ast():
+    text = raw_action(CORRECT_URL)
+    parse_action.cache_clear()
+    first = parse_action(text)
+    assert parse_action(text) is first
+    assert parse_action.cache_info().hits == 1
+    # 캐시를 비운 뒤 새로 파싱한 트리와도 같음 (트리는 튜플이라 공유해도 바뀌지 않음)
+    parse_action.cache_clear()
+    assert parse_action(text) == first
+    assert isinstance(first.children, tuple)
+
+def test_cached_search_query_is_not_changed_by_with_params():
+    query = parse_search_url(CORRECT_URL)
+    changed = query.with_params(page=5)
+    assert parse_search_url(CORRECT_URL) is query
+    assert query.get('page') == 1 and changed.get('page') == 5
+    assert changed.action is query.action
+    with pytest.raises(TypeError):
+        query.params['page'] = 2
@@ -0,0 +1,33 @@
+from selenium.webdriver.common.by import By
+
+from encar_direct_url_simple import (
+    CAR_HISTORY_SECTION_XPATH,
+    LISTING_EMPTY_XPATH,
+    LISTING_READY_SELECTOR,
+    NO_INSPECTION_XPATH,
+    PERFORMANCE_SECTION_XPATH,
+    detail_ready,
+    listing_ready,
+)
+
+class FakeDriver:
+    """렌더링된 요소를 (by, 선택자) 목록으로만 흉내 내는 드라이버"""
+    def __init__(self, *present):
+        self.present = set(present)
+    def find_elements(self, by, value):
+        return ["element"] if (by, value) in self.present else []
+
+def test_listing_ready():
+    assert not listing_ready(FakeDriver())
+    assert listing_ready(FakeDriver((By.CSS_SELECTOR, LISTING_READY_SELECTOR)))
+    # 검색 결과가 없으면 목록 행을 기다리지 않음
+    assert listing_ready(FakeDriver((By.XPATH, LISTING_EMPTY_XPATH)))
+
+def test_detail_ready():
+    assert not detail_ready(FakeDriver())
+    # 성능기록부 영역만 있고 항목이 아직 없으면 기다림
+    assert not detail_ready(FakeDriver((By.XPATH, PERFORMANCE_SECTION_XPATH)))
+    assert detail_ready(FakeDriver((By.XPATH, PERFORMANCE_SECTION_XPATH + "//li")))
+    # 성능기록부가 없는 매물: 차량이력이나 안내 문구만 있어도 준비 완료
+    assert detail_ready(FakeDriver((By.XPATH, CAR_HISTORY_SECTION_XPATH)))
+    assert detail_ready(FakeDriver((By.XPATH, NO_INSPECTION_XPATH)))
@@ -0,0 +1,57 @@
+import json
+import os
+
+import pytest
+
+from encar_direct_url_simple import SqliteListingRepository
+
+def write_json(path, data):
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False)
+
+@pytest.fixture
+def legacy_files(tmp_path):
+    data_file = str(tmp_path / "known_listings.json")
+    good_cars_file = str(tmp_path / "good_cars.json")
+    write_json(data_file, {'listings': ["38000001", "38000002", "38000003"]})
+    write_json(good_cars_file, {'cars': [{'carId': "38000002", 'title': "기아 K5"},
+                                         {'carId': "38000003", 'title': "현대 그랜저"}]})
+    return data_file, good_cars_file
+
+@pytest.mark.parametrize("known_index", ["array", "bloom"])
+def test_migrates_json_files(tmp_path, legacy_files, known_index):
+    data_file, good_cars_file = legacy_files
+    repo = SqliteListingRepository(str(tmp_path / "encar.db"), good_cars_file, migrate_from=data_file,
+                                   known_index=known_index)
+    known = repo.load_known_listings()
+    assert all(car_id in known for car_id in ("38000001", "38000002", "38000003"))
+    assert "38000004" not in known
+    assert [car['carId'] for car in repo.load_good_cars()] == ["38000002", "38000003"]
+    assert repo.is_known("38000001")
+    repo.close()
+
+def test_migration_runs_only_into_empty_tables(tmp_path, legacy_files):
+    data_file, good_cars_file = legacy_files
+    db_file = str(tmp_path / "encar.db")
+    repo = SqliteListingRepository(db_file, good_cars_file, migrate_from=data_file)
+    repo.add_known_listing("38000009")
+    repo.add_good_car({'carId': "38000009", 'title': "기아 쏘렌토"})
+    repo.flush()
+    repo.close()
+    # 다시 열어도 JSON 내용이 중복해서 들어가지 않음 (good_cars.json은 위에서 SQLite 내용으로 내보냄)
+    write_json(data_file, {'listings': ["38000001", "38000100"]})
+    repo = SqliteListingRepository(db_file, good_cars_file, migrate_from=data_file)
+    assert sorted(repo.iter_known_listings()) == ["38000001", "38000002", "38000003", "38000009"]
+    assert [car['carId'] for car in repo.load_good_cars()] == ["38000002", "38000003", "38000009"]
+    repo.close()
+
+def test_migration_without_json_files(tmp_path):
+    repo = SqliteListingRepository(str(tmp_path / "encar.db"), str(tmp_path / "good_cars.json"),
+                                   migrate_from=str(tmp_path / "known_listings.json"))
+    assert list(repo.iter_known_listings()) == []
+    assert repo.load_good_cars() == []
+    repo.flush()
+    with open(tmp_path / "good_cars.json", 'r', encoding='utf-8') as f:
+        assert json.load(f) == {'cars': []}
+    repo.close()
+    assert os.path.exists(tmp_path / "encar.db")
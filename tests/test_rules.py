@@ -0,0 +1,76 @@
+import pytest
+
+from encar_direct_url_simple import CarConditionFilter, create_filter
+from encar_rules import CarTable, RuleError, RuleFilter, car_record, parse_price
+
+CLEAN = {'교환': 0, '판금': 0, '부식': 0}
+
+def record(performance=CLEAN, note="없음", **listing):
+    return car_record(performance, note, listing)
+
+def test_parse_price():
+    assert parse_price("2,500만원") == 2500
+    assert parse_price(1990) == 1990
+    assert parse_price("") is None
+    assert parse_price(None) is None
+
+def test_default_filter():
+    car_filter = CarConditionFilter()
+    assert car_filter.is_good_car({'교환': 1, '판금': 0, '부식': 0}, "없음")
+    assert not car_filter.is_good_car({'교환': 2, '판금': 0, '부식': 0}, "없음")
+    assert not car_filter.is_good_car(CLEAN, "영업용")
+    # 성능기록부나 특이사항을 확인하지 못한 매물은 통과시키지 않음
+    assert not car_filter.is_good_car(None, "없음")
+    assert not car_filter.is_good_car(CLEAN, None)
+    # 찾지 못한 항목(999)은 통과하지 않음
+    assert not car_filter.is_good_car({'교환': 0, '판금': 0, '부식': 999}, "없음")
+
+def test_nested_rules():
+    car_filter = RuleFilter({'all': [
+        {'field': 'price', 'op': 'between', 'value': [1500, 3000]},
+        {'field': 'region', 'op': 'in', 'value': ["서울", "경기"]},
+        {'not': {'field': 'title', 'op': 'contains', 'value': "렌트"}},
+        {'any': [{'field': 'special_note', 'op': '==', 'value': "없음"},
+                 {'field': 'special_note', 'op': 'contains', 'value': "영업"}]},
+    ]})
+    assert car_filter.matches(record(price="2,500만원", region="서울", title="스팅어"))
+    assert car_filter.matches(record(note="영업용 사용이력", price="2,500만원", region="경기", title="스팅어"))
+    assert not car_filter.matches(record(price="3,500만원", region="서울", title="스팅어"))
+    assert not car_filter.matches(record(price="2,500만원", region="부산", title="스팅어"))
+    assert not car_filter.matches(record(price="2,500만원", region="서울", title="스팅어 렌트"))
+    # 가격 미표기 매물은 가격 비교를 통과하지 않음
+    assert not car_filter.matches(record(price="", region="서울", title="스팅어"))
+
+def test_evaluate_table_matches_predicate():
+    car_filter = RuleFilter([
+        {'field': 'exchange', 'op': '<=', 'value': 1},
+        {'field': 'price', 'op': '<', 'value': 2600},
+    ])
+    records = [
+        record(price="2,500만원"),
+        record({'교환': 2, '판금': 0, '부식': 0}, price="2,500만원"),
+        record(price="2,700만원"),
+        record(price=""),
+        record(price="1,000만원"),
+    ]
+    table = CarTable.from_records(['1', '2', '3', '4', '5'], records, valid=[True, True, True, True, False])
+    result = [bool(ok) for ok in car_filter.evaluate_table(table)]
+    assert result == [True, False, False, False, False]
+    assert [car_filter.matches(r) for r in records] == [True, False, False, False, True]
+
+@pytest.mark.parametrize("rules", [
+    {'field': 'mileage', 'op': '<', 'value': 1},
+    {'field': 'region', 'op': '<', 'value': "서울"},
+    {'field': 'price', 'op': 'contains', 'value': 1},
+    {'field': 'price', 'op': 'between', 'value': 1000},
+    "exchange <= 1",
+])
+def test_invalid_rules(rules):
+    with pytest.raises(RuleError):
+        RuleFilter(rules)
+
+def test_create_filter():
+    assert isinstance(create_filter(), CarConditionFilter)
+    assert create_filter({'max_exchange': 0}).max_exchange == 0
+    car_filter = create_filter({'rules': [{'field': 'panel', 'op': '==', 'value': 0}]})
+    assert car_filter.is_good_car({'교환': 5, '판금': 0, '부식': 3}, "영업용")
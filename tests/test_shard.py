@@ -0,0 +1,99 @@
+from collections import Counter
+
+import pytest
+
+from encar_fetch_policy import PermanentFetchError
+from encar_shard import HashRing, WorkQueue
+
+def listing(car_id):
+    return {'id': car_id, 'title': "기아 스팅어", 'price': "2,500만원", 'region': "서울"}
+
+def test_hash_ring_is_stable_and_balanced():
+    ring = HashRing(["w1", "w2", "w3"])
+    keys = [str(38000000 + i) for i in range(3000)]
+    owners = {key: ring.node_for(key) for key in keys}
+    assert HashRing(["w1", "w2", "w3"]).node_for(keys[0]) == owners[keys[0]]
+    counts = Counter(owners.values())
+    assert min(counts.values()) > 500
+    # 노드를 제거하면 그 노드의 키만 옮겨짐
+    ring.remove("w3")
+    moved = [key for key in keys if ring.node_for(key) != owners[key]]
+    assert moved and all(owners[key] == "w3" for key in moved)
+    ring.add("w3")
+    assert all(ring.node_for(key) == owners[key] for key in keys)
+
+def test_hash_ring_without_nodes():
+    with pytest.raises(ValueError):
+        HashRing([]).node_for("1")
+
+@pytest.fixture
+def queue(tmp_path):
+    queue = WorkQueue(str(tmp_path / "queue.db"), lease_seconds=60)
+    yield queue
+    queue.close()
+
+def test_enqueue_is_idempotent(queue):
+    ring = HashRing(["w1"])
+    tasks = [(f"기본:{car_id}", "기본", listing(car_id)) for car_id in ("1", "2")]
+    assert queue.enqueue(tasks, ring) == 2
+    assert queue.enqueue(tasks, ring) == 0
+    assert queue.counts() == {("w1", "pending"): 2}
+
+def test_lease_expiry(queue):
+    ring = HashRing(["w1"])
+    queue.enqueue([("기본:1", "기본", listing("1"))], ring)
+    leased = queue.lease("w1", "worker-a", now=1000.0)
+    assert [key for key, _ in leased] == ["기본:1"]
+    assert leased[0][1]['id'] == "1"
+    # 임대 중에는 다른 워커가 가져가지 못함
+    assert queue.lease("w1", "worker-b", now=1059.0) == []
+    # 임대 시간이 지나면 다시 가져감
+    assert [key for key, _ in queue.lease("w1", "worker-b", now=1061.0)] == ["기본:1"]
+
+def test_complete_and_collect(queue):
+    ring = HashRing(["w1"])
+    queue.enqueue([("기본:1", "기본", listing("1")), ("기본:2", "기본", listing("2"))], ring)
+    queue.lease("w1", "worker-a")
+    queue.complete("기본:1", "worker-a", detail=({'교환': 0, '판금': 0, '부식': 0}, "없음"))
+    queue.complete("기본:2", "worker-a", error=PermanentFetchError("없는 매물"))
+    results = {key: (search, item, detail, error) for key, search, item, detail, error in queue.collect()}
+    assert results["기본:1"][2] == ({'교환': 0, '판금': 0, '부식': 0}, "없음")
+    assert results["기본:1"][0] == "기본"
+    assert results["기본:2"][2] is None
+    assert isinstance(results["기본:2"][3], PermanentFetchError)
+    assert queue.counts() == {}
+    assert queue.collect() == []
+
+class FakeCrawler:
+    def __init__(self, listings):
+        self.listings = listings
+    def fetch_listings(self, search_url):
+        return list(self.listings)
+    def close(self):
+        pass
+
+def test_coordinator_merge_saves_snapshot(tmp_path, queue):
+    from encar_direct_url_simple import EncarMonitor, SavedSearch, SqliteListingRepository, make_listing
+    from encar_shard import Coordinator
+
+    def open_monitor():
+        repo = SqliteListingRepository(str(tmp_path / "encar.db"), str(tmp_path / "good_cars.json"))
+        crawler = FakeCrawler([make_listing("1", "기아 스팅어", "2,500만원", "서울")])
+        search = SavedSearch("", "http://example.test/search", incremental=False)
+        return EncarMonitor(None, None, repo, crawler, None, searches=[search],
+                            snapshot_file=str(tmp_path / "monitor_state.bin"))
+    monitor = open_monitor()
+    coordinator = Coordinator(monitor, queue, HashRing(["w1"]))
+    assert coordinator.scan(monitor.searches) == 1
+    key, _ = queue.lease("w1", "worker-a")[0]
+    queue.complete(key, "worker-a", detail=({'교환': 0, '판금': 0, '부식': 0}, "없음"))
+    assert coordinator.merge() == 1
+    monitor.close()
+    # 코디네이터가 flush할 때 저장한 스냅샷이 저장소와 일치하므로 그대로 복원됨
+    restored = open_monitor()
+    try:
+        assert restored.load_snapshot()
+        assert "1" in restored.known_listings
+        assert restored.searches[0].cycle == 1
+    finally:
+        restored.close()